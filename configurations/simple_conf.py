@@ -67,6 +67,7 @@ players = generate_players([['PGGiPlayer', 1.0]], nplayers=N)
 # regular_network(players, z)
 scale_free_network(players, m0=2)
 game = PGGiNetwork(players, threshold=THRESHOLD, generations=GENERATIONS, cost=cost, nu=nu)
+# game = PGGiNetwork(players, threshold=THRESHOLD, generations=GENERATIONS, cost=cost, nu=nu, engine='array')
 # game = PGGGame(players, threshold=THRESHOLD, generations=GENERATIONS, cost=cost)
 
 dictionary = {'N': N, 'HUMAN_PLAYER': HUMAN_PLAYER, 'PMATRIX': PMATRIX, 'GENERATIONS': GENERATIONS,
@@ -0,0 +1,80 @@
+# ==============================================================================
+# EvoSim
+# Copyright © 2016 Elias F. Domingos. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+
+"""
+Benchmarks of the game engines, network generators and population sizes.
+
+    python -m evosim.benchmarks run -o baseline.json
+    python -m evosim.benchmarks run --games PGGiNetwork --engines array --sizes 1000 100000 -o current.json
+    python -m evosim.benchmarks compare baseline.json current.json --tolerance 0.1
+
+compare exits with status 1 if a case got slower or uses more memory than the tolerance.
+"""
+
+import argparse
+import logging
+import sys
+
+from evosim.benchmarks.suite import SIZES, case_name, cases, compare, load, run_suite, save
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m evosim.benchmarks')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help='run the benchmarks')
+    run.add_argument('-o', '--output', help='JSON file of the results')
+    run.add_argument('--games', nargs='+')
+    run.add_argument('--engines', nargs='+')
+    run.add_argument('--players', nargs='+')
+    run.add_argument('--networks', nargs='+')
+    run.add_argument('--sizes', nargs='+', type=int, default=list(SIZES))
+    run.add_argument('--max-object-size', type=int, help='largest population of the object engines')
+    run.add_argument('--generations', type=int, default=20)
+    run.add_argument('--min-time', type=float, default=0.2, help='seconds of timed runs per case')
+    run.add_argument('--no-memory', action='store_true', help='do not measure the peak memory')
+    run.add_argument('--list', action='store_true', help='list the cases without running them')
+
+    diff = commands.add_parser('compare', help='compare results with a baseline')
+    diff.add_argument('baseline')
+    diff.add_argument('current')
+    diff.add_argument('--tolerance', type=float, default=0.1)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    if args.command == 'run':
+        max_size = {'object': args.max_object_size} if args.max_object_size else None
+        selected = cases(args.games, args.engines, args.players, args.networks, args.sizes, max_size)
+        if args.list:
+            print('\n'.join(case_name(case) for case in selected))
+            return 0
+        report = run_suite(selected, args.generations, args.min_time, memory=not args.no_memory)
+        if args.output:
+            save(report, args.output)
+        return 0
+
+    changes, regressions = compare(load(args.baseline), load(args.current), args.tolerance)
+    for name, metric, old, new, change in changes:
+        flag = 'REGRESSION' if (name, metric, old, new, change) in regressions else ''
+        print('%-60s %-22s %12.4g %12.4g %+7.1f%% %s' % (name, metric, old, new, 100 * change, flag))
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,241 @@
+# ==============================================================================
+# EvoSim
+# Copyright © 2016 Elias F. Domingos. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+
+import json
+import logging
+import os
+import platform
+import tracemalloc
+from time import perf_counter, time
+
+import numpy as np
+
+from evosim.diskcache import code_version
+from evosim.games.games import NIPDGame, PGGGame, PGGiGame, PGGiNetwork, PGGSocialControl
+from evosim.network.network import GridNetwork, RandomNetwork, RegularNetwork, ScaleFreeNetwork, \
+    SmallWorldNetwork
+from evosim.players.players import generate_players
+from evosim.players.population import Population, generate_population
+
+logger = logging.getLogger(__name__)
+
+SIZES = (10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6)
+
+# Games, with their engines and the player types the engines run
+GAMES = {
+    'NIPDGame': (NIPDGame, {'object': ('TFTPlayer', 'ParlovPlayer')}),
+    'PGGGame': (PGGGame, {'object': ('PureStrategyPlayer',), 'counts': ('Population',),
+                          'events': ('Population',)}),
+    'PGGiGame': (PGGiGame, {'object': ('PureStrategyPlayer',), 'counts': ('Population',),
+                            'events': ('Population',)}),
+    'PGGiNetwork': (PGGiNetwork, {'object': ('PGGiPlayer', 'BMPlayer'), 'array': ('PGGiPlayer', 'BMPlayer'),
+                                  'incremental': ('PGGiPlayer', 'BMPlayer')}),
+    'PGGSocialControl': (PGGSocialControl, {'object': ('PGGscPlayer',), 'counts': ('Population',),
+                                            'events': ('Population',)}),
+}
+
+# Network generators of the games played on a network
+NETWORKS = {
+    'regular': lambda n: RegularNetwork(4),
+    'grid': lambda n: GridNetwork(shape=_grid_shape(n)),
+    'random': lambda n: RandomNetwork(z=4),
+    'small_world': lambda n: SmallWorldNetwork(4, 0.1),
+    'scale_free': lambda n: ScaleFreeNetwork(z=4),
+}
+
+# Largest population simulated by each engine by default: the object engines spend
+# microseconds per player and generation, and the event engine per strategy change
+MAX_SIZE = {'object': 10 ** 4, 'events': 10 ** 4}
+
+# Metrics where a larger value is better, the others (times, memory) should be small
+RATES = ('player_updates_per_s', 'generations_per_s')
+COSTS = ('graph_build_time', 'peak_memory')
+
+
+def _grid_shape(n):
+    rows = int(np.sqrt(n))
+    while n % rows:
+        rows -= 1
+    return rows, n // rows
+
+
+def cases(games=None, engines=None, players=None, networks=None, sizes=SIZES, max_size=None):
+    """
+    Benchmark cases: every game x engine x player type x network (games on a network
+    only) x population size, filtered by the given names.
+
+    :param max_size: dict of engine -> largest population size, see MAX_SIZE
+    :return: list of dicts with the game, engine, players, network and N of every case
+    """
+    max_size = dict(MAX_SIZE, **(max_size or {}))
+    selected = []
+    for game, (_, game_engines) in GAMES.items():
+        if games is not None and game not in games:
+            continue
+        for engine, player_types in game_engines.items():
+            if engines is not None and engine not in engines:
+                continue
+            for player_type in player_types:
+                if players is not None and player_type not in players:
+                    continue
+                for network in (NETWORKS if game == 'PGGiNetwork' else (None,)):
+                    if networks is not None and network is not None and network not in networks:
+                        continue
+                    if engine == 'object' and network == 'random':
+                        # Player objects without neighbours cannot imitate anyone
+                        continue
+                    for n in sizes:
+                        if n <= max_size.get(engine, np.inf):
+                            selected.append({'game': game, 'engine': engine, 'players': player_type,
+                                             'network': network, 'N': int(n)})
+    return selected
+
+
+def case_name(case):
+    parts = [case['game'], case['engine'], case['players']]
+    if case['network'] is not None:
+        parts.append(case['network'])
+    return '/'.join(parts + ['N=%d' % case['N']])
+
+
+def build(case, generations, seed=0):
+    """
+    Build the game of a case.
+
+    :return: game and seconds spent building the network (and filling the ``neighbors``
+             lists of player objects)
+    """
+    game_class = GAMES[case['game']][0]
+    n = case['N']
+    if case['engine'] == 'object':
+        population = generate_players([[case['players'], 1.0]], nplayers=n)
+    elif case['players'] == 'Population':
+        population = Population(n)
+    else:
+        population = generate_population([[case['players'], 1.0]], nplayers=n)
+    build_time = 0.0
+    if case['network'] is not None:
+        start = perf_counter()
+        graph = NETWORKS[case['network']](n).build(n, seed)
+        if case['engine'] == 'object':
+            graph.assign_neighbors(population)
+        else:
+            population.set_network(graph)
+        build_time = perf_counter() - start
+    if game_class is NIPDGame:
+        game = NIPDGame(0, generations, population)
+    else:
+        kwargs = {'r': 3.0, 'engine': case['engine']}
+        if game_class is PGGiNetwork:
+            # Mutation keeps cooperation alive, so that the runs last all the generations
+            kwargs['mutation'] = 1e-3
+        game = game_class(population, generations=generations, **kwargs)
+    game.seed(seed)
+    return game, build_time
+
+
+def init(game):
+    game.init_game()
+    if isinstance(game, PGGSocialControl):
+        game.init_population(dni=0.25, cni=0.25, di=0.25, ci=0.25)
+    else:
+        game.init_population(ncoop=0.5, ninsp=0.1)
+
+
+def run_case(case, generations=20, min_time=0.2, max_repeat=5, memory=True):
+    """
+    Measure a case. The run is repeated until min_time seconds have elapsed (at most
+    max_repeat times) and the fastest repetition is kept. The peak memory is measured
+    with tracemalloc in a separate, shorter run, because tracing slows down the
+    allocations of the timed runs.
+
+    :return: dict of the case and its metrics: player_updates_per_s, generations_per_s,
+             graph_build_time (seconds) and peak_memory (bytes, None without memory)
+    """
+    game, build_time = build(case, generations)
+    best, elapsed, repeat = np.inf, 0.0, 0
+    while repeat < max_repeat and (repeat == 0 or elapsed < min_time):
+        init(game)
+        start = perf_counter()
+        game.run()
+        interval = perf_counter() - start
+        played = game.current_generation - game._first_generation + 1
+        best = min(best, interval / max(played, 1))
+        elapsed += interval
+        repeat += 1
+    result = dict(case, name=case_name(case), player_updates_per_s=case['N'] / best, generations_per_s=1.0 / best,
+                  graph_build_time=build_time, repeat=repeat, peak_memory=None)
+    del game
+    if memory:
+        tracemalloc.start()
+        try:
+            game, _ = build(case, min(generations, 2))
+            init(game)
+            game.run()
+            result['peak_memory'] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    logger.info("%s: %.3g player updates/s, %.3g generations/s", result['name'], result['player_updates_per_s'],
+                result['generations_per_s'])
+    return result
+
+
+def run_suite(selected, generations=20, min_time=0.2, memory=True):
+    """
+    :param selected: list of cases, see cases
+    :return: dict with the environment ('meta') and the results of the cases
+    """
+    meta = {'time': time(), 'python': platform.python_version(), 'numpy': np.__version__,
+            'platform': platform.platform(), 'cpus': os.cpu_count(), 'code': code_version(),
+            'generations': generations}
+    return {'meta': meta, 'results': [run_case(case, generations, min_time, memory=memory) for case in selected]}
+
+
+def save(report, path):
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=1)
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(baseline, current, tolerance=0.1):
+    """
+    Compare two reports case by case.
+
+    :param tolerance: relative change above which a metric is a regression, e.g. 0.1 if
+                      rates 10% lower or times and memory 10% higher are regressions
+    :return: list of (case name, metric, baseline value, current value, relative change),
+             and list of the regressions among them
+    """
+    previous = {result['name']: result for result in baseline['results']}
+    changes, regressions = [], []
+    for result in current['results']:
+        if result['name'] not in previous:
+            continue
+        for metric in RATES + COSTS:
+            old, new = previous[result['name']].get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            changes.append((result['name'], metric, old, new, change))
+            if (metric in RATES and change < -tolerance) or (metric in COSTS and change > tolerance):
+                regressions.append(changes[-1])
+    return changes, regressions
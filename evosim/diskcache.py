@@ -0,0 +1,157 @@
+# ==============================================================================
+# EvoSim
+# Copyright © 2016 Elias F. Domingos. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+
+import functools
+import hashlib
+import json
+import logging
+import os
+
+import numpy as np
+
+import evosim
+
+logger = logging.getLogger(__name__)
+
+
+class DiskCache:
+    """
+    Size-capped cache directory whose entries are addressed by the hash of a JSON
+    description (see ``canonical`` and ``key``). Each entry is a file or a directory of
+    the cache directory, named after its key; names starting with a dot are temporary.
+    The modification time of an entry is the time of its last use, and when the cache
+    grows over ``max_bytes`` the least recently used entries are removed.
+
+    Subclasses define ``path``, ``stat`` and ``remove`` for their layout of an entry.
+
+    :param directory: cache directory, created if needed
+    :param max_bytes: maximum size of the cache
+    """
+
+    # Kind of entry, for the log messages
+    entry_name = 'Entry'
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def key(description):
+        return hashlib.sha1(json.dumps(description, sort_keys=True).encode()).hexdigest()
+
+    def path(self, key):
+        raise NotImplementedError
+
+    def stat(self, name):
+        """
+        :param name: name of a file or directory of the cache directory
+        :return: (last use, size in bytes, key) of the entry, or None if the name is not
+                 an entry
+        :raises OSError: if the entry has been removed in the meantime
+        """
+        raise NotImplementedError
+
+    def remove(self, key):
+        raise NotImplementedError
+
+    def entries(self):
+        """
+        :return: list of (last use, size in bytes, key) of the entries
+        """
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.startswith('.'):
+                continue
+            try:
+                entry = self.stat(name)
+            except OSError:
+                continue
+            if entry is not None:
+                entries.append(entry)
+        return entries
+
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict_lru(self, keep=None, max_bytes=None):
+        """
+        Remove the least recently used entries until the cache takes at most max_bytes.
+
+        :param keep: key of an entry that is not removed
+        :param max_bytes: by default the size cap of the cache
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, key in entries:
+            if total <= max_bytes:
+                break
+            if key == keep:
+                continue
+            try:
+                self.remove(key)
+            except OSError:
+                continue
+            total -= size
+            logger.debug("%s %s evicted from the cache", self.entry_name, key)
+
+    def clear(self):
+        self.evict_lru(max_bytes=0)
+
+
+def canonical(value):
+    """
+    :param value: dict, list, number, string or numpy array or scalar, nested
+    :return: the value as plain JSON types, with every array replaced by its dtype, shape
+             and hash (see to_json)
+    """
+    return json.loads(json.dumps(value, sort_keys=True, default=to_json))
+
+
+def to_json(value):
+    """
+    JSON encoder of the numpy values of a cache key.
+
+    :raises TypeError: for anything else, e.g. a function
+    """
+    if isinstance(value, np.ndarray):
+        return {'dtype': str(value.dtype), 'shape': list(value.shape),
+                'sha1': hashlib.sha1(np.ascontiguousarray(value).tobytes()).hexdigest()}
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError("%r cannot be part of a cache key, use numbers, strings or arrays" % (value,))
+
+
+@functools.lru_cache(maxsize=None)
+def code_version():
+    """
+    :return: hash of the sources of the evosim package (without its tests) and of the
+             numpy version
+    """
+    digest = hashlib.sha1(np.__version__.encode())
+    root = os.path.dirname(os.path.abspath(evosim.__file__))
+    for directory, subdirectories, files in os.walk(root):
+        subdirectories[:] = sorted(name for name in subdirectories if name not in ('tests', '__pycache__'))
+        for name in sorted(files):
+            if name.endswith('.py'):
+                path = os.path.join(directory, name)
+                digest.update(os.path.relpath(path, root).encode())
+                with open(path, 'rb') as f:
+                    digest.update(f.read())
+    return digest.hexdigest()
@@ -0,0 +1,805 @@
+# ==============================================================================
+# EvoSim
+# Copyright © 2016 Elias F. Domingos. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+
+import numpy as np
+import logging
+from math import ceil, floor, lgamma, log, sqrt
+
+from evosim.players.population import Population
+from evosim.rng import skip_sample
+
+logger = logging.getLogger(__name__)
+
+
+class ArrayNetworkEngine:
+    """
+    Array engine for :class:`evosim.games.games.PGGiNetwork`.
+
+    Instead of walking the player objects, the engine keeps actions and payoffs of the
+    whole population in the flat arrays of a :class:`evosim.players.population.Population`
+    and plays every group game, the inspection round and the selection step of a
+    generation with array operations over the adjacency of the network. The dynamics are
+    those of the object engine (``PGGiPlayer.play_group_game`` and ``selection``,
+    ``BMPlayer.selection``); only the order in which random numbers are drawn differs.
+
+    The game population can be a Population, which is then used in place, or a dict of
+    player objects. In the latter case the topology is read once from the ``neighbors``
+    lists, so it must not change after the engine has been created, and the player
+    objects are updated with the final state at the end of each run.
+
+    :param game: PGGiNetwork game whose population is simulated
+    """
+
+    def __init__(self, game):
+        self.game = game
+        if isinstance(game.population, Population):
+            self.players = None
+            self.population = game.population
+        else:
+            self.players = game.population
+            self.population = Population.from_players(game.population)
+        if self.population.graph is None:
+            raise ValueError("PGGiNetwork needs a population with a network")
+        self.N = len(self.population)
+
+        # Adjacency in CSR form: neighbours of i are indices[indptr[i]:indptr[i+1]]
+        self.graph = self.population.graph
+        self.indptr = self.graph.indptr
+        self.indices = self.graph.indices
+        self.degree = self.graph.degree
+
+        # Group of player g = [g, *neighbors(g)], stored one entry per (group, member)
+        self.group_start, self.entry_member = self.graph.groups()
+        self.group_matrix = self.graph.group_matrix()
+        self.count_base = float(self.degree.max(initial=0) + 2)
+        self.entry_group = np.repeat(np.arange(self.N), self.degree + 1)
+
+        # Bush-Mosteller learners keep their aspiration and cooperation probability between runs
+        self.is_bm = self.population.is_type('BMPlayer')
+        self.bm = np.flatnonzero(self.is_bm)
+        self.imitators = np.flatnonzero(~self.is_bm & (self.degree > 0))
+
+    def group_sum(self, values):
+        """
+        Sum ``values`` of the members of every group.
+
+        :param values: array of length N indexed by player
+        :return: array of length N indexed by group (focal player)
+        """
+        return np.add.reduceat(values[self.entry_member], self.group_start)
+
+    def init_population(self, ncoop=0.5, ninsp=0.0):
+        population = self.population
+        prob = self.game.rng.random(self.N)
+        population.action[:] = 1
+        population.action[prob < (ncoop + ninsp)] = 2
+        population.action[prob < ncoop] = 0
+        population.prev_action[:] = population.action
+        population.init_params()
+
+        population.maxP[:], population.minP[:] = self.game.p_limits(self.graph)
+
+    def play_group_games(self):
+        """
+        Group games of all the players with two sparse products by the group matrix
+        M = A + I (see Graph.group_matrix). The numbers of cooperators and inspectors of
+        every group come from a single product M @ (is_c + K is_i), K being larger than
+        any group. As M is symmetric, M @ group_payoff sums the payoffs of the groups of
+        every player; a cooperator makes all its k + 1 groups active, so it pays
+        (k + 1) c. Per-entry arrays are only built for the inspection round.
+        """
+        population = self.population
+        nc, ni = self.group_counts(population.action)
+        group_payoff = self.group_payoffs(nc, ni, self.degree)
+        population.total_payoff += self.member_payoffs(self.group_matrix @ group_payoff, population.action,
+                                                       self.degree)
+        # Every player takes part in its own group and in those of its neighbours
+        population.ngame += (self.degree + 1).astype(np.int32)
+
+        self.game.timer.lap('payoff')
+
+        active = nc > 0
+        if (ni[active] > 0).any():
+            entry_i = population.action[self.entry_member] == 2
+            inspectors = np.flatnonzero(entry_i & active[self.entry_group])
+            self.inspection_round(inspectors, self.degree + 1 - ni, group_payoff, entry_i)
+        self.game.timer.lap('inspection')
+
+    def group_counts(self, action):
+        """
+        :return: number of cooperators and of inspectors of every group
+        """
+        counts = self.group_matrix @ ((action == 0) + self.count_base * (action == 2))
+        ni = np.floor(counts / self.count_base)
+        return (counts - self.count_base * ni).astype(np.int64), ni.astype(np.int64)
+
+    def group_payoffs(self, nc, ni, degree):
+        """
+        :return: payoff of the members of groups with nc cooperators and ni inspectors
+                 whose focal player has the given degree; groups without cooperators pay
+                 nothing (Tragedy of the commons)
+        """
+        group_payoff = np.zeros(nc.size, dtype=np.float64)
+        active = nc > 0
+        group_payoff[active] = self.game.calculate_payoff_game(1, nc[active], ni[active], degree[active])
+        return group_payoff
+
+    def member_payoffs(self, shares, action, degree):
+        """
+        :param shares: sum of the payoffs of the groups of each player (M @ group_payoff)
+        :return: payoff of each player before the inspection round
+        """
+        payoff = shares - (action == 0) * (degree + 1) * self.game.c
+        payoff[action == 2] = 0
+        return payoff
+
+    def inspection_round(self, inspectors, players_left, group_payoff, entry_i):
+        """
+        Every inspector picks a random non-inspector of its group; when it finds a defector
+        it collects a share of the defector's payoff.
+
+        The object engine applies the inspections of a defector one after the other, each
+        taking ``nu / h`` of what is left of its last payoff (``h`` being the number of
+        inspectors that found it) and adding the remainder to its total payoff again. The
+        closed form of that recursion is used here.
+        """
+        population = self.population
+        nu = float(self.game.nu)
+        group = self.entry_group[inspectors]
+
+        # Non-inspector entries, laid out group after group
+        pool = np.flatnonzero(~entry_i)
+        pool_start = np.cumsum(players_left) - players_left
+        pick = pool_start[group] + (self.game.rng.random(group.size) * players_left[group]).astype(np.int64)
+        inspected = self.entry_member[pool[pick]]
+
+        found = population.action[inspected] == 1
+        if not found.any():
+            return
+        inspectors = self.entry_member[inspectors[found]]
+        group = group[found]
+        inspected = inspected[found]
+
+        # Rank of each inspector among those that found the same defector in the same group
+        key = group * self.N + inspected
+        order = np.argsort(key, kind='stable')
+        key = key[order]
+        first = np.ones(key.size, dtype=bool)
+        first[1:] = key[1:] != key[:-1]
+        starts = np.flatnonzero(first)
+        counts = np.diff(np.append(starts, key.size))
+        h = np.repeat(counts, counts).astype(np.float64)
+        rank = np.arange(key.size) - np.repeat(starts, counts)
+
+        last_payoff = group_payoff[group[order]]
+        q = 1.0 - nu / h
+        population.total_payoff += np.bincount(inspectors[order], weights=last_payoff * q ** rank * nu / h,
+                                               minlength=self.N)
+
+        # Remainders added to the inspected defectors: L * (q + q^2 + ... + q^h)
+        h, q, last_payoff = h[first], q[first], last_payoff[first]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            remainder = np.where(q == 1.0, h, q * (1.0 - q ** h) / (1.0 - q))
+        inspected = inspected[order][first]
+        population.total_payoff += np.bincount(inspected, weights=last_payoff * remainder, minlength=self.N)
+        np.add.at(population.inspected, inspected, counts)
+
+    def selection(self):
+        rng = self.game.rng
+        population = self.population
+        action = population.action
+        total_payoff = population.total_payoff
+        new_action = action.copy()
+
+        # Imitation of a random neighbour (PGGiPlayer.selection)
+        focal = self.imitators
+        if focal.size:
+            pick = self.indptr[focal] + (rng.random(focal.size) * self.degree[focal]).astype(np.int64)
+            model = self.indices[pick]
+            # The sequential loop sees the new prev_action of the neighbours it has already
+            # visited and the one of the previous generation for the others
+            model_action = np.where(model < focal, action[model], population.prev_action[model])
+            diff = total_payoff[model] - total_payoff[focal]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                prob = diff / np.abs(population.maxP[model] - population.minP[focal])
+            switch = (diff > 0) & (rng.random(focal.size) < prob)
+            new_action[focal[switch]] = model_action[switch]
+
+        # Bush-Mosteller learning (BMPlayer.selection)
+        bm = self.bm
+        if bm.size:
+            p, h, l, e = population.p[bm], population.h[bm], population.l[bm], population.e[bm]
+            bm_action = (rng.random(bm.size) > p).astype(np.int8)
+            misimplemented = rng.random(bm.size) <= e
+            bm_action[misimplemented] = 1 - bm_action[misimplemented]
+            A = (1 - h) * population.A[bm] + h * total_payoff[bm]
+            s = np.tanh(population.beta[bm] * (total_payoff[bm] - A))
+            cooperate = bm_action == 0
+            population.A[bm] = A
+            population.p[bm] = np.where(cooperate,
+                                        np.where(s >= 0, p + (1 - p) * l * s, p + p * l * s),
+                                        np.where(s >= 0, p - p * l * s, p - (1 - p) * l * s))
+            new_action[bm] = bm_action
+
+        population.prev_action[:] = action
+        action[:] = new_action
+
+    def mutate(self):
+        """
+        Every player switches with probability game.mutation to another strategy, chosen
+        at random. The mutants are drawn with ``skip_sample``. Bush-Mosteller learners
+        only switch between cooperation and defection (see BMPlayer.mutate).
+        """
+        game = self.game
+        mutants = skip_sample(self.N, game.mutation, game.rng)
+        if mutants.size:
+            action = self.population.action
+            strategies = game.strategies
+            if self.bm.size:
+                strategies = np.where(self.is_bm[mutants], min(strategies, 2), strategies)
+            shift = 1 + game.rng.integers(0, strategies - 1, size=mutants.size)
+            action[mutants] = (action[mutants] + shift) % strategies
+
+    def run(self):
+        game = self.game
+        population = self.population
+        timer = game.timer
+        for game.current_generation in game.generation_range():
+            if game.nc > 0 or game.mutation > 0:
+                self.play_group_games()
+                self.selection()
+                timer.lap('selection')
+                self.mutate()
+                timer.lap('mutation')
+                game.nc = int(np.count_nonzero(population.action == 0))
+                game.ni = int(np.count_nonzero(population.action == 2))
+                population.init_params()
+
+            logger.debug("[%d] ncoop = %d ninsp = %d", game.current_generation, game.nc, game.ni)
+            # Update Simulation data
+            game.update_sim_data()
+            if game.end_generation():
+                break
+
+        if self.players is not None:
+            self.population.update_players(self.players)
+
+    def get_state(self):
+        return self.population.get_state()
+
+    def set_state(self, state):
+        self.population.set_state(state)
+
+
+class IncrementalNetworkEngine(ArrayNetworkEngine):
+    """
+    Array engine for :class:`evosim.games.games.PGGiNetwork` that keeps the numbers of
+    cooperators and inspectors of every group, the group payoffs and the payoffs of the
+    players from one generation to the next.
+
+    After the selection step only the groups that contain a player who changed action
+    are updated, and only the payoffs of the members of those groups, so near fixation
+    or with rare imitation the group counts and payoffs cost O(changes k^3) instead of
+    O(E). When more than ``max_changes`` N players change action everything is
+    recomputed as in ArrayNetworkEngine.
+
+    The rest of a generation does not scale with the number of changes: finding the
+    changed players compares the actions of all N players, the selection step draws a
+    model for every player, and whenever there are inspectors (the usual case in PGGi)
+    the payoffs of all N players are restored and the inspection round goes over every
+    group entry, O(E). The engine therefore pays off mostly without inspectors, or when
+    the group games dominate the cost of a generation.
+
+    The payoffs are exactly those of ArrayNetworkEngine and the same random numbers are
+    drawn, so both engines give the same runs. Between generations ``total_payoff``
+    holds the payoffs of the last generation instead of zeros.
+
+    :param game: PGGiNetwork game whose population is simulated
+    """
+    max_changes = 0.05
+
+    def __init__(self, game):
+        super().__init__(game)
+        self.counted_action = None
+        self.inspection = False
+
+    def init_population(self, ncoop=0.5, ninsp=0.0):
+        super().init_population(ncoop=ncoop, ninsp=ninsp)
+        self.counted_action = None
+
+    def set_state(self, state):
+        super().set_state(state)
+        self.counted_action = None
+
+    def refresh_groups(self):
+        """
+        Recompute the counts and payoffs of all the groups.
+        """
+        population = self.population
+        action = population.action
+        self.nc_group, self.ni_group = self.group_counts(action)
+        self.group_payoff = self.group_payoffs(self.nc_group, self.ni_group, self.degree)
+        self.shares = self.group_matrix @ self.group_payoff
+        self.base_payoff = self.member_payoffs(self.shares, action, self.degree)
+        population.total_payoff[:] = self.base_payoff
+        population.inspected[:] = 0
+        population.ngame[:] = self.degree + 1
+        self.counted_action = action.copy()
+        self.nc = int(np.count_nonzero(action == 0))
+        self.ni = int(np.count_nonzero(action == 2))
+
+    def update_groups(self):
+        """
+        Update the groups of the players whose action differs from the one they had when
+        the groups were last counted.
+        """
+        population = self.population
+        changed = np.flatnonzero(population.action != self.counted_action)
+        if changed.size > self.max_changes * self.N:
+            self.refresh_groups()
+            return
+        if not changed.size:
+            return
+        old, new = self.counted_action[changed], population.action[changed]
+        dc = (new == 0).astype(np.int64) - (old == 0)
+        di = (new == 2).astype(np.int64) - (old == 2)
+        self.counted_action[changed] = new
+        self.nc += int(dc.sum())
+        self.ni += int(di.sum())
+
+        # Groups of the changed players: their own and those of their neighbours
+        sizes = self.degree[changed] + 1
+        groups = self.entry_member[expand_ranges(self.group_start[changed], sizes)]
+        np.add.at(self.nc_group, groups, np.repeat(dc, sizes))
+        np.add.at(self.ni_group, groups, np.repeat(di, sizes))
+        groups = sorted_unique(groups)
+        self.group_payoff[groups] = self.group_payoffs(self.nc_group[groups], self.ni_group[groups],
+                                                       self.degree[groups])
+
+        # Members of those groups; their sums are recomputed from the rows of M so that
+        # they are exactly those of a full product
+        members = sorted_unique(self.entry_member[expand_ranges(self.group_start[groups], self.degree[groups] + 1)])
+        self.shares[members] = self.group_matrix[members] @ self.group_payoff
+        self.base_payoff[members] = self.member_payoffs(self.shares[members], population.action[members],
+                                                        self.degree[members])
+        population.total_payoff[members] = self.base_payoff[members]
+
+    def play_group_games(self):
+        population = self.population
+        if self.counted_action is None:
+            self.refresh_groups()
+        elif self.inspection:
+            # Undo the inspection round of the last generation
+            population.total_payoff[:] = self.base_payoff
+            population.inspected[:] = 0
+        self.game.timer.lap('payoff')
+
+        self.inspection = self.ni > 0
+        if self.inspection:
+            entry_i = population.action[self.entry_member] == 2
+            inspectors = np.flatnonzero(entry_i & (self.nc_group > 0)[self.entry_group])
+            if inspectors.size:
+                self.inspection_round(inspectors, self.degree + 1 - self.ni_group, self.group_payoff, entry_i)
+        self.game.timer.lap('inspection')
+
+    def run(self):
+        game = self.game
+        timer = game.timer
+        for game.current_generation in game.generation_range():
+            if game.nc > 0 or game.mutation > 0:
+                self.play_group_games()
+                self.selection()
+                timer.lap('selection')
+                self.mutate()
+                timer.lap('mutation')
+                self.update_groups()
+                timer.lap('groups')
+                game.nc = self.nc
+                game.ni = self.ni
+
+            logger.debug("[%d] ncoop = %d ninsp = %d", game.current_generation, game.nc, game.ni)
+            # Update Simulation data
+            game.update_sim_data()
+            if game.end_generation():
+                break
+
+        if self.players is not None:
+            self.population.update_players(self.players)
+
+
+def expand_ranges(starts, lengths):
+    """
+    :return: concatenation of the ranges [start, start + length)
+    """
+    offsets = np.cumsum(lengths) - lengths
+    return np.repeat(starts - offsets, lengths) + np.arange(int(lengths.sum()), dtype=np.int64)
+
+
+def sorted_unique(values):
+    values = np.sort(values)
+    return values[np.concatenate(([True], values[1:] != values[:-1]))] if values.size else values
+
+
+class CountEngine:
+    """
+    Count-based engine for the well-mixed games (PGGGame, PGGiGame, PGGSocialControl).
+
+    In a well-mixed population the payoff of a player only depends on its strategy and on
+    the number of players of each strategy, so the engine stores those counts only. Each
+    generation the game splits the population into classes of players with the same
+    strategy and payoff (``game.payoff_classes``), and the number of players of class a
+    that pick a model of class b, and of those the number that imitate it, are drawn from
+    multinomial and binomial distributions. A generation costs O(classes^2) instead of
+    O(N), independently of the population size.
+
+    As in the object engines every player picks a random model among the N players and
+    adopts its strategy with probability (payoff_model - payoff_player) * M, but the
+    payoffs are those of the current generation only (the player objects accumulate
+    theirs over the run) and all players update synchronously.
+
+    This is a different model from the object engine, not a faster version of it, and
+    the levels differ: for PGGSocialControl with N=5, r=4, alpha=0.5, gamma=1, delta=0.1,
+    no mutation and 2 DnI, 2 CnI, 1 CI players, the mean cooperation over 50 generations
+    is 0.37 with this engine and 0.21 with the object engine. The distributions of the
+    counts are close to those of :class:`evosim.games.markov.MarkovChain` at small N. The
+    inspections are a further approximation: the hits of the defectors are drawn
+    independently for every defector (see ``hit_classes``), so the number of
+    inspections of a round is only right on average.
+
+    :param game: well-mixed game implementing init_counts, set_counts and payoff_classes
+    """
+
+    def __init__(self, game):
+        self.game = game
+        self.counts = None
+
+    def init_population(self, **kwargs):
+        self.counts = self.game.init_counts(**kwargs)
+        self.game.set_counts(self.counts)
+
+    def get_state(self):
+        return {} if self.counts is None else {'counts': self.counts}
+
+    def set_state(self, state):
+        if 'counts' in state:
+            self.counts = np.array(state['counts'], dtype=np.int64)
+            self.game.set_counts(self.counts)
+
+    def imitation(self, strategy, size, payoff):
+        """
+        :param strategy: strategy of each class
+        :param size: number of players in each class
+        :param payoff: payoff of the players of each class
+        :return: number of players of each strategy after the imitation step
+        """
+        game = self.game
+        models = game.rng.multinomial(size, size / game.N)
+        prob = np.clip((payoff[np.newaxis, :] - payoff[:, np.newaxis]) * game.M, 0.0, 1.0)
+        switch = game.rng.binomial(models, prob)
+
+        counts = self.counts.copy()
+        counts -= np.bincount(strategy, weights=switch.sum(axis=1), minlength=counts.size).astype(np.int64)
+        counts += np.bincount(strategy, weights=switch.sum(axis=0), minlength=counts.size).astype(np.int64)
+        return counts
+
+    def mutate(self, counts):
+        """
+        :param counts: number of players of each strategy
+        :return: counts after every player switched with probability game.mutation to
+                 another strategy, chosen at random
+        """
+        game = self.game
+        strategies = counts.size
+        mutants = game.rng.binomial(counts, game.mutation)
+        counts = counts - mutants
+        for strategy in np.flatnonzero(mutants):
+            counts += np.insert(game.rng.multinomial(mutants[strategy], [1.0 / (strategies - 1)] * (strategies - 1)),
+                                strategy, 0)
+        return counts
+
+    def run(self):
+        game = self.game
+        timer = game.timer
+        for game.current_generation in game.generation_range():
+            strategy, size, payoff = game.payoff_classes(self.counts)
+            timer.lap('payoff')
+            self.counts = self.imitation(strategy, np.asarray(size, dtype=np.int64), payoff)
+            timer.lap('selection')
+            if game.mutation > 0:
+                self.counts = self.mutate(self.counts)
+                timer.lap('mutation')
+            game.set_counts(self.counts)
+
+            logger.debug("[%d] counts = %s", game.current_generation, self.counts)
+            # Update Simulation data
+            game.update_sim_data()
+            if game.end_generation():
+                break
+
+
+class EventEngine(CountEngine):
+    """
+    Event-driven (Gillespie) engine for the well-mixed games, in continuous time.
+
+    Every player revises its strategy at rate 1, so a generation is one unit of time: it
+    picks a random model among the N players and adopts its strategy with probability
+    (payoff_model - payoff_player) * M. Only the revisions that change a strategy are
+    simulated. With the classes of ``game.payoff_classes``, players of class a adopt the
+    strategy of class b at rate n_a n_b / N p_ab, the waiting time to the next change is
+    exponential with the total rate R, and the change is drawn with probability
+    rate / R. Each change costs O(classes^2) and the generations without changes cost
+    almost nothing, so near equilibria, where R is small, the engine is much faster than
+    the synchronous engines; when there are many changes per generation CountEngine is
+    faster. The payoff classes are drawn again after every change, so in the games with
+    random inspections the payoffs are those of the latest round. Mutations are changes
+    at rate game.mutation per player. The time of the next change and the rates it was
+    drawn from are part of the state, so a run continued from a checkpoint draws the
+    same changes.
+
+    :param game: well-mixed game implementing init_counts, set_counts and payoff_classes
+    """
+
+    def __init__(self, game):
+        super().__init__(game)
+        self.event_time = None
+        self.changes = None
+
+    def init_population(self, **kwargs):
+        super().init_population(**kwargs)
+        self.event_time = None
+
+    def get_state(self):
+        state = super().get_state()
+        if self.event_time is not None:
+            state['event_time'] = self.event_time
+            state['source'], state['target'], state['rates'] = self.changes
+        return state
+
+    def set_state(self, state):
+        super().set_state(state)
+        self.event_time = None
+        if 'event_time' in state:
+            self.event_time = float(state['event_time'])
+            self.changes = tuple(np.array(state[name]) for name in ('source', 'target', 'rates'))
+
+    def rates(self):
+        """
+        :return: source strategy, target strategy and rate of every kind of change: the
+                 imitations of the classes of the other strategies and, with mutation,
+                 the switches of a player to each other strategy at rate mutation /
+                 (strategies - 1)
+        """
+        game = self.game
+        strategy, size, payoff = game.payoff_classes(self.counts)
+        size = np.asarray(size, dtype=np.float64)
+        prob = np.clip((payoff[np.newaxis, :] - payoff[:, np.newaxis]) * game.M, 0.0, 1.0)
+        rates = size[:, np.newaxis] * size[np.newaxis, :] / game.N * prob
+        source, target = np.meshgrid(strategy, strategy, indexing='ij')
+        if game.mutation > 0:
+            strategies = self.counts.size
+            mutation = np.repeat(self.counts * game.mutation / (strategies - 1), strategies)
+            mutation_source, mutation_target = np.divmod(np.arange(strategies ** 2), strategies)
+            source = np.concatenate((source.ravel(), mutation_source))
+            target = np.concatenate((target.ravel(), mutation_target))
+            rates = np.concatenate((rates.ravel(), mutation))
+        rates = np.where(source == target, 0.0, rates).ravel()
+        return source.ravel(), target.ravel(), rates
+
+    def run(self):
+        game = self.game
+        rng = game.rng
+        if not game.start_generation:
+            # New run, the next change is drawn in the first generation
+            self.event_time = None
+        for game.current_generation in game.generation_range():
+            if self.event_time is None:
+                self.changes = self.rates()
+                self.event_time = game.current_generation + self.waiting_time(self.changes[2])
+            # Changes in (generation, generation + 1]
+            while self.event_time <= game.current_generation + 1:
+                source, target, rates = self.changes
+                cumulative = np.cumsum(rates)
+                change = int(np.searchsorted(cumulative, rng.random() * cumulative[-1], side='right'))
+                self.counts[source[change]] -= 1
+                self.counts[target[change]] += 1
+                self.changes = self.rates()
+                self.event_time += self.waiting_time(self.changes[2])
+            game.timer.lap('events')
+            game.set_counts(self.counts)
+
+            logger.debug("[%d] counts = %s", game.current_generation, self.counts)
+            # Update Simulation data
+            game.update_sim_data()
+            if game.end_generation():
+                break
+
+    def waiting_time(self, rates):
+        total = rates.sum()
+        return self.game.rng.exponential(1.0 / total) if total > 0 else np.inf
+
+
+class BatchEngine:
+    """
+    Batched engine for the well-mixed PGGGame and PGGiGame.
+
+    R independent replicas of the game, optionally for several values of r, evolve
+    together as (batch x population) arrays, so the Python overhead of a generation is
+    paid once for the whole batch. Each replica follows the object engine: payoffs
+    accumulate over the run, inspectors inspect a random other player, and every player
+    evolves in turn towards a random model, seeing the new strategy of the players
+    updated before it in the same generation.
+
+    :param game: PGGGame or PGGiGame
+    """
+
+    def __init__(self, game):
+        self.game = game
+        self.coopLevel = None
+        self.inspLevel = None
+
+    def payoffs(self, nc, ni, r):
+        """
+        Evaluate the payoff functions of the game for every replica at once.
+
+        :return: payoff of a cooperator and of a defector, arrays of shape (batch, 1)
+        """
+        game = self.game
+        saved = game.nc, getattr(game, 'ni', None), game.r
+        game.nc, game.r = nc, r
+        if saved[1] is not None:
+            game.ni = ni
+        try:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return game.calculate_payoff(0), game.calculate_payoff(1)
+        finally:
+            game.nc, game.r = saved[0], saved[2]
+            if saved[1] is not None:
+                game.ni = saved[1]
+
+    def run(self, replicas=1, r_values=None, ncoop=0.5, ninsp=0.0):
+        """
+        :param replicas: number of independent replicas per value of r
+        :param r_values: values of r, by default the r of the game
+        :param ncoop: initial fraction of cooperators
+        :param ninsp: initial fraction of inspectors (PGGiGame)
+        :return: coopLevel and inspLevel of every replica, arrays of shape
+                 (len(r_values) * replicas, generations), replicas of the same r being
+                 consecutive rows
+        """
+        game = self.game
+        inspection = hasattr(game, 'nu')
+        r_values = [game.r] if r_values is None else r_values
+        r = np.repeat(np.asarray(r_values, dtype=np.float64), replicas)[:, np.newaxis]
+        batch, n = r.shape[0], game.N
+        rows = np.arange(batch)[:, np.newaxis]
+        position = np.arange(n)[np.newaxis, :]
+
+        # Same initial strategies and normalisation as init_population and init_game
+        prob = game.rng.random((batch, n))
+        action = np.where(prob < ncoop, 0, np.where(prob < ncoop + ninsp, 2, 1)).astype(np.int8)
+        max_p = self.payoffs(n - 1, 0, r)[1]
+        min_p = self.payoffs(1, 0, r)[0]
+        norm = 1.0 / (max_p - min_p)
+        total_payoff = np.zeros((batch, n), dtype=np.float64)
+
+        self.coopLevel = np.zeros((batch, game.generations), dtype=np.float64)
+        self.inspLevel = np.zeros((batch, game.generations), dtype=np.float64)
+        nc = np.count_nonzero(action == 0, axis=1)[:, np.newaxis]
+        ni = np.count_nonzero(action == 2, axis=1)[:, np.newaxis]
+        timer = game.timer
+        timer.start()
+        for generation in range(game.generations + game.threshold):
+            # Calculate payoffs
+            payoff_c, payoff_d = self.payoffs(nc, ni, r)
+            payoff = np.where(action == 0, payoff_c, payoff_d)
+            if inspection:
+                payoff[action == 2] = 0
+                inspector_row, inspector = np.nonzero(action == 2)
+                if inspector.size:
+                    # A random player other than the inspector
+                    inspected = game.rng.integers(0, n - 1, size=inspector.size)
+                    inspected += inspected >= inspector
+                    found = action[inspector_row, inspected] == 1
+                    inspector_row, inspector, inspected = inspector_row[found], inspector[found], inspected[found]
+                    gain = payoff_d[inspector_row, 0] * float(game.nu)
+                    payoff[inspector_row, inspector] = gain
+                    np.add.at(payoff, (inspector_row, inspected), -gain)
+            total_payoff += payoff
+            timer.lap('payoff')
+
+            # Evolve
+            model = game.rng.integers(0, n, size=(batch, n))
+            diff = total_payoff[rows, model] - total_payoff
+            switch = (diff > 0) & (game.rng.random((batch, n)) < diff * norm)
+            action = self.sequential_update(action, model, switch)
+            timer.lap('selection')
+            if game.mutation > 0:
+                mutants = skip_sample(action.size, game.mutation, game.rng)
+                shift = 1 + game.rng.integers(0, game.strategies - 1, size=mutants.size)
+                flat_action = action.ravel()
+                flat_action[mutants] = (flat_action[mutants] + shift) % game.strategies
+                timer.lap('mutation')
+
+            nc = np.count_nonzero(action == 0, axis=1)[:, np.newaxis]
+            ni = np.count_nonzero(action == 2, axis=1)[:, np.newaxis]
+            logger.debug("[%d] ncoop = %s", generation, nc.ravel())
+            if generation > game.threshold:
+                self.coopLevel[:, generation - game.threshold] = nc[:, 0] / n
+                self.inspLevel[:, generation - game.threshold] = ni[:, 0] / n
+            timer.lap('bookkeeping')
+
+        return self.coopLevel, self.inspLevel
+
+    @staticmethod
+    def sequential_update(action, model, switch):
+        """
+        New strategies when players 0..N-1 of every replica copy, one after the other, the
+        current strategy of their model: a player that switches to a model already visited
+        in this generation takes the model's new strategy.
+        """
+        batch, n = action.shape
+        flat_action = action.ravel()
+        flat_model = (model + (np.arange(batch) * n)[:, np.newaxis]).ravel()
+        flat_switch = switch.ravel()
+        new_action = np.where(flat_switch, flat_action[flat_model], flat_action)
+
+        # Players copying a model visited before them: follow the chain of such models
+        # until one whose new strategy is already known
+        pending = flat_switch & (model < np.arange(n)[np.newaxis, :]).ravel()
+        players = np.flatnonzero(pending)
+        target = flat_model[players]
+        while players.size:
+            known = ~pending[target]
+            new_action[players[known]] = new_action[target[known]]
+            players, target = players[~known], flat_model[target[~known]]
+        return new_action.reshape(batch, n).astype(np.int8)
+
+
+def hit_classes(targets, hits, rng):
+    """
+    Split ``targets`` players among which ``hits`` uniformly random hits fall (inspections
+    of defectors) by the number of hits they receive.
+
+    Each target is taken to receive Binomial(hits, 1/targets) hits independently of the
+    others, so the total is ``hits`` on average only. The distribution is evaluated on a
+    window of +-12 standard deviations around its mean.
+
+    :param targets: number of players that can be hit
+    :param hits: number of hits
+    :param rng: numpy Generator
+    :return: number of hits and number of targets receiving them, for each non-empty class
+    """
+    if targets == 0 or hits == 0:
+        return np.zeros(1, dtype=np.int64), np.array([targets], dtype=np.int64)
+    if targets == 1:
+        return np.array([hits], dtype=np.int64), np.ones(1, dtype=np.int64)
+
+    p = 1.0 / targets
+    mean = hits * p
+    sd = sqrt(hits * p * (1 - p))
+    low = max(0, int(floor(mean - 12 * sd)) - 1)
+    high = min(hits, int(ceil(mean + 12 * sd)) + 1)
+    k = np.arange(low, high + 1)
+
+    # log of the binomial coefficients, computed incrementally from the lowest one
+    log_binomial = lgamma(hits + 1) - lgamma(low + 1) - lgamma(hits - low + 1) + \
+        np.concatenate(([0.0], np.cumsum(np.log((hits - k[:-1]) / (k[:-1] + 1.0)))))
+    pmf = np.exp(log_binomial + k * log(p) + (hits - k) * log(1 - p))
+    counts = rng.multinomial(targets, pmf / pmf.sum())
+    keep = counts > 0
+    return k[keep], counts[keep]
@@ -19,11 +19,52 @@
 import numpy as np
 import logging
 
+from evosim.games.engines import ArrayNetworkEngine, BatchEngine, CountEngine, EventEngine, \
+    IncrementalNetworkEngine, hit_classes
+from evosim.network.graph import Graph
+from evosim.players.population import Population, get_players_state, set_players_state
+from evosim.rng import RandomStream, global_seed, make_generator, skip_sample
+from evosim.statistics.observer import snapshot
+from evosim.statistics.timer import NULL_TIMER
+
 logger = logging.getLogger(__name__)
 
 
 class AbstractGame:
-    def __init__(self, threshold, generations, population):
+    """
+    engines: alternative engines of the game, by name. The default 'object' engine
+             runs the game on the player objects of the population.
+    convergence: optional :class:`evosim.statistics.convergence.ConvergenceMonitor`
+                 that stops the runs in absorbing or stationary states
+    recorder: optional :class:`evosim.statistics.recorder.Recorder` that samples
+              observables of the runs
+    checkpoint: optional :class:`evosim.simulation.checkpoint.Checkpoint`, saved at the
+                end of a generation when its interval has elapsed
+    start_generation: generation at which the next run starts, set by set_state to
+                      continue a saved run
+    rng, stream: numpy Generator of the game and RandomStream of scalar numbers drawn
+                 from it (see seed)
+    mutation: probability that a player switches to another strategy, chosen at
+              random among the ``strategies`` strategies of the game, at the end of each
+              generation
+    parameters: names of the attributes that describe the game, see get_params
+    timer: :class:`evosim.statistics.timer.PhaseTimer` that the game loops and engines
+           report the time of their phases to; the default NULL_TIMER records nothing
+    observers: :class:`evosim.statistics.observer.Observer` objects receiving snapshots
+               of the runs, see add_observer
+    unit: key of the work unit of the current run, set by the simulations and passed to
+          the observers
+    """
+    engines = {}
+    strategies = 2
+    parameters = ('N', 'threshold', 'generations', 'mutation', 'engine')
+
+    def __init__(self, threshold, generations, population, engine='object', convergence=None, recorder=None,
+                 mutation=0.0):
+        if engine != 'object' and engine not in self.engines:
+            raise ValueError("Unknown engine '%s'" % engine)
+        if engine == 'object' and isinstance(population, Population):
+            raise ValueError("The object engine needs a dict of player objects")
         self.threshold = threshold
         self.generations = generations
         self.population = population
@@ -31,16 +72,222 @@ class AbstractGame:
         self.nc = 0
         self.coopLevel = np.arange(0, generations, dtype=np.float64)
         self.current_generation = 0
+        self.engine = engine
+        self._engine = None
+        self.convergence = convergence
+        self.recorder = recorder
+        self.mutation = mutation
+        self.timer = NULL_TIMER
+        self.observers = []
+        self.unit = None
+        self.converged = None
+        self.converged_generation = None
+        self.checkpoint = None
+        self.start_generation = 0
+        self._first_generation = 0
+        self._resumed = False
+        self._rng = None
+        self._stream = None
+
+    def seed(self, seed=None):
+        """
+        Give the game a new random stream, shared by its engine and its player objects.
+
+        :param seed: None, int, SeedSequence or Generator; if None the seed is drawn from
+                     the global numpy generator
+        """
+        self._rng = make_generator(global_seed() if seed is None else seed)
+        self._stream = RandomStream(self._rng)
+        if self.engine == 'object':
+            for player in self.population.values():
+                player.rng = self._stream
+
+    @property
+    def rng(self):
+        if self._rng is None:
+            self.seed()
+        return self._rng
+
+    @property
+    def stream(self):
+        if self._stream is None:
+            self.seed()
+        return self._stream
+
+    def get_engine(self):
+        """
+        :return: the engine instance, created on first use, or None for the object engine
+        """
+        if self._engine is None and self.engine != 'object':
+            self._engine = self.engines[self.engine](self)
+        return self._engine
 
     def calculate_payoff(self, action):
         pass
 
+    def is_absorbing(self):
+        """
+        :return: True if the population can no longer change
+        """
+        return False
+
+    def mutate_players(self):
+        """
+        Mutation step of the object engine. The mutants are drawn with ``skip_sample``,
+        so the step costs O(N mutation) instead of a random number per player.
+
+        :return: list of the mutant players
+        """
+        mutants = [self.population[pid] for pid in skip_sample(self.N, self.mutation, self.rng).tolist()]
+        for player in mutants:
+            self.count_player(player, -1)
+            player.mutate(self.strategies)
+            self.count_player(player, 1)
+        return mutants
+
+    def count_player(self, player, sign):
+        """
+        Add (sign=1) or remove (sign=-1) the player from the strategy counts of the game.
+        """
+        self.nc += sign * (player.action == 0)
+
+    def end_generation(self):
+        """
+        Called by the game loops once the data of the current generation are stored in
+        coopLevel/inspLevel: feeds the recorder and checks convergence.
+
+        :return: True if the run can stop
+        """
+        if self.current_generation == self._first_generation and not self._resumed:
+            self.converged = None
+            self.converged_generation = None
+            if self.recorder is not None:
+                self.recorder.start(self)
+        if self.recorder is not None:
+            self.recorder.record(self)
+        if self.checkpoint is not None and self.checkpoint.due():
+            self.checkpoint.save(self)
+        stop = self.convergence is not None and self.convergence.check(self)
+        if self.recorder is not None and (stop or self.current_generation == self.generations + self.threshold - 1):
+            self.recorder.finish()
+        if self.observers:
+            self.notify(stop or self.current_generation == self.generations + self.threshold - 1)
+        self.timer.lap('bookkeeping')
+        return stop
+
+    def add_observer(self, observer):
+        self.observers.append(observer)
+
+    def remove_observer(self, observer):
+        self.observers.remove(observer)
+
+    def notify(self, final):
+        """
+        Pass a snapshot of the current generation to the observers that are due.
+
+        :param final: True at the end of the run
+        """
+        state = None
+        generation = self.current_generation - self._first_generation
+        for observer in self.observers:
+            if final:
+                state = state or snapshot(self, final=True)
+                observer.finish(state)
+            elif observer.every and generation % observer.every == 0:
+                state = state or snapshot(self)
+                observer.update(state)
+
+    def generation_range(self):
+        """
+        :return: generations of the next run, from start_generation (which is then reset)
+        """
+        self._first_generation = self.start_generation
+        # A run continued by set_state keeps its convergence state and recorded samples
+        self._resumed = self.start_generation > 0
+        self.start_generation = 0
+        if self._rng is None:
+            self.seed()
+        self.timer.start()
+        return range(self._first_generation, self.generations + self.threshold)
+
+    def get_state(self):
+        """
+        State needed to continue the current run: generation, counters, recorded levels,
+        state of the population (arrays of the engine or attributes of the player objects)
+        and samples of the recorder.
+
+        :return: dict of numbers, strings and numpy arrays
+        """
+        state = {'current_generation': self.current_generation, 'nc': self.nc, 'coopLevel': self.coopLevel,
+                 'converged': self.converged, 'converged_generation': self.converged_generation}
+        for name in ('ni', 'nd', 'inspLevel'):
+            if hasattr(self, name):
+                state[name] = getattr(self, name)
+        state['population'] = self.get_population_state()
+        state['rng'] = self.stream.get_state()
+        if self.recorder is not None and self.recorder.buffers:
+            state['recorder'] = self.recorder.get_state()
+        return state
+
+    def get_params(self):
+        """
+        :return: dict of the parameters of the game, e.g. to label stored results
+        """
+        return {name: getattr(self, name) for name in self.parameters}
+
+    def get_population_state(self):
+        """
+        :return: copy of the state of the population (arrays of the engine or attributes of
+                 the player objects)
+        """
+        engine = self.get_engine()
+        if engine is None:
+            return get_players_state(self.population)
+        return {name: np.copy(value) for name, value in engine.get_state().items()}
+
+    def set_population_state(self, state):
+        engine = self.get_engine()
+        if engine is not None:
+            engine.set_state(state)
+        else:
+            set_players_state(self.population, state)
+
+    def set_state(self, state):
+        """
+        Restore a state saved by get_state; the next call to run continues that run. The
+        game must have been initialised (init_game) with the same parameters.
+        """
+        self.current_generation = int(state['current_generation'])
+        self.start_generation = self.current_generation + 1
+        self.converged = state['converged']
+        self.converged_generation = state['converged_generation']
+        for name in ('nc', 'ni', 'nd'):
+            if name in state:
+                setattr(self, name, int(state[name]))
+        self.coopLevel[:] = state['coopLevel']
+        if 'inspLevel' in state:
+            self.inspLevel[:] = state['inspLevel']
+        if hasattr(self, 'after_threshold'):
+            if self.current_generation > self.threshold:
+                self.update_sim_data = self.after_threshold
+            else:
+                self.update_sim_data = self.before_threshold
+        self.set_population_state(state['population'])
+        self.stream.set_state(state['rng'])
+        if self.recorder is not None:
+            if 'recorder' in state:
+                self.recorder.set_state(self, state['recorder'])
+            else:
+                logger.warning("The checkpoint has no recorded samples, recording from generation %d",
+                               self.start_generation)
+                self.recorder.start(self)
+
     def init_game(self):
         pass
 
     def init_population(self, ncoop=0.5, ninsp=0.0):
         for player in self.population.values():
-            prob = np.random.uniform(0, 1)
+            prob = self.stream.random()
             action = 1
             if prob < ncoop:
                 action = 0
@@ -51,7 +298,7 @@ class AbstractGame:
 
     def run(self):
         avg_payoff = 0
-        for self.current_generation in range(self.generations + self.threshold):
+        for self.current_generation in self.generation_range():
             # Count cooperators
             self.nc = 0
             for player in self.population.values():
@@ -63,7 +310,9 @@ class AbstractGame:
             avg_payoff /= len(self.population)
             if self.current_generation > self.threshold:
                 self.coopLevel[self.current_generation-self.threshold] = self.nc / self.N
-            logger.debug("[" + str(self.current_generation) + "] ncoop = " + str(self.nc))
+            logger.debug("[%d] ncoop = %d", self.current_generation, self.nc)
+            if self.end_generation():
+                break
 
     def step(self):
         pass
@@ -87,10 +336,28 @@ class NIPDGame(AbstractGame):
 
 
 class PGGGame(AbstractGame):
-    def __init__(self, population, threshold=0, generations=100, r=1.0, cost=1.0):
-        super().__init__(threshold, generations, population)
+    """
+    Well-mixed public goods game.
+
+    engine: object - every player object computes its payoff and evolves
+            counts - only the number of players of each strategy is stored
+                     (see :class:`evosim.games.engines.CountEngine`)
+            events - asynchronous updates in continuous time, simulated change by
+                     change (see :class:`evosim.games.engines.EventEngine`)
+            Both use the payoffs of the current generation, not the accumulated ones
+            of the player objects, so their levels differ from those of 'object'.
+    """
+    engines = {'counts': CountEngine, 'events': EventEngine}
+    parameters = AbstractGame.parameters + ('r', 'c')
+
+    def __init__(self, population, threshold=0, generations=100, r=1.0, cost=1.0, mutation=0.0, engine='object',
+                 convergence=None, recorder=None):
+        super().__init__(threshold, generations, population, engine=engine, convergence=convergence,
+                         recorder=recorder, mutation=mutation)
         self.r = r
         self.c = cost
+        self.M = 0
+        self.update_sim_data = self.before_threshold
 
     def calculate_payoff(self, action):
         payoff = (self.nc*self.r*self.c)/self.N
@@ -104,31 +371,102 @@ class PGGGame(AbstractGame):
         max_p = self.calculate_payoff(1)  # Max payoff
         self.nc = 1
         min_p = self.calculate_payoff(0)  # Min payoff
+        self.M = 1.0/(max_p-min_p)
         self.nc = 0
+        self.update_sim_data = self.before_threshold
+        if self.engine != 'object':
+            return
         # Get number of cooperators
         for player in self.population.values():
             player.set_m_payoffs(max_p=max_p, min_p=min_p)
             self.nc += 0 if player.action else 1
 
+    def init_population(self, ncoop=0.5, ninsp=0.0):
+        if self.engine != 'object':
+            self.get_engine().init_population(ncoop=ncoop, ninsp=ninsp)
+            return
+        super().init_population(ncoop=ncoop, ninsp=ninsp)
+
+    def init_counts(self, ncoop=0.5, ninsp=0.0):
+        """
+        Initial number of players of each strategy (C, D) for the counts engine.
+        """
+        nc = self.rng.binomial(self.N, ncoop)
+        return np.array([nc, self.N - nc], dtype=np.int64)
+
+    def set_counts(self, counts):
+        self.nc = int(counts[0])
+
+    def payoff_classes(self, counts):
+        """
+        Split the population in classes of players sharing strategy and payoff.
+
+        :param counts: number of players of each strategy
+        :return: strategy, size and payoff of each class
+        """
+        self.set_counts(counts)
+        return np.arange(2), counts, np.array([self.calculate_payoff(0), self.calculate_payoff(1)])
+
     def run(self):
-        for self.current_generation in range(self.generations + self.threshold):
+        if self.engine != 'object':
+            self.get_engine().run()
+            return
+
+        timer = self.timer
+        for self.current_generation in self.generation_range():
             # Calculate payoffs
             for player in self.population.values():
                 player.update_payoff(self.calculate_payoff(player.action))
+            timer.lap('payoff')
             # Evolve
+            self.nc = 0
             for player in self.population.values():
                 # Call evolve and update number of cooperators
-                dc, = player.evolve(self.population[np.random.randint(0, self.N)])
-                self.nc += dc
+                player.evolve(self.population[self.stream.integers(self.N)])
+                self.nc += 0 if player.action else 1
+            timer.lap('selection')
+            self.mutate_players()
+            timer.lap('mutation')
 
-            if self.current_generation > self.threshold:
-                self.coopLevel[self.current_generation-self.threshold] = self.nc / self.N
-            logger.debug("[" + str(self.current_generation) + "] ncoop = " + str(self.nc))
+            logger.debug("[%d] ncoop = %d", self.current_generation, self.nc)
+            self.update_sim_data()
+            if self.end_generation():
+                break
+
+    def is_absorbing(self):
+        # Without mutation a monomorphic population stays monomorphic
+        return self.mutation <= 0 and self.nc in (0, self.N)
+
+    def run_batch(self, replicas=1, r_values=None, ncoop=0.5, ninsp=0.0):
+        """
+        Run independent replicas of the game, for one or several values of r, together
+        (see :class:`evosim.games.engines.BatchEngine`).
+
+        :param replicas: number of replicas per value of r
+        :param r_values: values of r, by default self.r
+        :param ncoop: initial fraction of cooperators
+        :param ninsp: initial fraction of inspectors
+        :return: coopLevel and inspLevel matrices, one row per replica
+        """
+        return BatchEngine(self).run(replicas=replicas, r_values=r_values, ncoop=ncoop, ninsp=ninsp)
+
+    def before_threshold(self):
+        if self.current_generation > self.threshold:
+            self.update_sim_data = self.after_threshold
+            self.update_sim_data()
+
+    def after_threshold(self):
+        self.coopLevel[self.current_generation-self.threshold] = self.nc / self.N
 
 
 class PGGiGame(PGGGame):
-    def __init__(self, population, threshold=0, generations=100, r=1.0, cost=1.0, nu=1.0):
-        super().__init__(population, threshold=threshold, generations=generations, r=r, cost=cost)
+    strategies = 3
+    parameters = PGGGame.parameters + ('nu',)
+
+    def __init__(self, population, threshold=0, generations=100, r=1.0, cost=1.0, nu=1.0, mutation=0.0,
+                 engine='object', convergence=None, recorder=None):
+        super().__init__(population, threshold=threshold, generations=generations, r=r, cost=cost,
+                         mutation=mutation, engine=engine, convergence=convergence, recorder=recorder)
         self.nu = nu
         self.ni = 0
         self.inspLevel = np.arange(0, generations, dtype=np.float64)
@@ -140,10 +478,17 @@ class PGGiGame(PGGGame):
         else:
             return payoff - self.c
 
+    def is_absorbing(self):
+        return self.mutation <= 0 and max(self.nc, self.ni, self.N - self.nc - self.ni) == self.N
+
+    def count_player(self, player, sign):
+        self.nc += sign * (player.action == 0)
+        self.ni += sign * (player.action == 2)
+
     def get_inspected_player(self, pid):
-        iid = np.random.randint(0, self.N)
+        iid = self.stream.integers(self.N)
         while iid == pid:
-            iid = np.random.randint(0, self.N)
+            iid = self.stream.integers(self.N)
         if self.population[iid].action != 1:
             iid = -1
         return iid
@@ -157,15 +502,55 @@ class PGGiGame(PGGGame):
         max_p = self.calculate_payoff(1)  # Max payoff
         self.nc = 1
         min_p = self.calculate_payoff(0)  # Min payoff
+        self.M = 1.0/(max_p-min_p)
         self.nc = 0
+        self.update_sim_data = self.before_threshold
+        if self.engine != 'object':
+            return
         # Get number of cooperators
         for player in self.population.values():
             player.set_m_payoffs(max_p=max_p, min_p=min_p)
             self.nc += 0 if player.action else 1
             self.ni += 1 if (player.action == 2) else 0
 
+    def init_counts(self, ncoop=0.5, ninsp=0.0):
+        """
+        Initial number of players of each strategy (C, D, I) for the counts engine.
+        """
+        return self.rng.multinomial(self.N, [ncoop, 1.0 - ncoop - ninsp, ninsp]).astype(np.int64)
+
+    def set_counts(self, counts):
+        self.nc = int(counts[0])
+        self.ni = int(counts[2])
+
+    def payoff_classes(self, counts):
+        """
+        Every inspector inspects a random player; the ``K`` inspectors that find a defector
+        earn ``nu`` times the payoff of a defector, which is taken from the defector each
+        time it is found. The hits of the defectors are drawn independently, each
+        defector being found by each of the ``K`` inspectors with probability 1/nd.
+        """
+        self.set_counts(counts)
+        if self.ni == self.N:
+            return np.array([2]), counts[2:], np.zeros(1)
+        nd = int(counts[1])
+        payoff_c = self.calculate_payoff(0)
+        payoff_d = self.calculate_payoff(1)
+        found = self.rng.binomial(self.ni, nd / (self.N - 1)) if self.ni and nd else 0
+        hits, defectors = hit_classes(nd, found, self.rng)
+
+        strategy = np.concatenate(([0], np.ones(hits.size, dtype=np.int64), [2, 2]))
+        size = np.concatenate(([counts[0]], defectors, [found, self.ni - found]))
+        payoff = np.concatenate(([payoff_c], payoff_d - hits * payoff_d * self.nu, [payoff_d * self.nu, 0]))
+        return strategy, size, payoff
+
     def run(self):
-        for self.current_generation in range(self.generations + self.threshold):
+        if self.engine != 'object':
+            self.get_engine().run()
+            return
+
+        timer = self.timer
+        for self.current_generation in self.generation_range():
             # Calculate payoffs
             for pid, player in self.population.items():
                 if player.action != 2:
@@ -181,36 +566,73 @@ class PGGiGame(PGGGame):
                     player.last_payoff = payoff
                     player.total_payoff += payoff
                     player.ngame += 1
+            timer.lap('payoff')
 
             # Evolve
             self.nc = 0
             self.ni = 0
             for player in self.population.values():
                 # Call evolve and update number of cooperators
-                player.evolve(self.population[np.random.randint(0, self.N)])
+                player.evolve(self.population[self.stream.integers(self.N)])
 
                 if player.action == 0:
                     self.nc += 1
                 elif player.action == 2:
                     self.ni += 1
+            timer.lap('selection')
+            self.mutate_players()
+            timer.lap('mutation')
 
-            logger.debug("[" + str(self.current_generation) + "] ncoop = " + str(self.nc) + " ninsp = " + str(self.ni))
-            if self.current_generation > self.threshold:
-                self.coopLevel[self.current_generation-self.threshold] = self.nc / self.N
-                self.inspLevel[self.current_generation-self.threshold] = self.ni / self.N
+            logger.debug("[%d] ncoop = %d ninsp = %d", self.current_generation, self.nc, self.ni)
+            self.update_sim_data()
+            if self.end_generation():
+                break
+
+    def after_threshold(self):
+        self.coopLevel[self.current_generation-self.threshold] = self.nc / self.N
+        self.inspLevel[self.current_generation-self.threshold] = self.ni / self.N
 
 
 class PGGiNetwork(PGGGame):
-    def __init__(self, population, threshold=0, generations=100, r=1.0, cost=1.0, nu=1.0):
-        super().__init__(population, threshold=threshold, generations=generations, r=r, cost=cost)
+    """
+    Public goods game with inspectors played on a network.
+
+    population: dict of PGGiPlayer/BMPlayer objects, or a
+                :class:`evosim.players.population.Population` with a network
+                (array engine only)
+    engine: object - every player object plays its group game and selection step
+            array - the whole population is simulated with array operations
+                    (see :class:`evosim.games.engines.ArrayNetworkEngine`)
+            incremental - array engine that only updates the groups of the players
+                          that changed action (see
+                          :class:`evosim.games.engines.IncrementalNetworkEngine`)
+    """
+    engines = {'array': ArrayNetworkEngine, 'incremental': IncrementalNetworkEngine}
+    strategies = 3
+    parameters = PGGGame.parameters + ('nu',)
+
+    def __init__(self, population, threshold=0, generations=100, r=1.0, cost=1.0, nu=1.0, mutation=0.0,
+                 engine='object', convergence=None, recorder=None):
+        super().__init__(population, threshold=threshold, generations=generations, r=r, cost=cost,
+                         mutation=mutation, engine=engine, convergence=convergence, recorder=recorder)
         self.nu = nu
         self.ni = 0
         self.inspLevel = np.arange(0, generations, dtype=np.float64)
-        self.update_sim_data = self.before_threshold
+        self._graph = None
+        self._neighbors_version = None
+        self._p_limits = None
 
     def calculate_payoff_game(self, action, nc, ni, k):
         return ((nc*self.r*self.c)/(k + 1 - ni)) - (1-action)*self.c
 
+    def is_absorbing(self):
+        # Without mutation the dynamics are frozen once cooperation has died out
+        return self.mutation <= 0 and self.nc == 0
+
+    def count_player(self, player, sign):
+        self.nc += sign * (player.action == 0)
+        self.ni += sign * (player.action == 2)
+
     def local_max_p(self, k):
         return (self.r*self.c*k)/(k + 1)
 
@@ -218,14 +640,64 @@ class PGGiNetwork(PGGGame):
         # return ((self.r/(k+1)) - 1)*self.c
         return (self.r - 1) * self.c
 
+    def get_graph(self):
+        """
+        :return: Graph of the population. For player objects it is read from the
+                 ``neighbors`` lists again only after they changed, which the network
+                 generators report with ``Graph.neighbors_changed`` (see also
+                 invalidate_limits).
+        """
+        if isinstance(self.population, Population):
+            return self.population.graph
+        if self._graph is None or self._neighbors_version != Graph.neighbors_version:
+            self._graph = Graph.from_players(self.population)
+            self._neighbors_version = Graph.neighbors_version
+        return self._graph
+
+    def invalidate_limits(self):
+        """
+        Read the graph of the player objects again and recompute maxP and minP, e.g. after
+        editing their ``neighbors`` lists by hand.
+        """
+        self._graph = None
+        self._p_limits = None
+
+    def p_limits(self, graph):
+        """
+        Payoff normalisation of the selection step, maxP and minP of every player: the
+        sums of local_max_p and local_min_p over its group, as in PGGiPlayer.set_p_limit.
+        They are computed once per graph, r and cost.
+
+        :param graph: Graph of the population
+        :return: arrays maxP and minP
+        """
+        if self._p_limits is None or self._p_limits[0] is not graph or self._p_limits[1] != (self.r, self.c):
+            degree = graph.degree.astype(np.int64)
+            local_max_p = np.broadcast_to(self.local_max_p(degree), graph.n).astype(np.float64)
+            local_min_p = np.broadcast_to(self.local_min_p(degree), graph.n).astype(np.float64)
+            self._p_limits = (graph, (self.r, self.c), graph.group_sum(local_max_p), graph.group_sum(local_min_p))
+        return self._p_limits[2], self._p_limits[3]
+
+    def run_batch(self, replicas=1, r_values=None, ncoop=0.5, ninsp=0.0):
+        """
+        The batched engine simulates well-mixed populations only, so it is not
+        available on a network.
+        """
+        raise ValueError("PGGiNetwork has no batched engine, run it with batch=False")
+
     def init_game(self):
         self.nc = 1
         self.ni = 1
         self.update_sim_data = self.before_threshold
 
     def init_population(self, ncoop=0.5, ninsp=0.0):
-        for player in self.population.values():
-            prob = np.random.uniform(0, 1)
+        if self.engine != 'object':
+            self.get_engine().init_population(ncoop=ncoop, ninsp=ninsp)
+            return
+
+        max_p, min_p = self.p_limits(self.get_graph())
+        for player, player_max_p, player_min_p in zip(self.population.values(), max_p.tolist(), min_p.tolist()):
+            prob = self.stream.random()
             action = 1
             if prob < ncoop:
                 action = 0
@@ -233,14 +705,21 @@ class PGGiNetwork(PGGGame):
                 action = 2
             player.init_action(action)
             player.init_params()
-            player.set_p_limit(self.local_max_p, self.local_min_p)
+            player.maxP = player_max_p
+            player.minP = player_min_p
 
     def run(self):
-        for self.current_generation in range(self.generations + self.threshold):
-            if self.nc > 0:
+        if self.engine != 'object':
+            self.get_engine().run()
+            return
+
+        timer = self.timer
+        for self.current_generation in self.generation_range():
+            if self.nc > 0 or self.mutation > 0:
                 # Calculate payoffs
                 for player in self.population.values():
                     player.play_group_game(self.calculate_payoff_game, self.nu)
+                timer.lap('payoff')
 
                 # Evolve
                 self.nc = 0
@@ -253,19 +732,19 @@ class PGGiNetwork(PGGGame):
                         self.nc += 1
                     elif player.action == 2:
                         self.ni += 1
+                timer.lap('selection')
+                self.mutate_players()
+                timer.lap('mutation')
 
                 # Init players
                 for player in self.population.values():
                     player.init_params()
 
-            logger.debug("[" + str(self.current_generation) + "] ncoop = " + str(self.nc) + " ninsp = " + str(self.ni))
+            logger.debug("[%d] ncoop = %d ninsp = %d", self.current_generation, self.nc, self.ni)
             # Update Simulation data
             self.update_sim_data()
-
-    def before_threshold(self):
-        if self.current_generation > self.threshold:
-            self.update_sim_data = self.after_threshold
-            self.update_sim_data()
+            if self.end_generation():
+                break
 
     def after_threshold(self):
         self.coopLevel[self.current_generation-self.threshold] = self.nc / self.N
@@ -273,15 +752,32 @@ class PGGiNetwork(PGGGame):
 
 
 class PGGSocialControl(AbstractGame):
+    """
+    Well-mixed public goods game with social control: inspectors punish the defectors
+    they inspect.
+
+    Strategies are numbered 2*inspector + action: 0 = DnI, 1 = CnI, 2 = DI, 3 = CI.
+
+    engine: object - every player object computes its payoff and evolves
+            counts - only the number of players of each strategy is stored
+                     (see :class:`evosim.games.engines.CountEngine`)
+            events - asynchronous updates in continuous time, simulated change by
+                     change (see :class:`evosim.games.engines.EventEngine`)
+    """
+    engines = {'counts': CountEngine, 'events': EventEngine}
+    strategies = 4
+    parameters = AbstractGame.parameters + ('r', 'c', 'alpha', 'gamma', 'delta')
+
     def __init__(self, population, threshold=0, generations=100, r=1.0, cost=1.0, alpha=0.5,
-                 gamma=1.0, delta=0.0, mutation=0.01):
-        super().__init__(threshold, generations, population)
+                 gamma=1.0, delta=0.0, mutation=0.01, engine='object', convergence=None,
+                 recorder=None):
+        super().__init__(threshold, generations, population, engine=engine, convergence=convergence,
+                         recorder=recorder, mutation=mutation)
         self.r = r
         self.c = cost
         self.alpha = alpha
         self.gamma = gamma
         self.delta = delta
-        self.mutation = mutation
         self.ni = 0
         self.nd = 0
         self.update_sim_data = self.before_threshold
@@ -293,6 +789,14 @@ class PGGSocialControl(AbstractGame):
     def calculate_payoff(self, action):
         return ((self.nc*self.r*self.c)/self.N) - action*self.c
 
+    def is_absorbing(self):
+        return self.mutation <= 0 and self.nc in (0, self.N) and self.ni in (0, self.N)
+
+    def count_player(self, player, sign):
+        self.nc += sign * player.action
+        self.nd += sign * (1 - player.action)
+        self.ni += sign * player.inspector
+
     def init_game(self):
         self.nc = self.N - 1
         max_p = self.calculate_payoff(0)  # Max payoff
@@ -314,6 +818,12 @@ class PGGSocialControl(AbstractGame):
         self.ni = num_ci + num_di
         self.nd = self.N - self.nc
 
+        if self.engine != 'object':
+            self.get_engine().init_population(counts=[num_dni, num_cni, num_di, num_ci])
+            return
+
+        self.defectors = []
+        self.inspectors = []
         stop = 0
         for fq in [[num_dni, 0, 0], [num_cni, 0, 1], [num_di, 1, 0], [num_ci, 1, 1]]:
             start = stop
@@ -327,17 +837,76 @@ class PGGSocialControl(AbstractGame):
                 if fq[1]:
                     self.inspectors.append((self.population[i]))
 
+    def init_counts(self, counts):
+        """
+        Initial number of players of each strategy (DnI, CnI, DI, CI) for the counts engine.
+        """
+        return np.array(counts, dtype=np.int64)
+
+    def set_counts(self, counts):
+        self.nc = int(counts[1] + counts[3])
+        self.ni = int(counts[2] + counts[3])
+        self.nd = self.N - self.nc
+
+    def set_state(self, state):
+        super().set_state(state)
+        if self.engine == 'object':
+            self.defectors = [player for player in self.population.values() if not player.action]
+            self.inspectors = [player for player in self.population.values() if player.inspector]
+
+    def payoff_classes(self, counts):
+        """
+        Each inspector inspects a random defector with probability alpha. An inspected
+        defector loses gamma times its payoff (once, however many times it is found) and
+        each inspection earns the inspector delta times the payoff of a defector. The
+        inspections of the defectors are drawn independently (see ``hit_classes``).
+        """
+        self.set_counts(counts)
+        dni, cni, di, ci = (int(count) for count in counts)
+        payoff_d = self.calculate_payoff(0)
+        payoff_c = self.calculate_payoff(1)
+
+        inspecting_di = inspecting_ci = inspected_dni = inspected_di = both = 0
+        if self.nd > 0:
+            inspecting_di = self.rng.binomial(di, self.alpha)
+            inspecting_ci = self.rng.binomial(ci, self.alpha)
+            hits, defectors = hit_classes(self.nd, inspecting_di + inspecting_ci, self.rng)
+            inspected = int(defectors[hits > 0].sum())
+            if inspected:
+                inspected_dni = self.rng.hypergeometric(dni, di, inspected)
+                inspected_di = inspected - inspected_dni
+                if inspected_di and inspecting_di:
+                    both = self.rng.hypergeometric(inspecting_di, di - inspecting_di, inspected_di)
+
+        punished = payoff_d * (1 - self.gamma)
+        reward = self.delta * payoff_d
+        strategy = np.array([0, 0, 1, 2, 2, 2, 2, 3, 3])
+        size = np.array([dni - inspected_dni, inspected_dni, cni,
+                         di - inspecting_di - inspected_di + both, inspecting_di - both, inspected_di - both, both,
+                         ci - inspecting_ci, inspecting_ci])
+        payoff = np.array([payoff_d, punished, payoff_c,
+                           payoff_d, payoff_d + reward, punished, punished + reward,
+                           payoff_c, payoff_c + reward])
+        return strategy, size, payoff
+
     def run(self):
-        for self.current_generation in range(self.generations + self.threshold):
+        if self.engine != 'object':
+            self.get_engine().run()
+            return
+
+        timer = self.timer
+        for self.current_generation in self.generation_range():
             # Calculate payoffs
             for player in self.population.values():
                 player.update_payoff(self.calculate_payoff(player.action))
+            timer.lap('payoff')
 
             # Inspection round
             if self.nd > 0:
                 for inspector in self.inspectors:
-                    if np.random.uniform(0, 1) < self.alpha:
-                        inspector.inspect(self.defectors[np.random.randint(0, len(self.defectors))], self.gamma, self.delta)
+                    if self.stream.random() < self.alpha:
+                        inspector.inspect(self.defectors[self.stream.integers(len(self.defectors))], self.gamma, self.delta)
+            timer.lap('inspection')
 
             # Selection
             self.nc = 0
@@ -347,7 +916,7 @@ class PGGSocialControl(AbstractGame):
             self.inspectors = []
             for player in self.population.values():
                 # Call evolve and update number of cooperators
-                player.selection(self.M, self.population[np.random.randint(0, self.N)])
+                player.selection(self.M, self.population[self.stream.integers(self.N)])
                 # Mutation ?
                 if player.action:
                     self.nc += 1
@@ -361,9 +930,16 @@ class PGGSocialControl(AbstractGame):
                     self.inspectors.append(player)
                 # Add defectors and inspectors to the list
                 # Restart the list
+            timer.lap('selection')
+            if self.mutate_players():
+                self.defectors = [player for player in self.population.values() if not player.action]
+                self.inspectors = [player for player in self.population.values() if player.inspector]
+            timer.lap('mutation')
 
             # Update Simulation data
             self.update_sim_data()
+            if self.end_generation():
+                break
 
     def before_threshold(self):
         if self.current_generation > self.threshold:
@@ -0,0 +1,231 @@
+# ==============================================================================
+# EvoSim
+# Copyright © 2016 Elias F. Domingos. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+
+import itertools
+import logging
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse import linalg
+
+logger = logging.getLogger(__name__)
+
+
+class MarkovChain:
+    """
+    Markov chain of the pairwise-comparison process of a well-mixed
+    :class:`evosim.games.games.PGGSocialControl` game with per-round payoffs.
+
+    The states are the numbers of DnI, CnI, DI and CI players (in the numbering of the
+    game), so there are (N+1)(N+2)(N+3)/6 of them. At each step a random player picks a
+    random model; with probability ``mutation`` it switches to one of the other three
+    strategies instead, otherwise it adopts the strategy of the model with probability
+    (payoff_model - payoff_player) * M. The imitation probability is averaged over the
+    inspection round of the game: every inspector inspects a random defector with
+    probability alpha, an inspected defector loses gamma times its payoff and every
+    inspection earns the inspector delta times the payoff of a defector. A generation
+    of the simulations corresponds to N steps.
+
+    The chain is exact for the process of the count engines, whose payoffs are those of
+    the current round (see :class:`evosim.games.engines.CountEngine`), with one player
+    revising per step; CountEngine revises all the players of a generation at once, and
+    its levels agree with those of the chain within the sampling error at small N. It
+    does not describe the player objects (engine='object'), which compare the payoffs
+    they accumulate over a run and reach very different levels. Mutation and imitation
+    are also exclusive here, while the engines imitate first and then mutate the
+    updated player with probability ``mutation``.
+
+    :param game: PGGSocialControl game, its r, cost, alpha, gamma, delta and mutation
+                 parameters define the chain
+    """
+
+    def __init__(self, game):
+        self.game = game
+        self.N = game.N
+        self.states = np.array([state for state in itertools.product(range(self.N + 1), repeat=3)
+                                if sum(state) <= self.N], dtype=np.int64)
+        self.states = np.column_stack((self.states, self.N - self.states.sum(axis=1)))
+        # Index of each state from its first three counts
+        self.lookup = np.full((self.N + 1,) * 3, -1, dtype=np.int64)
+        self.lookup[tuple(self.states[:, :3].T)] = np.arange(len(self.states))
+
+    def index(self, counts):
+        """
+        :param counts: number of DnI, CnI, DI and CI players
+        :return: index of the state
+        """
+        return int(self.lookup[tuple(counts[:3])])
+
+    def normalisation(self):
+        """
+        :return: the factor M of the imitation probability, computed as in
+                 ``PGGSocialControl.init_game`` without touching the state of the game
+        """
+        game = self.game
+        max_p = (self.N - 1) * game.r * game.c / self.N
+        max_p += game.delta * max_p
+        min_p = game.r * game.c / self.N - game.c
+        return 1.0 / (max_p - min_p)
+
+    def switch_probability(self, s, t, M=None):
+        """
+        Probability that a player with strategy s adopts the strategy t of its model, in
+        every state, averaged over the inspection round.
+
+        :param M: normalisation of the imitation probability, computed if not given
+        """
+        game = self.game
+        M = self.normalisation() if M is None else M
+        dni, cni, di, ci = self.states.T
+        nc = cni + ci
+        nd = self.N - nc
+        ni = di + ci
+        payoff_d = nc * game.r * game.c / self.N
+        payoff = {0: payoff_d, 1: payoff_d - game.c, 2: payoff_d, 3: payoff_d - game.c}
+
+        # Probability that one (q1) or two given defectors (q2) escape all inspectors
+        with np.errstate(divide='ignore', invalid='ignore'):
+            q1 = np.where(nd > 0, (1 - game.alpha / nd) ** ni, 1.0)
+            q2 = np.where(nd > 1, np.clip(1 - 2 * game.alpha / nd, 0, 1) ** ni, 1.0)
+        inspecting = np.where(nd > 0, game.alpha, 0.0)
+
+        focal_defects, model_defects = s in (0, 2), t in (0, 2)
+        if focal_defects and model_defects:
+            inspected = {(0, 0): q2, (1, 0): q1 - q2, (0, 1): q1 - q2, (1, 1): 1 - 2 * q1 + q2}
+        elif focal_defects:
+            inspected = {(0, 0): q1, (1, 0): 1 - q1}
+        elif model_defects:
+            inspected = {(0, 0): q1, (0, 1): 1 - q1}
+        else:
+            inspected = {(0, 0): 1.0}
+        focal_inspects = {0: 1 - inspecting, 1: inspecting} if s >= 2 else {0: 1.0}
+        model_inspects = {0: 1 - inspecting, 1: inspecting} if t >= 2 else {0: 1.0}
+
+        prob = np.zeros(len(self.states))
+        for (x_f, x_m), p_x in inspected.items():
+            for y_f, p_yf in focal_inspects.items():
+                for y_m, p_ym in model_inspects.items():
+                    payoff_f = payoff[s] + (-game.gamma * x_f + game.delta * y_f) * payoff_d
+                    payoff_m = payoff[t] + (-game.gamma * x_m + game.delta * y_m) * payoff_d
+                    prob += p_x * p_yf * p_ym * np.clip((payoff_m - payoff_f) * M, 0, 1)
+        return prob
+
+    def transition_matrix(self):
+        """
+        :return: sparse (CSR) single-step transition matrix for the current parameters of
+                 the game
+        """
+        mutation = self.game.mutation
+        M = self.normalisation()
+        rows, cols, values = [], [], []
+        for s, t in itertools.permutations(range(4), 2):
+            n_s, n_t = self.states[:, s], self.states[:, t]
+            prob = n_s / self.N * ((1 - mutation) * n_t / self.N * self.switch_probability(s, t, M) + mutation / 3)
+            valid = (n_s > 0) & (prob > 0)
+            target = self.states[valid].copy()
+            target[:, s] -= 1
+            target[:, t] += 1
+            rows.append(np.flatnonzero(valid))
+            cols.append(self.lookup[target[:, 0], target[:, 1], target[:, 2]])
+            values.append(prob[valid])
+
+        rows, cols, values = np.concatenate(rows), np.concatenate(cols), np.concatenate(values)
+        stay = 1 - np.bincount(rows, weights=values, minlength=len(self.states))
+        rows = np.concatenate((rows, np.arange(len(self.states))))
+        cols = np.concatenate((cols, np.arange(len(self.states))))
+        values = np.concatenate((values, stay))
+        return sparse.csr_matrix((values, (rows, cols)), shape=(len(self.states),) * 2)
+
+    def stationary_distribution(self, transition=None):
+        """
+        Solve pi P = pi. The chain must be irreducible, i.e. the mutation rate of the game
+        must be positive; without mutation every monomorphic state is absorbing.
+
+        :param transition: transition matrix, computed if not given
+        :return: stationary distribution over the states
+        """
+        if self.game.mutation <= 0:
+            raise ValueError("The chain has absorbing states without mutation, use time_average instead")
+        transition = self.transition_matrix() if transition is None else transition
+        a = (transition.T - sparse.identity(transition.shape[0])).tolil()
+        # Replace one balance equation by the normalisation
+        a[0, :] = 1
+        b = np.zeros(transition.shape[0])
+        b[0] = 1
+        distribution = linalg.spsolve(a.tocsc(), b)
+        return np.clip(distribution, 0, None) / np.clip(distribution, 0, None).sum()
+
+    def time_average(self, start, transition=None):
+        """
+        Average distribution over the generations recorded by a simulation started in
+        ``start`` (generations threshold+1 to threshold+generations-1 of the game), which
+        is what averaging coopLevel and inspLevel estimates.
+
+        :param start: initial number of DnI, CnI, DI and CI players
+        :param transition: transition matrix, computed if not given
+        :return: averaged distribution over the states
+        """
+        game = self.game
+        transition = self.transition_matrix() if transition is None else transition
+        # One generation is N steps
+        step = transition.T.tocsr()
+        generation_step = step
+        for _ in range(self.N - 1):
+            generation_step = generation_step @ step
+        distribution = np.zeros(len(self.states))
+        distribution[self.index(start)] = 1
+        average = np.zeros(len(self.states))
+        for generation in range(game.threshold + game.generations):
+            distribution = generation_step @ distribution
+            if generation > game.threshold:
+                average += distribution
+        return average / max(game.generations - 1, 1)
+
+    def levels(self, distribution):
+        """
+        :param distribution: distribution over the states
+        :return: expected fraction of cooperators and of inspectors
+        """
+        dni, cni, di, ci = self.states.T
+        return distribution @ (cni + ci) / self.N, distribution @ (di + ci) / self.N
+
+    def solve(self, r_values, start=None):
+        """
+        Expected cooperation and inspection levels for a grid of r values.
+
+        :param r_values: values of r
+        :param start: initial number of DnI, CnI, DI and CI players; if given, the levels
+                      are averaged over the generations of a run as in ``time_average``,
+                      otherwise the stationary distribution is used
+        :return: dict with the r values, the coop and insp levels and the distributions
+                 (one row per r value)
+        """
+        r = self.game.r
+        distributions = np.empty((len(r_values), len(self.states)))
+        for idx, r_param in enumerate(r_values):
+            self.game.r = r_param
+            transition = self.transition_matrix()
+            if start is None:
+                distributions[idx] = self.stationary_distribution(transition)
+            else:
+                distributions[idx] = self.time_average(start, transition)
+            logger.debug("r = %f solved", r_param)
+        self.game.r = r
+
+        coop, insp = self.levels(distributions)
+        return {'r': np.asarray(r_values), 'coop': coop, 'insp': insp, 'distribution': distributions}
@@ -0,0 +1,171 @@
+# ==============================================================================
+# EvoSim
+# Copyright © 2016 Elias F. Domingos. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+
+import json
+import logging
+import os
+import shutil
+import tempfile
+import zlib
+
+import numpy as np
+
+from evosim.diskcache import DiskCache, canonical, code_version
+from evosim.network.graph import Graph
+
+logger = logging.getLogger(__name__)
+
+
+class NetworkCache(DiskCache):
+    """
+    Cache of generated networks on disk.
+
+    A graph is identified by its generator, the generator's parameters, the number of
+    nodes, the seed and the version of the code (see
+    :func:`evosim.diskcache.code_version`), so editing a generator invalidates its
+    graphs. Its adjacency (``indptr.npy`` and ``indices.npy``) is stored in a
+    directory named after the hash of that description, together with a ``meta.json``
+    file holding the description and a checksum of the arrays. Cached graphs are loaded
+    memory-mapped, so several processes running the same experiment share one copy of
+    the graph in the page cache. When the cache grows over ``max_bytes``, the least
+    recently used graphs are removed.
+
+    Graphs built without a seed are different every time and are never cached. The
+    parameters of the generator must be numbers, strings or arrays; a generator with a
+    function among them, e.g. a ConfigurationNetwork with a callable degree sequence,
+    is not cacheable and ``get`` raises a TypeError.
+
+    :param directory: cache directory, by default $EVOSIM_CACHE or ~/.cache/evosim/networks
+    :param max_bytes: maximum size of the cache
+    :param verify: if True, the checksum of a graph is checked every time it is loaded
+    """
+
+    entry_name = 'Network'
+
+    def __init__(self, directory=None, max_bytes=2 ** 30, verify=True):
+        if directory is None:
+            directory = os.environ.get('EVOSIM_CACHE',
+                                       os.path.join(os.path.expanduser('~'), '.cache', 'evosim', 'networks'))
+        super().__init__(directory, max_bytes)
+        self.verify = verify
+
+    def get(self, generator, n, *args, seed=None, **kwargs):
+        """
+        Load the graph from the cache, or build it and store it.
+
+        :param generator: network generator (AbstractNetwork), or function that fills the
+                          ``neighbors`` lists of a population, e.g. barabasi_albert_graph,
+                          called with (population, *args, seed=seed, **kwargs)
+        :param n: number of nodes
+        :param seed: seed of the generator
+        :return: Graph
+        """
+        if seed is None:
+            return self.build(generator, n, seed, *args, **kwargs)
+        description = self.describe(generator, n, seed, *args, **kwargs)
+        key = self.key(description)
+        graph = self.load(key)
+        if graph is None:
+            graph = self.build(generator, n, seed, *args, **kwargs)
+            self.store(key, graph, description)
+        return graph
+
+    @staticmethod
+    def build(generator, n, seed, *args, **kwargs):
+        if hasattr(generator, 'build'):
+            return generator.build(n, seed)
+        if seed is not None:
+            kwargs['seed'] = seed
+        return Graph.from_generator(generator, n, *args, **kwargs)
+
+    @staticmethod
+    def describe(generator, n, seed, *args, **kwargs):
+        """
+        :return: dict identifying the graph
+        """
+        if hasattr(generator, 'build'):
+            name = type(generator).__module__ + '.' + type(generator).__qualname__
+            params = vars(generator)
+        else:
+            name = generator.__module__ + '.' + generator.__qualname__
+            params = {'args': list(args), 'kwargs': kwargs}
+        try:
+            params = canonical(params)
+        except TypeError as error:
+            raise TypeError("%s is not cacheable: %s" % (name, error)) from None
+        return {'generator': name, 'params': params, 'n': n, 'seed': seed, 'code': code_version()}
+
+    def path(self, key, name=''):
+        return os.path.join(self.directory, key, name)
+
+    def load(self, key):
+        """
+        :return: the cached Graph, or None if it is not in the cache or is damaged
+        """
+        try:
+            with open(self.path(key, 'meta.json')) as f:
+                meta = json.load(f)
+            indptr = np.load(self.path(key, 'indptr.npy'), mmap_mode='r')
+            indices = np.load(self.path(key, 'indices.npy'), mmap_mode='r')
+        except (OSError, ValueError):
+            return None
+        if not self.check(meta, indptr, indices):
+            logger.warning("Damaged network %s removed from the cache", key)
+            shutil.rmtree(self.path(key), ignore_errors=True)
+            return None
+        # The modification time of meta.json is the time of the last use
+        os.utime(self.path(key, 'meta.json'))
+        return Graph(indptr, indices)
+
+    def check(self, meta, indptr, indices):
+        if len(indptr) != meta['n'] + 1 or len(indices) != meta['nnz'] or indptr[0] != 0 or \
+                indptr[-1] != len(indices):
+            return False
+        return not self.verify or meta['checksum'] == _checksum(indptr, indices)
+
+    def store(self, key, graph, description):
+        """
+        Write the graph to a temporary directory that is then renamed, so that other
+        processes never see a partially written graph.
+        """
+        tmp = tempfile.mkdtemp(dir=self.directory, prefix='.tmp-')
+        np.save(os.path.join(tmp, 'indptr.npy'), graph.indptr)
+        np.save(os.path.join(tmp, 'indices.npy'), graph.indices)
+        meta = dict(description, nnz=len(graph.indices), checksum=_checksum(graph.indptr, graph.indices))
+        with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+        try:
+            os.rename(tmp, self.path(key))
+        except OSError:
+            # Stored in the meantime by another process
+            shutil.rmtree(tmp, ignore_errors=True)
+        self.evict_lru(keep=key)
+
+    def stat(self, name):
+        files = [os.path.join(self.path(name), file) for file in os.listdir(self.path(name))]
+        return os.path.getmtime(self.path(name, 'meta.json')), sum(os.path.getsize(file) for file in files), name
+
+    def remove(self, key):
+        shutil.rmtree(self.path(key))
+
+
+def _checksum(*arrays):
+    checksum = 0
+    for array in arrays:
+        checksum = zlib.crc32(memoryview(np.ascontiguousarray(array)).cast('B'), checksum)
+    return checksum
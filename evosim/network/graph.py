@@ -16,10 +16,204 @@
 # ==============================================================================
 
 
+import numpy as np
+from scipy import sparse
+
+
 class Graph(object):
-    nodes = None
-    edges = None
-    nodes_type = None
+    """
+    Immutable undirected graph stored as a CSR adjacency: the neighbours of node i are
+    indices[indptr[i]:indptr[i+1]]. The arrays are int32 (int64 for graphs with more
+    than 2^31 entries) and read-only, so a graph can be shared by several games and
+    engines. A graph takes 4 bytes per edge end instead of the ~70 bytes of a reference in
+    a ``neighbors`` list. Read-only arrays of the right type, e.g. memory-mapped ones, are
+    used without copying them.
+
+    :param indptr: array of length n + 1
+    :param indices: array of length indptr[-1]
+    """
+    # Incremented whenever assign_neighbors or the generators of evosim.network.network
+    # change the neighbors lists of player objects, so the graphs read from the lists
+    # can be cached (see PGGiNetwork.get_graph)
+    neighbors_version = 0
+
+    def __init__(self, indptr, indices):
+        dtype = np.int32 if len(indices) < 2 ** 31 else np.int64
+        self.indptr = _read_only(indptr, dtype)
+        self.indices = _read_only(indices, dtype)
+        self.degree = _read_only(np.diff(self.indptr), dtype)
+        self.n = len(self.indptr) - 1
+        self._groups = None
+        self._group_matrix = None
+
+    @classmethod
+    def from_edges(cls, n, edges):
+        """
+        :param n: number of nodes
+        :param edges: array of shape (E, 2) of undirected edges
+        """
+        from evosim.network.network import edges_to_csr
+        return cls(*edges_to_csr(n, edges))
+
+    @classmethod
+    def from_players(cls, players):
+        """
+        :param players: dict of players with ``neighbors`` lists; node i is the i-th player
+        """
+        players = list(players.values())
+        position = {player.id: i for i, player in enumerate(players)}
+        degree = [len(getattr(player, 'neighbors', [])) for player in players]
+        indices = [position[neighbor.id] for player in players for neighbor in getattr(player, 'neighbors', [])]
+        return cls(np.concatenate(([0], np.cumsum(degree))), indices)
+
+    @classmethod
+    def from_generator(cls, generator, n, *args, **kwargs):
+        """
+        Build a graph with one of the generators that fill ``neighbors`` lists, e.g.
+        ``Graph.from_generator(scale_free_network, 1000, m0=2)``.
+
+        :param generator: function of (population, *args, **kwargs)
+        :param n: number of nodes
+        """
+        nodes = {i: _Node(i) for i in range(n)}
+        generator(nodes, *args, **kwargs)
+        return cls.from_players(nodes)
+
+    @classmethod
+    def barabasi_albert(cls, n, m=2, z=None, seed=None):
+        """
+        Barabási-Albert graph, see ``barabasi_albert_edges``.
+        """
+        from evosim.network.network import barabasi_albert_edges
+        return cls.from_edges(n, barabasi_albert_edges(n, m=m, z=z, seed=seed))
+
+    def __len__(self):
+        return self.n
+
+    def __eq__(self, other):
+        return isinstance(other, Graph) and np.array_equal(self.indptr, other.indptr) and \
+            np.array_equal(self.indices, other.indices)
+
+    def neighbors(self, i):
+        """
+        :return: read-only array of the neighbours of node i
+        """
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def number_of_edges(self):
+        return int(self.indptr[-1]) // 2
+
+    def edges(self):
+        """
+        :return: array of shape (E, 2) of the edges (i, j) with i < j
+        """
+        rows = np.repeat(np.arange(self.n, dtype=self.indices.dtype), self.degree)
+        keep = rows < self.indices
+        return np.column_stack((rows[keep], self.indices[keep]))
+
+    def average_degree(self):
+        return float(self.degree.mean()) if self.n else 0.0
+
+    def degree_distribution(self):
+        """
+        :return: fraction of the nodes with degree k, for k = 0..max degree
+        """
+        return np.bincount(self.degree) / self.n
+
+    def degree_statistics(self):
+        """
+        :return: dict with the mean, standard deviation, second moment, minimum and maximum
+                 of the degree
+        """
+        degree = self.degree.astype(np.float64)
+        return {'mean': degree.mean(), 'std': degree.std(), 'second_moment': np.mean(degree ** 2),
+                'min': int(self.degree.min()), 'max': int(self.degree.max())}
+
+    def groups(self):
+        """
+        Groups [i, *neighbors(i)] of the public goods games on the graph, stored one
+        entry per (group, member) with the focal player first. Computed once per graph.
+
+        :return: group_start (first entry of each group) and entry_member (player of each
+                 entry)
+        """
+        if self._groups is None:
+            sizes = self.degree + 1
+            group_start = np.zeros(self.n, dtype=np.int64)
+            np.cumsum(sizes[:-1], out=group_start[1:])
+            is_focal = np.zeros(int(sizes.sum()), dtype=bool)
+            is_focal[group_start] = True
+            entry_member = np.empty(is_focal.size, dtype=np.int64)
+            entry_member[is_focal] = np.arange(self.n)
+            entry_member[~is_focal] = self.indices
+            self._groups = (_read_only(group_start, np.int64), _read_only(entry_member, np.int64))
+        return self._groups
+
+    def group_sum(self, values):
+        """
+        Sum of ``values`` over the group of every node, i.e. values[i] plus the sum over
+        the neighbours of i, added in the order of the groups.
+
+        :param values: array of length n
+        :return: array of length n
+        """
+        group_start, entry_member = self.groups()
+        if not len(group_start):
+            return np.zeros(0, dtype=np.asarray(values).dtype)
+        return np.add.reduceat(np.asarray(values)[entry_member], group_start)
+
+    def group_matrix(self):
+        """
+        Sparse matrix A + I (adjacency plus self-loops) of the groups in CSR form: row g
+        holds the members of the group of node g. As the graph is undirected the matrix is
+        symmetric, so ``M @ x`` both sums x over the members of every group and sums over
+        the groups of every node. Computed once per graph.
+        """
+        if self._group_matrix is None:
+            group_start, entry_member = self.groups()
+            indptr = np.append(group_start, entry_member.size)
+            self._group_matrix = sparse.csr_matrix((np.ones(entry_member.size), entry_member, indptr),
+                                                   shape=(self.n, self.n))
+        return self._group_matrix
+
+    def assign_neighbors(self, players):
+        """
+        Fill the ``neighbors`` lists of player objects (object engines): the i-th player
+        gets the players of the neighbours of node i.
+
+        :param players: dict of n players
+        """
+        players = list(players.values())
+        if len(players) != self.n:
+            raise ValueError("The graph has %d nodes and the population %d players" % (self.n, len(players)))
+        indptr = self.indptr.tolist()
+        indices = self.indices.tolist()
+        for i, player in enumerate(players):
+            player.neighbors = [players[j] for j in indices[indptr[i]:indptr[i + 1]]]
+        Graph.neighbors_changed()
+
+    @staticmethod
+    def neighbors_changed():
+        """
+        Record that the ``neighbors`` lists of player objects changed. Code that edits the
+        lists directly must call it for the games to read them again.
+        """
+        Graph.neighbors_version += 1
+
+
+def _read_only(array, dtype):
+    if not (isinstance(array, np.ndarray) and array.dtype == dtype and not array.flags.writeable):
+        array = np.array(array, dtype=dtype)
+        array.flags.writeable = False
+    return array
+
+
+class _Node(object):
+    """
+    Node with the attributes the player-based generators use.
+    """
+    __slots__ = ('id', 'neighbors')
 
-    def __init__(self):
-        pass
+    def __init__(self, pid):
+        self.id = pid
+        self.neighbors = []
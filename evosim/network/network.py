@@ -16,64 +16,237 @@
 # ==============================================================================
 
 
+import numpy as np
 from numpy import random
 import logging
 
+from evosim.network.graph import Graph
+from evosim.rng import skip_sample
+from evosim.statistics.timer import NULL_TIMER
+
 logger = logging.getLogger(__name__)
 
 
 class AbstractNetwork:
+    """
+    Network generator. ``build(n, seed)`` returns an immutable
+    :class:`evosim.network.graph.Graph` with n nodes drawn from its own numpy Generator;
+    ``assign(population, seed)`` builds the graph of a population and installs it
+    (``Population.set_network``, or the ``neighbors`` lists of player objects).
+    Subclasses implement ``edges(n, rng)``.
+    """
     def __init__(self):
         pass
 
+    def edges(self, n, rng):
+        """
+        :param n: number of nodes
+        :param rng: numpy Generator
+        :return: array of shape (E, 2) of undirected edges
+        """
+        pass
+
+    def build(self, n, seed=None, timer=NULL_TIMER):
+        """
+        :param timer: PhaseTimer receiving the time spent drawing the edges
+                      ('network.edges') and building the CSR arrays ('network.csr')
+        """
+        with timer.measure('network.edges'):
+            edges = self.edges(n, np.random.default_rng(seed))
+        with timer.measure('network.csr'):
+            return Graph.from_edges(n, edges)
+
+    def assign(self, population, seed=None, timer=NULL_TIMER):
+        graph = self.build(len(population), seed, timer)
+        with timer.measure('network.assign'):
+            if hasattr(population, 'set_network'):
+                population.set_network(graph)
+            else:
+                graph.assign_neighbors(population)
+        return graph
+
 
 class GridNetwork(AbstractNetwork):
-    pass
+    """
+    Two-dimensional lattice of side sqrt(n), or of the given shape.
+
+    :param neighborhood: 'von_neumann' (4 neighbours) or 'moore' (8 neighbours)
+    :param periodic: if True the lattice wraps around (torus)
+    :param shape: (rows, columns), a square lattice by default
+    """
+    offsets = {'von_neumann': [(0, 1), (1, 0)], 'moore': [(0, 1), (1, 0), (1, 1), (1, -1)]}
+
+    def __init__(self, neighborhood='von_neumann', periodic=True, shape=None):
+        super().__init__()
+        if neighborhood not in self.offsets:
+            raise ValueError("Unknown neighborhood '%s'" % neighborhood)
+        self.neighborhood = neighborhood
+        self.periodic = periodic
+        self.shape = shape
+
+    def edges(self, n, rng):
+        rows, cols = self.shape if self.shape is not None else (int(round(np.sqrt(n))),) * 2
+        if rows * cols != n:
+            raise ValueError("A %dx%d lattice does not have %d nodes" % (rows, cols, n))
+        nodes = np.arange(n, dtype=np.int64)
+        row, col = np.divmod(nodes, cols)
+        edges = []
+        for dr, dc in self.offsets[self.neighborhood]:
+            r, c = row + dr, col + dc
+            keep = slice(None) if self.periodic else (r < rows) & (c >= 0) & (c < cols)
+            edges.append(np.column_stack((nodes[keep], (r % rows * cols + c % cols)[keep])))
+        return _simple_edges(n, np.concatenate(edges))
 
 
 class RegularNetwork(AbstractNetwork):
-    pass
+    """
+    Ring lattice: every node is linked to its z // 2 nearest nodes on each side.
+
+    :param z: average connectivity
+    """
+    def __init__(self, z=4):
+        super().__init__()
+        self.z = z
+
+    def edges(self, n, rng):
+        nodes = np.arange(n, dtype=np.int64)
+        edges = [np.column_stack((nodes, (nodes + d) % n)) for d in range(1, self.z // 2 + 1)]
+        return _simple_edges(n, np.concatenate(edges)) if edges else np.empty((0, 2), dtype=np.int64)
 
 
 class RandomNetwork(AbstractNetwork):
-    pass
+    """
+    Erdős-Rényi graph G(n, p). Instead of testing the n(n-1)/2 pairs one by one, the gaps
+    between consecutive edges in the list of pairs are drawn from a geometric
+    distribution (Batagelj and Brandes), so the cost is proportional to the number of
+    edges.
+
+    :param p: probability of each edge
+    :param z: average connectivity, sets p = z / (n - 1)
+    """
+    def __init__(self, p=None, z=None):
+        super().__init__()
+        if (p is None) == (z is None):
+            raise ValueError("Give either p or z")
+        self.p = p
+        self.z = z
+
+    def edges(self, n, rng):
+        p = self.p if self.p is not None else self.z / max(n - 1, 1)
+        pairs = n * (n - 1) // 2
+        position = skip_sample(pairs, p, rng)
+        # Pair k is (v, w) with w < v and k = v (v - 1) / 2 + w
+        v = ((1 + np.sqrt(1 + 8 * position.astype(np.float64))) / 2).astype(np.int64)
+        v -= v * (v - 1) // 2 > position
+        v += (v + 1) * v // 2 <= position
+        return np.column_stack((v, position - v * (v - 1) // 2))
 
 
 class ScaleFreeNetwork(AbstractNetwork):
-    pass
+    """
+    Barabási-Albert preferential attachment graph, see ``barabasi_albert_edges``.
 
+    :param m: number of edges of each new node
+    :param z: average connectivity, sets m = z // 2
+    """
+    def __init__(self, m=2, z=None):
+        super().__init__()
+        self.m = z // 2 if z is not None else m
 
-class SmallWorldNetwork(AbstractNetwork):
-    pass
+    def edges(self, n, rng):
+        return barabasi_albert_edges(n, m=self.m, seed=rng)
 
 
-def regular_network(population, avg_connectivity=4):
-    for player in population.values():
-        player.neighbors = []
+class SmallWorldNetwork(AbstractNetwork):
+    """
+    Watts-Strogatz graph: each edge (i, i + d) of a ring lattice is rewired with
+    probability beta to (i, k), with k drawn uniformly among the nodes that are not i and
+    are not yet linked to i.
 
-    radius = avg_connectivity / 2
+    :param z: average connectivity
+    :param beta: rewiring probability
+    """
+    def __init__(self, z=4, beta=0.1):
+        super().__init__()
+        self.z = z
+        self.beta = beta
+
+    def edges(self, n, rng):
+        edges = RegularNetwork(self.z).edges(n, rng)
+        pending = np.flatnonzero(rng.random(len(edges)) < self.beta)
+        while pending.size:
+            edges[pending, 1] = rng.integers(0, n, size=pending.size)
+            # Self-loops and edges that already exist are drawn again; when an edge is
+            # repeated, the copy that was not drawn in this round is kept
+            is_pending = np.zeros(len(edges), dtype=bool)
+            is_pending[pending] = True
+            keys = np.minimum(edges[:, 0], edges[:, 1]) * n + np.maximum(edges[:, 0], edges[:, 1])
+            order = np.lexsort((is_pending, keys))
+            redraw = np.zeros(len(edges), dtype=bool)
+            redraw[order[1:][keys[order[1:]] == keys[order[:-1]]]] = True
+            redraw[edges[:, 0] == edges[:, 1]] = True
+            pending = np.flatnonzero(redraw & is_pending)
+        return edges
+
+
+class ConfigurationNetwork(AbstractNetwork):
+    """
+    Configuration model: random graph with a given degree sequence, obtained by pairing
+    the edge ends (stubs) of all the nodes at random.
 
-    # Establish Network nodes for each member of the Population
-    for member_counter in range(0, len(population)):
-        # Each member will be assigned the surrounding neighbors according to the radius calculated
-        # from the Average Number of Neighbors each member must have
-        for distance in range(-int(radius), int(radius) + 1):
-            # The cell itself is not a neighbor
-            if distance == 0:
-                continue
+    :param degrees: degree of every node, or function of (n, rng) returning them
+    :param simple: if True, self-loops and repeated edges are removed (erased
+                   configuration model), so a few nodes can end up with a lower degree
+    """
+    def __init__(self, degrees, simple=True):
+        super().__init__()
+        self.degrees = degrees
+        self.simple = simple
+
+    def edges(self, n, rng):
+        degrees = self.degrees(n, rng) if callable(self.degrees) else self.degrees
+        degrees = np.asarray(degrees, dtype=np.int64)
+        if len(degrees) != n:
+            raise ValueError("The degree sequence has %d nodes instead of %d" % (len(degrees), n))
+        if degrees.sum() % 2:
+            raise ValueError("The sum of the degrees must be even")
+        edges = rng.permutation(np.repeat(np.arange(n, dtype=np.int64), degrees)).reshape(-1, 2)
+        return _simple_edges(n, edges) if self.simple else edges
+
+
+def _simple_edges(n, edges):
+    """
+    :return: the edges (i, j), i < j, without self-loops and repetitions
+    """
+    low = np.minimum(edges[:, 0], edges[:, 1])
+    high = np.maximum(edges[:, 0], edges[:, 1])
+    keys = np.sort(low[low != high] * n + high[low != high])
+    keys = keys[np.concatenate(([True], keys[1:] != keys[:-1]))] if keys.size else keys
+    return np.column_stack(np.divmod(keys, n))
 
-            # Obtain the Neighbor at the current distance
-            neighbor_position = member_counter + distance
-            if neighbor_position < 0:
-                neighbor_position += len(population)
-            elif neighbor_position >= len(population):
-                neighbor_position -= len(population)
 
-            # Add The Neighbor to the Current Member
-            population[member_counter].neighbors.append(population[neighbor_position])
+def regular_network(population, avg_connectivity=4):
+    """
+    Ring lattice where every player has avg_connectivity neighbours, see RegularNetwork.
+    The neighbours of player i are listed in the order i - z/2, ..., i - 1, i + 1, ...,
+    i + z/2 (modulo N), as in the original generator, since the random draws of the object
+    engine depend on that order; RegularNetwork lists them in increasing order.
+
+    :param population: dict of players or Population
+    :param avg_connectivity: average connectivity
+    """
+    n = len(population)
+    radius = int(avg_connectivity / 2)
+    offsets = np.array([distance for distance in range(-radius, radius + 1) if distance != 0], dtype=np.int64)
+    indices = (np.arange(n, dtype=np.int64)[:, None] + offsets) % n
+    graph = Graph(np.arange(n + 1, dtype=np.int64) * len(offsets), indices.ravel())
+    if hasattr(population, 'set_network'):
+        population.set_network(graph)
+    else:
+        graph.assign_neighbors(population)
 
 
-def scale_free_network(population, m=4, m0=2, undirected=False):
+def scale_free_network(population, m=4, m0=2, undirected=False, seed=None):
     """
     Generate Barrabasi-Albert scale-free network
 
@@ -81,8 +254,10 @@ def scale_free_network(population, m=4, m0=2, undirected=False):
     :param m:
     :param m0: initial number of nodes
     :param undirected:
+    :param seed: seed of the network, the global numpy generator is used if None
     :return:
     """
+    rng = random if seed is None else random.RandomState(seed)
     logger.info("Building scale-free network...")
     population_size = len(population)
     total_degree = 0
@@ -112,7 +287,7 @@ def scale_free_network(population, m=4, m0=2, undirected=False):
         # Add as many random neighbors as Edges the player node has
         for edge_counter in range(0, edges2add):
             while not_finished:
-                prob = random.uniform(0, 1)
+                prob = rng.uniform(0, 1)
                 total_prob = len(population[0].neighbors) / total_degree
                 new_neighbor = None
                 for k in range(0, nodes_counter):
@@ -144,7 +319,8 @@ def barabasi_albert_graph(population, m=2, z=None, seed=None):
         Number of edges to attach from a new node to existing nodes
     z : average connectivity
     seed : int, optional
-        Seed for random number generator (default=None).
+        Seed for random number generator (default=None). The network is drawn from
+        its own generator, so the global numpy generator is left untouched.
 
     Returns
     -------
@@ -167,8 +343,7 @@ def barabasi_albert_graph(population, m=2, z=None, seed=None):
 
     if m < 1 or m >= n:
         raise ("Barabási-Albert network must have m>=1 and m<n, m=%d,n=%d" % (m, n))
-    if seed is not None:
-        random.seed(seed)
+    rng = random if seed is None else random.RandomState(seed)
 
     # Target nodes for new edges
     targets = list(range(m))
@@ -186,11 +361,99 @@ def barabasi_albert_graph(population, m=2, z=None, seed=None):
         repeated_nodes.extend([source]*m)
         # Now choose m unique nodes from the existing nodes
         # Pick uniformly from repeated_nodes (preferential attachement)
-        targets = _random_subset(repeated_nodes, m)
+        targets = _random_subset(repeated_nodes, m, rng)
         source += 1
 
 
-def _random_subset(seq, m):
+def barabasi_albert_edges(n, m=2, z=None, seed=None):
+    """
+    Barabási-Albert preferential attachment graph as an edge array, same model as
+    ``barabasi_albert_graph``: node m is attached to nodes 0..m-1 and every next node to
+    m distinct nodes drawn from the list of edge endpoints created so far.
+
+    The endpoint list is never built. Node v draws m positions in the list as it was
+    before its own edges, and a position either falls on a source node, which is known
+    from the position alone, or on the target of an earlier edge, which is resolved by
+    pointer jumping over all the edges at once (Batagelj and Brandes). Nodes that drew
+    the same target twice redraw the repeated positions until their targets are
+    distinct. The cost is O(N m) array operations, a 10^6 node graph takes about a second.
+
+    :param n: number of nodes
+    :param m: number of edges of each new node
+    :param z: average connectivity, sets m = z // 2
+    :param seed: seed of the generator
+    :return: array of shape (m (n - m), 2) of (new node, target) edges
+    """
+    if z is not None:
+        m = z // 2
+    if m < 1 or m >= n:
+        raise ValueError("Barabási-Albert network must have m>=1 and m<n, m=%d,n=%d" % (m, n))
+    rng = np.random.default_rng(seed)
+
+    # Edge slot i belongs to node sources[i]; the endpoint list holds, for each new node,
+    # its m targets followed by m copies of itself
+    sources = np.repeat(np.arange(m, n, dtype=np.int64), m)
+    slot = np.arange(sources.size, dtype=np.int64)
+    before = 2 * m * (sources - m)
+    position = np.zeros(sources.size, dtype=np.int64)
+    redraw = slot[m:]
+    while redraw.size:
+        position[redraw] = (rng.random(redraw.size) * before[redraw]).astype(np.int64)
+        targets = _resolve_positions(position, m)
+        redraw = _repeated_targets(targets.reshape(-1, m))
+    return np.column_stack((sources, targets))
+
+
+def _resolve_positions(position, m):
+    """
+    Target node of every edge slot from its position in the endpoint list.
+    """
+    block, offset = np.divmod(position, 2 * m)
+    slot = np.arange(position.size, dtype=np.int64)
+    # Positions on a source node are resolved, the others point to an earlier slot
+    direct = offset >= m
+    direct[:m] = True
+    node = m + block
+    node[:m] = np.arange(m)
+    pointer = np.where(direct, slot, block * m + offset)
+    while True:
+        jump = pointer[pointer]
+        if np.array_equal(jump, pointer):
+            return node[pointer]
+        pointer = jump
+
+
+def _repeated_targets(targets):
+    """
+    :param targets: targets of each node, one row per node
+    :return: slots holding a target already drawn by the same node
+    """
+    order = np.argsort(targets, axis=1, kind='stable')
+    ordered = np.take_along_axis(targets, order, axis=1)
+    repeated = np.zeros(targets.shape, dtype=bool)
+    np.put_along_axis(repeated, order[:, 1:], ordered[:, 1:] == ordered[:, :-1], axis=1)
+    return np.flatnonzero(repeated)
+
+
+def edges_to_csr(n, edges):
+    """
+    Adjacency of an undirected graph in CSR form: the neighbours of node i are
+    indices[indptr[i]:indptr[i+1]], sorted.
+
+    :param n: number of nodes
+    :param edges: array of shape (E, 2)
+    :return: indptr and indices
+    """
+    edges = np.asarray(edges, dtype=np.int64)
+    rows = np.concatenate((edges[:, 0], edges[:, 1]))
+    cols = np.concatenate((edges[:, 1], edges[:, 0]))
+    order = np.argsort(rows * n + cols)
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+    return indptr, cols[order]
+
+
+def _random_subset(seq, m, rng=random):
     """ Return m unique elements from seq.
 
     This differs from random.sample which can return repeated
@@ -198,7 +461,7 @@ def _random_subset(seq, m):
     """
     targets = set()
     while len(targets) < m:
-        x = random.choice(seq)
+        x = rng.choice(seq)
         targets.add(x)
     return targets
 
@@ -215,12 +478,16 @@ def no_neighbor(neighbor, player):
 def set_as_neighbor(player, new_neighbor):
     player.neighbors.append(new_neighbor)
     new_neighbor.neighbors.append(player)
+    Graph.neighbors_changed()
 
 
 def calculate_avg_connectivity(population):
-    avg_connectivity = 0
-
-    for index in range(len(population)):
-        avg_connectivity = (avg_connectivity*index + len(population[index].neighbors)) / (index + 1)
-
-    return avg_connectivity
+    """
+    :param population: Graph, Population with a network or dict of players with neighbors
+    :return: average degree
+    """
+    graph = getattr(population, 'graph', population)
+    if hasattr(graph, 'average_degree'):
+        return graph.average_degree()
+    return float(np.mean(np.fromiter((len(player.neighbors) for player in population.values()),
+                                     dtype=np.int64, count=len(population))))
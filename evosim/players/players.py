@@ -17,10 +17,15 @@
 
 
 import importlib
-from numpy import random, tanh
+from numpy import tanh
+
+from evosim.rng import default_stream
 
 
 class AbstractPlayer:
+    # Random stream, replaced by the stream of the game (see AbstractGame.seed)
+    rng = default_stream
+
     def __init__(self, pid):
         self.id = pid
         self.ngame = 0
@@ -44,6 +49,12 @@ class AbstractPlayer:
         self.action = action
         self.prev_action = action
 
+    def mutate(self, strategies=2):
+        """
+        Switch to one of the other strategies 0..strategies-1, chosen at random.
+        """
+        self.action = (self.action + 1 + self.rng.integers(strategies - 1)) % strategies
+
     def init_params(self):
         self.ngame = 0
         self.total_payoff = 0
@@ -68,7 +79,7 @@ class TFTPlayer(AbstractPlayer):
 class RandomPlayer(AbstractPlayer):
     def play(self, avg_payoff):
         self.prev_action = self.action
-        self.action = 0 if random.uniform(0, 1) < 0.5 else 1
+        self.action = 0 if self.rng.random() < 0.5 else 1
 
         return self.action
 
@@ -112,7 +123,7 @@ class PureStrategyPlayer(AbstractPlayer):
 
         if self.total_payoff < player.total_payoff:
             prob = (player.total_payoff - self.total_payoff) / (player.maxP - self.minP)
-            if random.uniform(0, 1) < prob:
+            if self.rng.random() < prob:
                 self.action = player.action
 
     def set_m_payoffs(self, max_p=0, min_p=0):
@@ -177,7 +188,7 @@ class PGGiPlayer(AbstractPlayer):
 
         # Find player
         for inspector in inspectors:
-            inspected_player = game_players[random.randint(0, len(game_players))]
+            inspected_player = game_players[self.rng.integers(len(game_players))]
             if inspected_player.action:
                 # Found a D
                 inspector['inspected'] = inspected_player
@@ -198,7 +209,7 @@ class PGGiPlayer(AbstractPlayer):
             inspector['inspector'].ngame += 1
 
     def get_inspected_player(self, num_game_players):
-        iid = random.randint(0, num_game_players)
+        iid = self.rng.integers(num_game_players)
         if self.neighbors[iid].action != 1:
             iid = -1
         return iid
@@ -211,11 +222,11 @@ class PGGiPlayer(AbstractPlayer):
         self.inspected = 0
         self.prev_action = self.action
         self.ngame = 0
-        player = self.neighbors[random.randint(0, len(self.neighbors))]
+        player = self.neighbors[self.rng.integers(len(self.neighbors))]
 
         if self.total_payoff < player.total_payoff:
             prob = (player.total_payoff - self.total_payoff) / abs(player.maxP - self.minP)
-            if random.uniform(0, 1) < prob:
+            if self.rng.random() < prob:
                 self.action = player.prev_action
 
     def set_p_limit(self, local_max_p, local_min_p):
@@ -236,6 +247,8 @@ class PGGiPlayer(AbstractPlayer):
 
 
 class PGGscPlayer:
+    rng = default_stream
+
     def __init__(self, pid):
         self.id = pid
         self.total_payoff = 0
@@ -266,21 +279,21 @@ class PGGscPlayer:
         self.inspected = False
         if self.total_payoff < neighbor.total_payoff:
             prob = (neighbor.total_payoff - self.total_payoff) * norm_factor
-            if random.uniform(0, 1) < prob:
+            if self.rng.random() < prob:
                 self.action = neighbor.action
                 self.inspector = neighbor.inspector
 
     def mutation(self, prob):
-        if random.uniform(0, 1) < prob:
-            self.prev_action = self.action
-            pc = random.uniform(0, 1)
-            if pc < 0.33:
-                self.action = (self.action + 1) % 2
-            if pc < 0.66:
-                self.inspector = (self.action + 1) % 2
-            else:
-                self.action = (self.action + 1) % 2
-                self.inspector = (self.action + 1) % 2
+        if self.rng.random() < prob:
+            self.mutate()
+
+    def mutate(self, strategies=4):
+        """
+        Switch to one of the other three (action, inspector) strategies, chosen at random.
+        Strategies are numbered 2*inspector + action.
+        """
+        strategy = (2 * self.inspector + self.action + 1 + self.rng.integers(strategies - 1)) % strategies
+        self.inspector, self.action = divmod(strategy, 2)
 
     def init_params(self):
         self.total_payoff = 0
@@ -331,9 +344,9 @@ class BMPlayer(PGGiPlayer):
         self.ngame = 0
 
         # Calculate next action
-        self.action = 0 if (random.rand() <= self.p) else 1
+        self.action = 0 if (self.rng.random() <= self.p) else 1
         # Misimplementation probability
-        if random.rand() <= self.e:
+        if self.rng.random() <= self.e:
             self.action = (self.action + 1) % 2
 
         # Update aspiration
@@ -347,6 +360,13 @@ class BMPlayer(PGGiPlayer):
         else:
             self.p = self.p - self.p * self.l * s if s >= 0 else self.p - (1 - self.p) * self.l * s
 
+    def mutate(self, strategies=2):
+        """
+        Bush-Mosteller learners only cooperate or defect, so they switch to the other of
+        these two actions whatever the number of strategies of the game.
+        """
+        super().mutate(min(strategies, 2))
+
     def mf_stimulus(self):
         return (self.total_payoff - self.A)/(self.maxP - self.A)
 
@@ -0,0 +1,288 @@
+# ==============================================================================
+# EvoSim
+# Copyright © 2016 Elias F. Domingos. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+
+import numpy as np
+
+from evosim.network.graph import Graph
+
+
+class Population:
+    """
+    Struct-of-arrays store of a population of players.
+
+    Every attribute of the players lives in one typed array of length N, so a population
+    of 10^6 players takes around 100 MB and can be processed by the array engines without
+    touching Python objects. The container behaves like the dict of players returned by
+    ``generate_players``: ``population[i]`` returns a :class:`PlayerView` whose attributes
+    read and write the arrays.
+
+    kind: index into ``types`` of the player type of each player
+    action, prev_action: action = 0 : Cooperation, 1 : Defection, 2 : Inspection
+                         (PGGscPlayer: 0 -> D, 1 -> C)
+    inspector, prev_inspector: PGGscPlayer inspector flag
+    A, p, h, l, beta, e: Bush-Mosteller parameters (see BMPlayer)
+    graph: optional network (:class:`evosim.network.graph.Graph`), whose CSR arrays
+           are also available as indptr and indices: the neighbours of i are
+           indices[indptr[i]:indptr[i+1]]
+    """
+    fields = {'action': np.int8, 'prev_action': np.int8, 'inspector': np.int8, 'prev_inspector': np.int8,
+              'total_payoff': np.float64, 'last_payoff': np.float64, 'ngame': np.int32,
+              'inspected': np.int32, 'maxP': np.float64, 'minP': np.float64,
+              'A': np.float64, 'p': np.float64, 'h': np.float64, 'l': np.float64,
+              'beta': np.float64, 'e': np.float64}
+
+    # Same defaults as BMPlayer
+    bm_defaults = {'A': 0.5, 'p': 0.5, 'h': 0.0, 'l': 0.5, 'beta': 0.2, 'e': 0.05}
+
+    def __init__(self, size, types=('PGGiPlayer',), kind=None):
+        self.N = size
+        self.types = tuple(types)
+        self.kind = np.zeros(size, dtype=np.int8) if kind is None else np.asarray(kind, dtype=np.int8)
+        for name, dtype in self.fields.items():
+            setattr(self, name, np.zeros(size, dtype=dtype))
+        for name, value in self.bm_defaults.items():
+            getattr(self, name)[:] = value
+        self.graph = None
+
+    @classmethod
+    def from_players(cls, players):
+        """
+        Build a population from a dict of player objects, including the network defined
+        by their ``neighbors`` lists.
+
+        :param players: dict of players as returned by generate_players
+        :return: Population
+        """
+        players = list(players.values())
+        types = []
+        for player in players:
+            if player.__class__.__name__ not in types:
+                types.append(player.__class__.__name__)
+        population = cls(len(players), types=types,
+                         kind=[types.index(player.__class__.__name__) for player in players])
+        for name in cls.fields:
+            if name in cls.bm_defaults:
+                for i, player in enumerate(players):
+                    if hasattr(player, name):
+                        getattr(population, name)[i] = getattr(player, name)
+            else:
+                getattr(population, name)[:] = [getattr(player, name, 0) for player in players]
+
+        if any(hasattr(player, 'neighbors') for player in players):
+            population.set_network(Graph.from_players(dict(enumerate(players))))
+        return population
+
+    def update_players(self, players):
+        """
+        Copy the state stored in the arrays into a dict of player objects.
+
+        :param players: dict of players the population was built from
+        """
+        names = [name for name in self.fields if name not in self.bm_defaults]
+        for i, player in enumerate(players.values()):
+            for name in names:
+                if hasattr(player, name):
+                    setattr(player, name, getattr(self, name)[i].item())
+            if self.types[self.kind[i]] == 'BMPlayer':
+                for name in self.bm_defaults:
+                    setattr(player, name, getattr(self, name)[i].item())
+
+    def set_network(self, graph, indices=None):
+        """
+        :param graph: Graph, or indptr array of a CSR adjacency given with its indices
+        """
+        self.graph = graph if isinstance(graph, Graph) else Graph(graph, indices)
+
+    @property
+    def indptr(self):
+        return None if self.graph is None else self.graph.indptr
+
+    @property
+    def indices(self):
+        return None if self.graph is None else self.graph.indices
+
+    @property
+    def degree(self):
+        return self.graph.degree
+
+    def is_type(self, name):
+        """
+        :param name: player type name, e.g. 'BMPlayer'
+        :return: boolean mask of the players of that type
+        """
+        if name not in self.types:
+            return np.zeros(self.N, dtype=bool)
+        return self.kind == self.types.index(name)
+
+    def get_state(self):
+        """
+        :return: dict of the arrays of the population, including its network
+        """
+        state = {name: getattr(self, name) for name in self.fields}
+        state['kind'] = self.kind
+        if self.indptr is not None:
+            state['indptr'] = self.indptr
+            state['indices'] = self.indices
+        return state
+
+    def set_state(self, state):
+        """
+        Restore the arrays saved by get_state into this population, which must have the
+        same network.
+        """
+        check_network(self.indptr, self.indices, state)
+        for name in self.fields:
+            getattr(self, name)[:] = state[name]
+        self.kind[:] = state['kind']
+
+    def init_params(self):
+        self.ngame[:] = 0
+        self.total_payoff[:] = 0
+        self.last_payoff[:] = 0
+        self.inspected[:] = 0
+
+    def __len__(self):
+        return self.N
+
+    def __getitem__(self, pid):
+        if not 0 <= pid < self.N:
+            raise KeyError(pid)
+        return PlayerView(self, int(pid))
+
+    def __iter__(self):
+        return iter(range(self.N))
+
+    def __contains__(self, pid):
+        return isinstance(pid, (int, np.integer)) and 0 <= pid < self.N
+
+    def keys(self):
+        return range(self.N)
+
+    def values(self):
+        return (PlayerView(self, i) for i in range(self.N))
+
+    def items(self):
+        return ((i, PlayerView(self, i)) for i in range(self.N))
+
+
+def _field(name):
+    def getter(self):
+        return getattr(self.population, name)[self.id].item()
+
+    def setter(self, value):
+        getattr(self.population, name)[self.id] = value
+
+    return property(getter, setter)
+
+
+class PlayerView:
+    """
+    Thin view of one player of a :class:`Population`. Reading or writing an attribute
+    reads or writes the corresponding array of the population.
+    """
+    __slots__ = ('population', 'id')
+
+    def __init__(self, population, pid):
+        self.population = population
+        self.id = pid
+
+    @property
+    def type(self):
+        return self.population.types[self.population.kind[self.id]]
+
+    @property
+    def neighbors(self):
+        population = self.population
+        if population.indptr is None:
+            return []
+        return [PlayerView(population, int(j))
+                for j in population.indices[population.indptr[self.id]:population.indptr[self.id + 1]]]
+
+    def __eq__(self, other):
+        return isinstance(other, PlayerView) and other.population is self.population and other.id == self.id
+
+    def __hash__(self):
+        return hash((id(self.population), self.id))
+
+    def __str__(self):
+        return "[" + str(self.id) + "] " + \
+               {0: "C", 1: "D", 2: "I"}.get(self.action) + \
+               " payoff= " + str(self.total_payoff)
+
+
+for _name in Population.fields:
+    setattr(PlayerView, _name, _field(_name))
+
+
+def check_network(indptr, indices, state):
+    if indptr is None and 'indptr' not in state:
+        return
+    if indptr is None or 'indptr' not in state or \
+            not (np.array_equal(indptr, state['indptr']) and np.array_equal(indices, state['indices'])):
+        raise ValueError("The state was saved on a different network")
+
+
+def get_players_state(players):
+    """
+    State of a dict of player objects as arrays: one array per numeric attribute
+    (players without the attribute store 0), plus the network if the players have one.
+
+    :param players: dict of players
+    :return: dict of arrays
+    """
+    players = list(players.values())
+    names = sorted({name for player in players for name, value in vars(player).items()
+                    if name != 'id' and isinstance(value, (bool, int, float, np.number))})
+    state = {name: np.array([getattr(player, name, 0) for player in players]) for name in names}
+    if any(hasattr(player, 'neighbors') for player in players):
+        graph = Graph.from_players(dict(enumerate(players)))
+        state['indptr'], state['indices'] = graph.indptr, graph.indices
+    return state
+
+
+def set_players_state(players, state):
+    """
+    Restore the state saved by get_players_state into a dict of player objects with the
+    same network.
+    """
+    players = list(players.values())
+    if any(hasattr(player, 'neighbors') for player in players):
+        graph = Graph.from_players(dict(enumerate(players)))
+        check_network(graph.indptr, graph.indices, state)
+    else:
+        check_network(None, None, state)
+    for name, values in state.items():
+        if name in ('indptr', 'indices'):
+            continue
+        for player, value in zip(players, values):
+            if hasattr(player, name):
+                setattr(player, name, value.item())
+
+
+def generate_population(ratios, nplayers=10):
+    """
+    Array counterpart of ``generate_players``: the players of each type are laid out
+    in the order given by ``ratios``.
+
+    :param ratios: list of [player type name, fraction of the population]
+    :param nplayers: number of players
+    :return: Population
+    """
+    types = [ratio[0] for ratio in ratios]
+    counts = [int(ratio[1] * nplayers) for ratio in ratios]
+    return Population(sum(counts), types=types, kind=np.repeat(np.arange(len(types)), counts))
@@ -0,0 +1,137 @@
+# ==============================================================================
+# EvoSim
+# Copyright © 2016 Elias F. Domingos. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+
+import numpy as np
+
+
+def make_generator(seed=None):
+    """
+    :param seed: None, int, SeedSequence or Generator
+    :return: numpy Generator
+    """
+    if isinstance(seed, np.random.Generator):
+        return seed
+    return np.random.Generator(np.random.PCG64(seed))
+
+
+def spawn_seed(seed, key):
+    """
+    Independent stream of a work unit: the streams of different keys do not overlap and
+    only depend on the base seed and on the key, not on the order in which they are used.
+
+    :param seed: base seed (int)
+    :param key: tuple of ints identifying the work unit, e.g. (r index, realization, run)
+    :return: SeedSequence
+    """
+    return np.random.SeedSequence(seed, spawn_key=tuple(int(k) for k in key))
+
+
+def value_key(value):
+    """
+    Stable integer key of a parameter value, the bits of its float64 representation,
+    so that the stream of a work unit follows the value of the parameter rather than
+    its position in a sweep.
+
+    :param value: number
+    :return: non-negative int
+    """
+    return int(np.float64(value).view(np.uint64))
+
+
+def global_seed():
+    """
+    :return: a seed drawn from the global numpy generator, so that np.random.seed still
+             makes scripts that do not pass seeds reproducible
+    """
+    return int(np.random.randint(0, 2 ** 63, dtype=np.int64))
+
+
+def skip_sample(n, prob, rng):
+    """
+    Indices of a Bernoulli sample of [0, n): every index is picked independently with
+    probability prob. The gaps between consecutive picks are drawn from a geometric
+    distribution, so the cost is proportional to the number of picks, n prob, not to n.
+
+    :param n: number of items
+    :param prob: probability of each item
+    :param rng: numpy Generator
+    :return: sorted array of the picked indices
+    """
+    if prob <= 0 or n <= 0:
+        return np.empty(0, dtype=np.int64)
+    if prob >= 1:
+        return np.arange(n, dtype=np.int64)
+    expected = n * prob
+    block = int(expected + 5 * np.sqrt(expected) + 10)
+    positions = []
+    last = -1
+    while last < n:
+        positions.append(np.cumsum(rng.geometric(prob, size=block)) + last)
+        last = positions[-1][-1]
+    position = np.concatenate(positions)
+    return position[position < n]
+
+
+class RandomStream:
+    """
+    Scalar random numbers for the loops over player objects.
+
+    The numbers are drawn from a numpy Generator in blocks of ``block`` numbers, so the
+    cost of a call into numpy is shared by the whole block instead of being paid for
+    every number.
+
+    :param generator: numpy Generator, RandomState or None for the global numpy
+                      generator; with block=1 every number is drawn when requested
+    :param block: number of numbers drawn at once
+    """
+
+    def __init__(self, generator=None, block=8192):
+        self.generator = generator
+        self.block = block
+        self.buffer = []
+        self.position = 0
+
+    def random(self):
+        """
+        :return: uniform number in [0, 1)
+        """
+        if self.position == len(self.buffer):
+            generator = np.random if self.generator is None else self.generator
+            self.buffer = generator.random(self.block).tolist()
+            self.position = 0
+        self.position += 1
+        return self.buffer[self.position - 1]
+
+    def integers(self, n):
+        """
+        :return: uniform integer in [0, n)
+        """
+        return int(self.random() * n)
+
+    def get_state(self):
+        return {'generator': self.generator.bit_generator.state,
+                'buffer': np.array(self.buffer[self.position:], dtype=np.float64)}
+
+    def set_state(self, state):
+        self.generator.bit_generator.state = state['generator']
+        self.buffer = state['buffer'].tolist()
+        self.position = 0
+
+
+# Stream of the players that are not part of a seeded game
+default_stream = RandomStream(block=1)
@@ -0,0 +1,113 @@
+# ==============================================================================
+# EvoSim
+# Copyright © 2016 Elias F. Domingos. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+
+import json
+import logging
+import os
+from time import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def flatten(prefix, state, arrays, metadata):
+    """
+    Split a nested dict into numpy arrays and JSON values, keyed by their '/' separated path.
+    """
+    for key, value in state.items():
+        name = prefix + '/' + key
+        if isinstance(value, dict):
+            flatten(name, value, arrays, metadata)
+        elif isinstance(value, np.ndarray):
+            arrays[name] = value
+        elif isinstance(value, np.generic):
+            metadata[name] = value.item()
+        else:
+            metadata[name] = value
+
+
+def unflatten(values):
+    state = {}
+    for name, value in values.items():
+        node = state
+        keys = name.split('/')
+        for key in keys[:-1]:
+            node = node.setdefault(key, {})
+        node[keys[-1]] = value
+    return state
+
+
+class Checkpoint:
+    """
+    Snapshot of a simulation in a single binary file.
+
+    A snapshot holds the state of the sweep (``sweep``, a dict of arrays and numbers kept
+    up to date by the simulation), the state of the global numpy random generator and,
+    when taken in the middle of a run, the state of the game (``game.get_state()``). The
+    arrays are written uncompressed to a ``.npz`` file and everything else to a JSON
+    entry of the same file, so writing a snapshot costs about as much as copying the
+    arrays and loading it never unpickles anything. The file is replaced atomically.
+
+    :param path: path of the checkpoint file
+    :param interval: minimum number of seconds between two snapshots taken during a run
+    """
+
+    def __init__(self, path, interval=60.0):
+        self.path = path
+        self.interval = interval
+        self.sweep = {}
+        self.last = time()
+
+    def due(self):
+        return time() - self.last >= self.interval
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def save(self, game=None):
+        """
+        :param game: game in the middle of a run, or None between runs
+        """
+        start_time = time()
+        arrays, metadata = {}, {}
+        flatten('sweep', self.sweep, arrays, metadata)
+        flatten('rng', np.random.get_state(legacy=False), arrays, metadata)
+        if game is not None:
+            flatten('game', game.get_state(), arrays, metadata)
+        arrays['metadata'] = np.frombuffer(json.dumps(metadata).encode(), dtype=np.uint8)
+
+        tmp = self.path + '.tmp'
+        with open(tmp, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, self.path)
+        self.last = time()
+        logger.debug("Checkpoint saved in %s seconds", self.last - start_time)
+
+    def load(self):
+        """
+        :return: dict with the 'sweep', 'rng' and, if saved during a run, 'game' states
+        """
+        with np.load(self.path, allow_pickle=False) as data:
+            values = {name: data[name] for name in data.files if name != 'metadata'}
+            values.update(json.loads(data['metadata'].tobytes().decode()))
+        return unflatten(values)
+
+    @staticmethod
+    def restore_rng(state):
+        np.random.set_state(state['rng'])
@@ -0,0 +1,131 @@
+# ==============================================================================
+# EvoSim
+# Copyright © 2016 Elias F. Domingos. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
+import numpy as np
+
+from evosim.diskcache import DiskCache, canonical, code_version
+
+logger = logging.getLogger(__name__)
+
+
+class ResultCache(DiskCache):
+    """
+    Cache of the results of simulated points on disk, addressed by their content.
+
+    A point is described by everything its results depend on: the game class and its
+    parameters, the settings of its convergence monitor and recorder, the player objects
+    and the initial state of the population (which includes the network), the population
+    arguments, the number of realizations and runs, the base seed and r (the streams of
+    the runs are spawned from the value of r, not from its position in the sweep), and
+    the version of the code (a hash of the evosim sources and the numpy version). The
+    results are stored in
+    ``<sha1 of the description>.npz`` together with the description, so changing any of
+    these gives a new entry and rerunning an unchanged point costs a file read. When the
+    cache grows over ``max_bytes``, the least recently used entries are removed.
+
+    :param directory: cache directory, by default $EVOSIM_RESULT_CACHE or
+                      ~/.cache/evosim/results
+    :param max_bytes: maximum size of the cache
+    """
+
+    entry_name = 'Point'
+
+    def __init__(self, directory=None, max_bytes=2 ** 28):
+        if directory is None:
+            directory = os.environ.get('EVOSIM_RESULT_CACHE',
+                                       os.path.join(os.path.expanduser('~'), '.cache', 'evosim', 'results'))
+        super().__init__(directory, max_bytes)
+
+    @staticmethod
+    def describe_game(game):
+        """
+        :return: dict identifying the game and its initial population, without r
+        """
+        params = {name: value for name, value in game.get_params().items() if name != 'r'}
+        description = {'game': type(game).__module__ + '.' + type(game).__qualname__, 'params': params,
+                       'population': game.get_population_state(),
+                       # A stationary stop fills the rest of the levels with the mean of the last window
+                       'convergence': _settings(game.convergence, ('window', 'tolerance', 'stationary',
+                                                                   'check_every')),
+                       'recorder': _settings(game.recorder, ('stride', 'capacity'))}
+        if isinstance(game.population, dict):
+            players = [type(player).__name__ for player in game.population.values()]
+            description['players'] = hashlib.sha1(' '.join(players).encode()).hexdigest()
+        graph = getattr(game.population, 'graph', None)
+        if graph is not None:
+            description['graph'] = {'indptr': graph.indptr, 'indices': graph.indices}
+        return canonical(description)
+
+    @staticmethod
+    def describe(game_description, **point):
+        """
+        :param game_description: see describe_game
+        :param point: parameters of the point, e.g. r, seed, realizations, runs and
+                      population_args
+        :return: dict identifying the results of the point
+        """
+        return dict(canonical(point), game=game_description, code=code_version())
+
+    def path(self, key):
+        return os.path.join(self.directory, key + '.npz')
+
+    def load(self, key):
+        """
+        :return: dict of the cached arrays, or None if the point is not in the cache
+        """
+        try:
+            with np.load(self.path(key), allow_pickle=False) as data:
+                results = {name: data[name] for name in data.files if name != 'description'}
+        except (OSError, ValueError, EOFError):
+            return None
+        # The modification time is the time of the last use
+        os.utime(self.path(key))
+        return results
+
+    def store(self, key, results, description):
+        """
+        :param results: dict of arrays
+        :param description: see describe, stored with the results
+        """
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix='.tmp-')
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, description=np.frombuffer(json.dumps(description).encode(), dtype=np.uint8), **results)
+        os.replace(tmp, self.path(key))
+        self.evict_lru(keep=key)
+
+    def stat(self, name):
+        if not name.endswith('.npz'):
+            return None
+        stat = os.stat(os.path.join(self.directory, name))
+        return stat.st_mtime, stat.st_size, name[:-len('.npz')]
+
+    def remove(self, key):
+        os.remove(self.path(key))
+
+
+def _settings(obj, names):
+    if obj is None:
+        return None
+    return dict({name: getattr(obj, name) for name in names}, type=type(obj).__qualname__)
+
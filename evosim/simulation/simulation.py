@@ -15,13 +15,132 @@
 # limitations under the License.
 # ==============================================================================
 
-import numpy as np
-import matplotlib.pyplot as plt
 import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from time import time
 
+import numpy as np
+import matplotlib.pyplot as plt
+
+from evosim.rng import global_seed, spawn_seed, value_key
+from evosim.simulation.checkpoint import Checkpoint
+from evosim.simulation.memo import ResultCache
+from evosim.simulation.store import ResultStore
+from evosim.statistics.timer import NULL_TIMER, PhaseTimer
+
 logger = logging.getLogger(__name__)
 
+# Game, population arguments, base seed, initial population state, result store and
+# profiling flag of a worker process, see _init_worker
+_game = None
+_population_args = None
+_seed = None
+_initial_state = None
+_store = None
+_profile = False
+
+
+def _init_worker(game, population_args, seed, initial_state, store=None, profile=False):
+    """
+    Store the game in the worker process. With the fork start method the arguments are
+    inherited from the parent instead of pickled, so the players and their neighbour
+    lists are never serialized.
+    """
+    global _game, _population_args, _seed, _initial_state, _store, _profile
+    _game = game
+    _population_args = population_args
+    _seed = seed
+    _initial_state = initial_state
+    _store = store
+    _profile = profile
+
+
+def _start_unit(game, r_param, seed, key, initial_state):
+    """
+    Prepare the game for the work unit ``key`` = (r index, realization, run): every unit
+    starts from the same population state with its own random stream, so its result
+    does not depend on the units run before it by the same process. The stream is
+    spawned from the value of r instead of its index, so a unit keeps its results when
+    the range of r changes (see Simulation.recall_points).
+    """
+    _, s, run = key
+    game.r = r_param
+    game.unit = key
+    game.seed(spawn_seed(seed, (value_key(r_param), s, run)))
+    game.set_population_state(initial_state)
+    game.init_game()
+
+
+def _store_unit(store, game, population_args, seed, key, r_param, interval):
+    """
+    Add the run of the work unit ``key`` to the result store.
+    """
+    idx, s, run = key
+    params = dict(game.get_params(), r=r_param, r_index=idx, realization=s, run=run, **population_args)
+    insp_level = getattr(game, 'inspLevel', None)
+    store.append(params, seed, np.mean(game.coopLevel), 0.0 if insp_level is None else np.mean(insp_level),
+                 interval, game.coopLevel, insp_level if insp_level is not None else np.zeros_like(game.coopLevel))
+
+
+def _run_units(units):
+    """
+    Run a chunk of work units in a worker process. With a result store the runs of the
+    chunk are written as a segment of the worker.
+
+    :param units: list of (r index, realization, run, r)
+    :return: list of (r index, realization, run, mean coop level, mean insp level, elapsed time),
+             and PhaseTimer of the chunk if profiling (None otherwise)
+    """
+    results = []
+    timer = PhaseTimer() if _profile else None
+    _game.timer = timer if _profile else NULL_TIMER
+    for idx, s, run, r_param in units:
+        start_time = time()
+        _start_unit(_game, r_param, _seed, (idx, s, run), _initial_state)
+        with _game.timer.measure('init'):
+            _game.init_population(**_population_args)
+        _game.run()
+        insp = np.mean(_game.inspLevel) if hasattr(_game, 'inspLevel') else 0.0
+        interval = time() - start_time
+        if _store is not None:
+            _store_unit(_store, _game, _population_args, _seed, (idx, s, run), r_param, interval)
+        results.append((idx, s, run, np.mean(_game.coopLevel), insp, interval))
+    if _store is not None:
+        _store.flush()
+    if _game.recorder is not None:
+        # The recordings of a worker are not sent back, remove its spill files
+        _game.recorder.close()
+    return results, timer
+
+
+def chunk_units(costs, workers):
+    """
+    Split work units into chunks for a pool of workers. The units are ordered by
+    decreasing estimated cost (longest processing time first) and each chunk takes
+    about half of the remaining cost divided by the number of workers, so the first
+    chunks are large and the last ones are small enough to balance the load at the end
+    of the sweep.
+
+    :param costs: estimated cost of each work unit
+    :param workers: number of workers
+    :return: list of arrays of unit indices
+    """
+    costs = np.asarray(costs, dtype=np.float64)
+    order = np.argsort(-costs, kind='stable')
+    remaining = costs.sum()
+    chunks = []
+    start = 0
+    while start < len(order):
+        target = remaining / (2 * workers)
+        cumulative = np.cumsum(costs[order[start:]])
+        end = start + max(1, int(np.searchsorted(cumulative, target, side='right')))
+        chunks.append(order[start:end])
+        remaining -= costs[order[start:end]].sum()
+        start = end
+    return chunks
+
 
 class Simulation:
     """
@@ -31,7 +150,8 @@ class Simulation:
     the simulation.
 
     name: Name of the simulation
-    machine: local - run on a local machine
+    machine: local - run on a local machine, the work units (r, realization, run) are
+             spread over a pool of processes with all the cores by default
              remote - run on a remote machine
              hydra - run on hydra (an automatic configuration file for hydra will be generated)
              cluster -
@@ -39,6 +159,52 @@ class Simulation:
     kwargs: you can pass a dictionary with all additional objects needed for the simulation
             - In case you choose remote, you should include here the IP/Port/User/Password of
             the remote machine
+            - batch: if True, all the realizations, runs and r values are simulated together
+            with the batched engine of the game (PGGGame and PGGiGame only), seeded from
+            seed. It cannot be combined with checkpoint or memoize
+            - game: the game and its engine. The 'counts' and 'events' engines of the
+            well-mixed games use the payoffs of the current generation instead of the
+            payoffs the player objects accumulate over a run, so they simulate a
+            different model and their levels can differ widely from engine='object'
+            (see evosim.games.engines.CountEngine)
+            - workers: number of processes used to run the work units (machine='local'
+            defaults to os.cpu_count(), 1 runs them serially)
+            - seed: base seed of the sweep, every work unit (r, realization, run)
+            runs with its own random stream spawned from it (see evosim.rng), so serial
+            and parallel sweeps give the same results. Drawn from the global numpy
+            generator if not given
+            - population_args: keyword arguments of game.init_population (defaults to
+            ncoop and ninsp)
+            - checkpoint: path of a checkpoint file (see evosim.simulation.checkpoint),
+            the simulation can then be continued with resume()
+            - checkpoint_interval: seconds between two snapshots of a running game
+            - store_data: if True, the results of every run (parameters, seed, mean
+            levels and elapsed time) are appended to a ResultStore (see
+            evosim.simulation.store) in store_data_dir/name
+            - store_trajectories: if True, the stored runs keep the levels of every
+            generation as well
+            - store_plots: if True, the figure of the sweep is saved as
+            store_plots_dir/name.png
+            - x_scale: the r values of the figure of the sweep are divided by x_scale,
+            z+1 by default, which gives the eta = r/(z+1) axis. 1 plots the raw r
+            - show_micro_simulations: if True, the runs are plotted live by another
+            process (see evosim.vizualization.live.LivePlotter), every observe_every
+            generations. Not available with batch
+            - observers: list of Observer objects (see evosim.statistics.observer)
+            receiving snapshots of the runs. In a parallel sweep they are called in
+            the worker processes, on copies of the observers, so observers that keep
+            state or call functions of the parent process (e.g. a CallbackObserver
+            appending to a list) see nothing there; send the snapshots through a
+            multiprocessing queue as LivePlotter does. The batched engine has no
+            observers
+            - profile: if True, the time of every phase of the game loops (payoffs,
+            inspections, selection, mutation, bookkeeping) is measured with a
+            PhaseTimer (see evosim.statistics.timer), available as ``timer`` and
+            summarised in the report of the simulation
+            - memoize: True, a directory or a ResultCache (see
+            evosim.simulation.memo): the results of every r value are cached, and the
+            points whose game, population, seed and code did not change are read from
+            the cache instead of simulated. Only used with a seed
     """
 
     def __init__(self, name='default', machine='local', *args, **kwargs):
@@ -64,87 +230,394 @@ class Simulation:
         string = '#Simulation ' + str(self.name) + ': Started at ' + str(self.date_start) + ' and to finish at ' + str(self.date_end) + '\n'
         string += '##Runing on ' + str(self.machine) + '\n'
         string += '##Status: ' + str(self.__status) + '\n'
+        timer = self.get_timer()
+        if timer is not None and timer.times:
+            string += '##Phases:\n' + timer.summary() + '\n'
         return string
 
     def run(self):
-        x = np.arange(self.THRESHOLD, self.THRESHOLD + self.GENERATIONS)
         r_params = np.arange(self.r_min, self.r_max, self.r_step)
-        coop_avg_run = np.empty([1, self.runs])
-        insp_avg_run = np.empty([1, self.runs])
-        coop_avg_real = np.empty([1, self.realizations])
-        insp_avg_real = np.empty([1, self.realizations])
-        coop_avg = np.arange(self.r_min, self.r_max, self.r_step)
-        insp_avg = np.arange(self.r_min, self.r_max, self.r_step)
-
-        if self.show_micro_simulations:
-            plt.ion()  # Note this correction
-            fig = plt.figure(1)
-            ax = plt.axes(xlim=(-1, self.THRESHOLD + self.GENERATIONS), ylim=(-0.1, 1.2))
-
-        for idx, r_param in enumerate(r_params):
-            # Update r value
-            logger.info("Starting simulation with r = %f", r_param)
-            self.game.r = r_param
-            r_start_time = time()
-            for s in range(self.realizations):
-                # Init graph
-                for r in range(self.runs):
-                    logger.debug("Realization %i, run %i", s, r)
-                    start_time = time()
-                    # Init game
-                    self.game.init_game()
-                    # Init population
-                    self.game.init_population(ncoop=self.ncoop, ninsp=self.ninsp)
-                    self.game.run()
-                    interval = time() - start_time
-                    logger.debug("elapsed time: %s seconds", interval)
-
-                    # Update Avg.
-                    coop_avg_run[0][r] = np.mean(self.game.coopLevel)
-                    if self.game.__class__.__name__ == 'PGGiGame' or 'PGGiNetwork':
-                        insp_avg_run[0][r] = np.mean(self.game.inspLevel)
-
-                    if self.show_micro_simulations:
-                        plt.cla()
-                        # Save and Plot results
-                        r_text = ax.text(0.02, 0.95, '', transform=ax.transAxes)
-                        r_text.set_text('r = %.3f' % r_param)
-                        ax.plot(x, self.game.coopLevel, label='Fraction of cooperators', color='g', lw=2)
-                        if self.game.__class__.__name__ == 'PGGiGame' or 'PGGiNetwork':
-                            ax.plot(x, self.game.inspLevel, label='Fraction of inspectors', color='b', lw=2)
-                        ax.set_xlabel("generations")
-                        ax.set_ylabel("Fraction of players")
-                        ax.set_ylim(-0.1, 1.2)
-                        # plt.autoscale(True)
-                        ax.legend()
-                        plt.show()
-                        plt.pause(0.0001)
-
-                        # Init population
-                        # game.init_population(ncoop=ncoop, ninsp=ninsp)
-
-                # Update the Avg.
-                coop_avg_real[0][s] = np.mean(coop_avg_run)
-                if self.game.__class__.__name__ == 'PGGiGame' or 'PGGiNetwork':
-                    insp_avg_real[0][s] = np.mean(insp_avg_run)
-
-            coop_avg[idx] = np.mean(coop_avg_real)
-            insp_avg[idx] = np.mean(insp_avg_real)
-            r_interval = time() - r_start_time
-            logger.info("Simulation finished: elapsed time: %s seconds", r_interval)
-
-        if self.show_micro_simulations:
-            plt.ioff()
+        workers = self.get_workers()
+        if getattr(self, 'batch', False):
+            self.coop_avg, self.insp_avg = self.run_batch(r_params)
+        elif workers > 1:
+            self.coop_avg, self.insp_avg = self.run_parallel(r_params, workers)
+        else:
+            self.coop_avg, self.insp_avg = self.run_serial(r_params)
+        timer = self.get_timer()
+        if timer is not None:
+            logger.info("Time per phase:\n%s", timer.summary())
+        self.plot(r_params, self.coop_avg, self.insp_avg)
+
+    def resume(self):
+        """
+        Continue the simulation saved in the checkpoint file: the work units already
+        finished are not run again and, in a serial simulation, the run that was in
+        progress continues from its last snapshot with the same random numbers.
+        """
+        self.resuming = True
+        try:
+            self.run()
+        finally:
+            self.resuming = False
+
+    def get_workers(self):
+        workers = getattr(self, 'workers', None)
+        if workers is None:
+            workers = (os.cpu_count() or 1) if self.machine == 'local' else 1
+        return workers
+
+    def get_timer(self):
+        """
+        :return: PhaseTimer of the simulation if profile is set
+        """
+        if not getattr(self, 'profile', False):
+            return None
+        if getattr(self, 'timer', None) is None:
+            self.timer = PhaseTimer()
+        return self.timer
+
+    def start_observers(self):
+        """
+        Attach the observers of the simulation, and a live plotter if
+        show_micro_simulations is set, to the game.
+
+        :return: list of the attached observers
+        """
+        observers = list(getattr(self, 'observers', None) or [])
+        if getattr(self, 'show_micro_simulations', False):
+            from evosim.vizualization.live import LivePlotter
+            every = getattr(self, 'observe_every', max(1, self.game.generations // 200))
+            observers.append(LivePlotter(self.game.threshold + self.game.generations, (self.r_min, self.r_max),
+                                         every=every))
+        for observer in observers:
+            self.game.add_observer(observer)
+        return observers
+
+    def stop_observers(self, observers):
+        for observer in observers:
+            self.game.remove_observer(observer)
+            if hasattr(observer, 'close'):
+                observer.close()
+
+    def get_population_args(self):
+        if hasattr(self, 'population_args'):
+            return self.population_args
+        return {'ncoop': self.ncoop, 'ninsp': self.ninsp}
+
+    def init_sweep(self, r_params):
+        """
+        Result arrays of the sweep, indexed by (r index, realization, run), restored from
+        the checkpoint when resuming.
+
+        :param r_params: values of r
+        :return: sweep dict and, if a run was saved in progress, the state of the game
+        """
+        shape = (len(r_params), self.realizations, self.runs)
+        seed = getattr(self, 'seed', None)
+        sweep = {'r_params': r_params, 'coop_level': np.zeros(shape), 'insp_level': np.zeros(shape),
+                 'done': np.zeros(shape, dtype=bool), 'seed': global_seed() if seed is None else int(seed)}
+        game_state = None
+        checkpoint = self.get_checkpoint()
+        if getattr(self, 'resuming', False) and checkpoint is not None and checkpoint.exists():
+            state = checkpoint.load()
+            if not np.array_equal(state['sweep']['r_params'], r_params) or state['sweep']['done'].shape != shape:
+                raise ValueError("The checkpoint %s belongs to a different sweep" % checkpoint.path)
+            sweep.update(state['sweep'])
+            checkpoint.restore_rng(state)
+            game_state = state.get('game')
+            logger.info("Resuming from %s: %d of %d runs done", checkpoint.path, sweep['done'].sum(), sweep['done'].size)
+        if checkpoint is not None:
+            checkpoint.sweep = sweep
+        self._points = self.recall_points(sweep)
+        return sweep, game_state
+
+    def get_cache(self):
+        """
+        :return: ResultCache of the simulation if memoize is set and the seed is given
+        """
+        memoize = getattr(self, 'memoize', None)
+        if memoize is None or memoize is False or getattr(self, 'seed', None) is None:
+            return None
+        if not isinstance(memoize, ResultCache):
+            self.memoize = ResultCache(None if memoize is True else memoize)
+        return self.memoize
+
+    def recall_points(self, sweep):
+        """
+        Fill the sweep with the cached results of its r values.
+
+        :return: list of the cache key and description of every r value, or None without
+                 a cache
+        """
+        cache = self.get_cache()
+        if cache is None:
+            return None
+        game = ResultCache.describe_game(self.game)
+        points = []
+        for idx, r_param in enumerate(sweep['r_params']):
+            description = ResultCache.describe(game, r=r_param, seed=sweep['seed'],
+                                               realizations=self.realizations, runs=self.runs,
+                                               population_args=self.get_population_args())
+            key = cache.key(description)
+            points.append({'key': key, 'description': description, 'stored': False})
+            if sweep['done'][idx].all():
+                continue
+            results = cache.load(key)
+            if results is not None:
+                sweep['coop_level'][idx] = results['coop_level']
+                sweep['insp_level'][idx] = results['insp_level']
+                sweep['done'][idx] = True
+                points[-1]['stored'] = True
+        logger.info("%d of %d points read from the cache", sum(point['stored'] for point in points), len(points))
+        return points
+
+    def memorize_points(self, sweep):
+        """
+        Store the finished r values of the sweep in the cache.
+        """
+        if self._points is None:
+            return
+        cache = self.get_cache()
+        for idx, point in enumerate(self._points):
+            if not point['stored'] and sweep['done'][idx].all():
+                cache.store(point['key'], {'coop_level': sweep['coop_level'][idx],
+                                           'insp_level': sweep['insp_level'][idx]}, point['description'])
+                point['stored'] = True
+
+    def get_checkpoint(self):
+        """
+        :return: Checkpoint of the simulation if the 'checkpoint' kwarg (path) is set
+        """
+        if getattr(self, 'checkpoint', None) is None:
+            return None
+        if not isinstance(self.checkpoint, Checkpoint):
+            self.checkpoint = Checkpoint(self.checkpoint, interval=getattr(self, 'checkpoint_interval', 60.0))
+        return self.checkpoint
+
+    def get_store(self):
+        """
+        :return: ResultStore of the simulation if store_data is set
+        """
+        if not getattr(self, 'store_data', False):
+            return None
+        if getattr(self, '_store', None) is None:
+            directory = os.path.join(getattr(self, 'store_data_dir', ''), str(self.name))
+            self._store = ResultStore(directory, trajectories=getattr(self, 'store_trajectories', False))
+        return self._store
+
+    def unit_cost(self, r_param):
+        """
+        Relative cost of a run with the given r, used only to order the work units
+        before they are split into chunks (see chunk_units). It is a heuristic, not a
+        measured cost: runs stop (PGGiNetwork) or become cheap once cooperation dies
+        out, which tends to happen sooner for low values of r, so the cost is simply
+        taken to be r. A wrong guess only makes the chunks less balanced.
+        """
+        return r_param
+
+    def run_parallel(self, r_params, workers):
+        """
+        Run the realizations and runs of every r value in a pool of processes. The
+        results are gathered by (r index, realization, run), so they do not depend on
+        the number of workers or on the order in which the chunks finish. With a
+        checkpoint the sweep is saved every time a chunk finishes.
+
+        :param r_params: values of r
+        :param workers: number of processes
+        :return: average cooperation and inspection levels for each r
+        """
+        start_time = time()
+        sweep, _ = self.init_sweep(r_params)
+        done = sweep['done']
+        units = [(idx, s, r, r_param)
+                 for idx, r_param in enumerate(r_params)
+                 for s in range(self.realizations)
+                 for r in range(self.runs)
+                 if not done[idx, s, r]]
+        chunks = chunk_units([self.unit_cost(unit[3]) for unit in units], workers)
+        logger.info("Running %d work units in %d chunks with %d workers", len(units), len(chunks), workers)
+
+        if 'fork' in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context('fork')
+        else:
+            context = multiprocessing.get_context()
+        observers = self.start_observers()
+        try:
+            self.run_chunks(chunks, units, context, sweep, workers)
+        finally:
+            self.stop_observers(observers)
+
+        logger.info("Simulation finished: elapsed time: %s seconds", time() - start_time)
+        return sweep['coop_level'].mean(axis=2).mean(axis=1), sweep['insp_level'].mean(axis=2).mean(axis=1)
+
+    def run_chunks(self, chunks, units, context, sweep, workers):
+        """
+        Run the chunks of work units in a pool of processes and gather their results
+        in the sweep as they finish.
+        """
+        r_params = sweep['r_params']
+        checkpoint = self.get_checkpoint()
+        done = sweep['done']
+        if chunks:
+            with ProcessPoolExecutor(max_workers=min(workers, len(chunks)), mp_context=context,
+                                     initializer=_init_worker,
+                                     initargs=(self.game, self.get_population_args(), sweep['seed'],
+                                               self.game.get_population_state(), self.get_store(),
+                                               self.get_timer() is not None)) as executor:
+                futures = [executor.submit(_run_units, [units[i] for i in chunk]) for chunk in chunks]
+                for future in as_completed(futures):
+                    results, timer = future.result()
+                    if timer is not None:
+                        self.get_timer().merge(timer)
+                    for idx, s, r, coop, insp, interval in results:
+                        logger.debug("r = %f, realization %i, run %i: elapsed time: %s seconds",
+                                     r_params[idx], s, r, interval)
+                        sweep['coop_level'][idx, s, r] = coop
+                        sweep['insp_level'][idx, s, r] = insp
+                        done[idx, s, r] = True
+                    if checkpoint is not None:
+                        checkpoint.save()
+                    self.memorize_points(sweep)
+
+    def run_batch(self, r_params):
+        """
+        Run all the realizations and runs of every r value at once with the batched
+        engine of the game (see PGGGame.run_batch).
+
+        :param r_params: values of r
+        :return: average cooperation and inspection levels for each r
+        """
+        if not hasattr(self.game, 'run_batch'):
+            raise ValueError("%s has no batched engine, run it with batch=False" % type(self.game).__name__)
+        if getattr(self, 'checkpoint', None) is not None or getattr(self, 'memoize', None) not in (None, False):
+            raise ValueError("The batched engine cannot be combined with checkpoint or memoize")
+        if getattr(self, 'observers', None) or getattr(self, 'show_micro_simulations', False):
+            logger.warning("The batched engine does not notify observers, the runs are not shown")
+        start_time = time()
+        replicas = self.realizations * self.runs
+        population_args = self.get_population_args()
+        seed = getattr(self, 'seed', None)
+        seed = global_seed() if seed is None else int(seed)
+        # All the replicas draw from one stream, the root of the streams of the work units
+        self.game.seed(spawn_seed(seed, ()))
+        previous_timer = self.game.timer
+        timer = self.get_timer()
+        if timer is not None:
+            self.game.timer = timer
+        try:
+            coop_level, insp_level = self.game.run_batch(replicas=replicas, r_values=r_params, **population_args)
+        finally:
+            self.game.timer = previous_timer
+        interval = time() - start_time
+        logger.info("Simulation finished: elapsed time: %s seconds", interval)
+        store = self.get_store()
+        if store is not None:
+            params = dict(self.game.get_params(), **population_args)
+            for i in range(len(coop_level)):
+                idx, replica = divmod(i, replicas)
+                store.append(dict(params, r=r_params[idx], r_index=idx, replica=replica), seed,
+                             np.mean(coop_level[i]), np.mean(insp_level[i]), interval / len(coop_level),
+                             coop_level[i], insp_level[i])
+            store.flush()
+        coop_avg = np.mean(coop_level, axis=1).reshape(len(r_params), replicas).mean(axis=1)
+        insp_avg = np.mean(insp_level, axis=1).reshape(len(r_params), replicas).mean(axis=1)
+        return coop_avg, insp_avg
+
+    def run_serial(self, r_params):
+        """
+        Run the realizations and runs of every r value one after the other. With a
+        checkpoint the sweep is saved after every run, and the game every
+        checkpoint_interval seconds during a run.
+
+        :param r_params: values of r
+        :return: average cooperation and inspection levels for each r
+        """
+        sweep, game_state = self.init_sweep(r_params)
+        checkpoint = self.get_checkpoint()
+        store = self.get_store()
+        done = sweep['done']
+        initial_state = self.game.get_population_state()
+
+        self.game.checkpoint = checkpoint
+        # A timer attached to the game by the user is used unless profile is set, and
+        # restored afterwards
+        previous_timer = self.game.timer
+        timer = self.get_timer()
+        if timer is not None:
+            self.game.timer = timer
+        observers = self.start_observers()
+        try:
+            for idx, r_param in enumerate(r_params):
+                if done[idx].all():
+                    continue
+                logger.info("Starting simulation with r = %f", r_param)
+                r_start_time = time()
+                for s in range(self.realizations):
+                    # Init graph
+                    for r in range(self.runs):
+                        if done[idx, s, r]:
+                            continue
+                        logger.debug("Realization %i, run %i", s, r)
+                        start_time = time()
+                        # Init game
+                        _start_unit(self.game, r_param, sweep['seed'], (idx, s, r), initial_state)
+                        if game_state is not None:
+                            # Continue the run saved in the checkpoint
+                            self.game.set_state(game_state)
+                            game_state = None
+                        else:
+                            # Init population
+                            with self.game.timer.measure('init'):
+                                self.game.init_population(**self.get_population_args())
+                        self.game.run()
+                        interval = time() - start_time
+                        logger.debug("elapsed time: %s seconds", interval)
+
+                        # Update Avg.
+                        sweep['coop_level'][idx, s, r] = np.mean(self.game.coopLevel)
+                        if hasattr(self.game, 'inspLevel'):
+                            sweep['insp_level'][idx, s, r] = np.mean(self.game.inspLevel)
+                        done[idx, s, r] = True
+                        if store is not None:
+                            _store_unit(store, self.game, self.get_population_args(), sweep['seed'], (idx, s, r),
+                                        r_param, interval)
+                        if checkpoint is not None:
+                            # The stored runs must reach the disk before the checkpoint
+                            # marks them as done
+                            if store is not None:
+                                store.flush()
+                            checkpoint.save()
+
+                self.memorize_points(sweep)
+                r_interval = time() - r_start_time
+                logger.info("Simulation finished: elapsed time: %s seconds", r_interval)
+        finally:
+            self.game.checkpoint = None
+            self.game.timer = previous_timer
+            self.stop_observers(observers)
+            if store is not None:
+                store.flush()
+
+        return sweep['coop_level'].mean(axis=2).mean(axis=1), sweep['insp_level'].mean(axis=2).mean(axis=1)
+
+    def plot(self, r_params, coop_avg, insp_avg):
         # Save and Plot results
         plt.figure(2)
-        x_r = [r_param / (self.z + 1) for r_param in r_params]
+        x_scale = self.x_scale if hasattr(self, 'x_scale') else self.z + 1
+        x_r = [r_param / x_scale for r_param in r_params]
         plt.plot(x_r, coop_avg, label='Fraction of cooperators', color='g')
-        if self.game.__class__.__name__ == 'PGGiGame' or 'PGGiNetwork':
+        if hasattr(self.game, 'inspLevel'):
             plt.plot(x_r, insp_avg, label='Fraction of inspectors', color='b')
-        plt.xlim(self.r_min / (self.z + 1), self.r_max / (self.z + 1))
+        plt.xlim(self.r_min / x_scale, self.r_max / x_scale)
         plt.ylim(-0.1, 1.2)
-        plt.xlabel(r'$\eta = \frac{r}{z+1}$')
+        plt.xlabel(r'$\eta = \frac{r}{z+1}$' if x_scale != 1 else r'$r$')
         plt.ylabel("Fraction of players")
         # plt.autoscale(True)
         plt.legend()
+        if getattr(self, 'store_plots', False):
+            directory = getattr(self, 'store_plots_dir', '')
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            plt.savefig(os.path.join(directory, '%s.png' % self.name))
         plt.show()
@@ -0,0 +1,229 @@
+# ==============================================================================
+# EvoSim
+# Copyright © 2016 Elias F. Domingos. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+
+import json
+import logging
+import os
+from itertools import count
+from time import time_ns
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SUMMARY = ('seed', 'coop', 'insp', 'time')
+TRAJECTORIES = ('coop_trajectory', 'insp_trajectory', 'trajectory_offsets')
+
+_segment_ids = count()
+
+
+class ResultStore:
+    """
+    Append-only columnar store of the results of simulation runs.
+
+    Every run is a row with its parameters, the base seed of the sweep, the mean
+    cooperation and inspection levels and the elapsed time. Rows are buffered and written
+    in segments: a segment is a directory with one ``.npy`` file per column, the
+    trajectories of its runs concatenated in ``coop_trajectory.npy`` and
+    ``insp_trajectory.npy`` (with ``trajectory_offsets.npy``) when stored, and an
+    ``index.json`` with the number of rows and the range (numbers) or the values
+    (strings) of every column. A segment is written under a temporary name and renamed
+    when complete, and is never modified afterwards.
+
+    Every process writes its own segments, so the workers of a parallel sweep can share
+    a store without locking. Queries read the indexes first, skip the segments that
+    cannot match and load only the columns they need (memory-mapped), so the
+    trajectories are never read unless asked for.
+
+    :param directory: directory of the store, created if needed
+    :param trajectories: if True, store the cooperation and inspection levels of every
+                         generation as well
+    :param segment_rows: number of buffered rows written as one segment. A sweep with a
+                         checkpoint or a journal writes its rows before every save, so
+                         its segments can be smaller
+    """
+
+    def __init__(self, directory, trajectories=False, segment_rows=1000):
+        self.directory = directory
+        self.trajectories = trajectories
+        self.segment_rows = segment_rows
+        self._pid = None
+        self._rows = []
+
+    def append(self, params, seed, coop, insp, time, coop_trajectory=None, insp_trajectory=None):
+        """
+        Add the result of a run.
+
+        :param params: dict of parameter -> number or string
+        :param seed: base seed of the run, -1 if unknown
+        :param coop: mean cooperation level
+        :param insp: mean inspection level
+        :param time: elapsed time in seconds
+        :param coop_trajectory: cooperation level of every generation
+        :param insp_trajectory: inspection level of every generation
+        """
+        if self._pid != os.getpid():
+            # Rows buffered by the parent before a fork belong to the parent
+            self._pid = os.getpid()
+            self._rows = []
+        row = dict(params, seed=int(seed), coop=float(coop), insp=float(insp), time=float(time))
+        if self.trajectories:
+            row['coop_trajectory'] = np.asarray(coop_trajectory if coop_trajectory is not None else [],
+                                                dtype=np.float64)
+            row['insp_trajectory'] = np.asarray(insp_trajectory if insp_trajectory is not None else [],
+                                                dtype=np.float64)
+        self._rows.append(row)
+        if len(self._rows) >= self.segment_rows:
+            self.flush()
+
+    def flush(self):
+        """
+        Write the buffered rows of this process as a new segment.
+        """
+        if self._pid != os.getpid() or not self._rows:
+            return
+        rows, self._rows = self._rows, []
+        os.makedirs(self.directory, exist_ok=True)
+        name = 'segment-%d-%d-%d' % (os.getpid(), next(_segment_ids), time_ns())
+        tmp = os.path.join(self.directory, '.' + name)
+        os.makedirs(tmp)
+        names = [column for column in dict.fromkeys(key for row in rows for key in row) if column not in TRAJECTORIES]
+        index = {'rows': len(rows), 'columns': {}}
+        for column in names:
+            values = _column([row.get(column) for row in rows])
+            np.save(os.path.join(tmp, column + '.npy'), values)
+            index['columns'][column] = _describe(values)
+        if self.trajectories:
+            for column in ('coop_trajectory', 'insp_trajectory'):
+                np.save(os.path.join(tmp, column + '.npy'), np.concatenate([row[column] for row in rows]))
+            lengths = [len(row['coop_trajectory']) for row in rows]
+            np.save(os.path.join(tmp, 'trajectory_offsets.npy'), np.concatenate(([0], np.cumsum(lengths))))
+        index['trajectories'] = self.trajectories
+        with open(os.path.join(tmp, 'index.json'), 'w') as f:
+            json.dump(index, f)
+        os.rename(tmp, os.path.join(self.directory, name))
+        logger.debug("Stored %d rows in %s", len(rows), name)
+
+    def segments(self):
+        """
+        :return: names of the complete segments, oldest first
+        """
+        if not os.path.isdir(self.directory):
+            return []
+        names = [name for name in os.listdir(self.directory) if name.startswith('segment-')]
+        return sorted(names, key=lambda name: int(name.rsplit('-', 1)[1]))
+
+    def index(self):
+        """
+        :return: dict of segment -> index
+        """
+        indexes = {}
+        for name in self.segments():
+            with open(os.path.join(self.directory, name, 'index.json')) as f:
+                indexes[name] = json.load(f)
+        return indexes
+
+    def __len__(self):
+        return sum(index['rows'] for index in self.index().values())
+
+    def select(self, columns=None, **conditions):
+        """
+        Rows whose columns have the given values, e.g. ``store.select(nu=1.0, N=1000)``.
+
+        :param columns: columns to return, all the columns of the matching segments by
+                        default
+        :param conditions: column -> value, or list of accepted values
+        :return: dict of column -> array, with the 'segment' and 'row' of every result
+                 (see trajectory)
+        """
+        parts = []
+        for name, index in self.index().items():
+            if not all(_may_match(index['columns'].get(column), value) for column, value in conditions.items()):
+                continue
+            mask = np.ones(index['rows'], dtype=bool)
+            for column, value in conditions.items():
+                mask &= np.isin(self.load(name, column), np.atleast_1d(value))
+            rows = np.flatnonzero(mask)
+            if not len(rows):
+                continue
+            part = {column: self.load(name, column)[rows] for column in (columns or index['columns'])
+                    if column in index['columns']}
+            part['segment'] = np.full(len(rows), name)
+            part['row'] = rows
+            parts.append(part)
+        result = {}
+        for column in dict.fromkeys(column for part in parts for column in part):
+            like = next(part[column] for part in parts if column in part)
+            result[column] = np.concatenate([part[column] if column in part else _missing(like, len(part['row']))
+                                             for part in parts])
+        return result
+
+    def load(self, segment, column):
+        """
+        :return: memory-mapped column of a segment
+        """
+        return np.load(os.path.join(self.directory, segment, column + '.npy'), mmap_mode='r')
+
+    def trajectory(self, segment, row):
+        """
+        :return: cooperation and inspection levels of every generation of a run
+        """
+        offsets = self.load(segment, 'trajectory_offsets')
+        start, end = offsets[row], offsets[row + 1]
+        return np.array(self.load(segment, 'coop_trajectory')[start:end]), \
+            np.array(self.load(segment, 'insp_trajectory')[start:end])
+
+
+def _column(values):
+    """
+    Array of the values of a column; missing values are NaN in numeric columns and ''
+    in string columns.
+    """
+    if any(isinstance(value, str) for value in values):
+        return np.array(['' if value is None else str(value) for value in values])
+    if all(isinstance(value, (bool, int, np.integer)) for value in values):
+        return np.array(values, dtype=np.int64)
+    return np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+
+
+def _missing(like, n):
+    return np.full(n, '' if like.dtype.kind == 'U' else np.nan)
+
+
+def _describe(values):
+    if values.dtype.kind == 'U':
+        return {'values': sorted(set(values.tolist()))}
+    finite = values[~np.isnan(values)] if values.dtype.kind == 'f' else values
+    if not len(finite):
+        return {'min': None, 'max': None}
+    return {'min': finite.min().item(), 'max': finite.max().item()}
+
+
+def _may_match(description, value):
+    """
+    :return: False if the index of a column shows that no row has the value
+    """
+    if description is None:
+        return False
+    values = value if isinstance(value, (list, tuple, np.ndarray)) else [value]
+    if 'values' in description:
+        return any(str(v) in description['values'] for v in values)
+    if description['min'] is None:
+        return False
+    return any(isinstance(v, (int, float, np.number)) and description['min'] <= v <= description['max']
+               for v in values)
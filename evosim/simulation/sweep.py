@@ -0,0 +1,351 @@
+# ==============================================================================
+# EvoSim
+# Copyright © 2016 Elias F. Domingos. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+
+import inspect
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from time import time
+
+import numpy as np
+
+from evosim.rng import global_seed, spawn_seed
+from evosim.simulation.simulation import chunk_units
+
+logger = logging.getLogger(__name__)
+
+# Sweep run by a worker process, see _init_worker
+_sweep = None
+
+# Parameters of a game that set the size of its population or of its arrays, which
+# can only change by building a new game
+STRUCTURAL_PARAMETERS = ('N', 'threshold', 'generations', 'engine')
+
+
+def _init_worker(sweep):
+    global _sweep
+    _sweep = sweep
+
+
+def _run_units(units):
+    """
+    :param units: list of (point, run)
+    :return: list of journal records
+    """
+    records = [_sweep.run_unit(point, run) for point, run in units]
+    if _sweep.store is not None:
+        _sweep.store.flush()
+    game = _sweep._built[1] if _sweep._built is not None else None
+    if game is not None and game.recorder is not None:
+        # The recordings of a worker are not sent back, remove its spill files
+        game.recorder.close()
+    return records
+
+
+def expand_grid(grid):
+    """
+    Points of a parameter grid.
+
+    :param grid: dict of parameter -> list of values, expanded as a Cartesian product
+                 (single values are fixed), or list of such dicts, whose points are
+                 concatenated
+    :return: list of dicts of parameter -> value
+    """
+    if isinstance(grid, dict):
+        grid = [grid]
+    points = []
+    for part in grid:
+        names = list(part)
+        values = [value if isinstance(value, (list, tuple, np.ndarray)) else [value] for value in part.values()]
+        for combination in itertools.product(*values):
+            points.append({name: _to_python(value) for name, value in zip(names, combination)})
+    return points
+
+
+def _to_python(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+
+class Journal:
+    """
+    Append-only record of the finished work units of a sweep, one JSON object per line.
+    The first line describes the sweep. Each record is flushed to disk as soon as its
+    unit has finished, so after an interruption at most the units that were running are
+    lost; an incomplete last line is ignored.
+
+    :param path: path of the journal file
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def load(self):
+        """
+        :return: header and list of records
+        """
+        header, records = None, []
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    logger.warning("Incomplete line ignored in %s", self.path)
+                    continue
+                if header is None:
+                    header = entry
+                else:
+                    records.append(entry)
+        return header, records
+
+    def start(self, header):
+        with open(self.path, 'w') as f:
+            f.write(json.dumps(header) + '\n')
+
+    def append(self, records):
+        with open(self.path, 'a') as f:
+            for record in records:
+                f.write(json.dumps(record) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+
+class Sweep:
+    """
+    Sweep over a grid of parameters of a game, its population or its network.
+
+    Every point of the grid is run ``runs`` times; each (point, run) is a work unit with
+    its own random stream spawned from the base seed, so the results do not depend on
+    the order of the units or on the number of workers. The parameters of a point are
+    applied by name:
+
+    - arguments of ``factory`` (e.g. N, z or the parameters of the network) build a new
+      game, which is reused by the following units with the same arguments
+    - arguments of ``game.init_population`` (e.g. ncoop, ninsp) initialise the population
+    - parameters of the game (``game.parameters``, e.g. r, c, nu, alpha, gamma, delta,
+      mutation) are set on the game before ``init_game``; the structural ones (N,
+      threshold, generations and engine) can only be arguments of ``factory``
+
+    With a ``journal`` the finished units are recorded on disk, and a sweep created with
+    the same grid and journal only runs the units that are missing. The units are run by
+    a pool of ``workers`` processes of the local machine (see Simulation.run_parallel).
+
+    :param grid: parameter grid, see expand_grid
+    :param game: game whose parameters are swept
+    :param factory: function returning a new game for the given parameters, instead of
+                    game
+    :param runs: number of runs of every point
+    :param population_args: default arguments of game.init_population
+    :param seed: base seed, read from the journal when resuming and drawn from the
+                 global numpy generator by default
+    :param journal: path of the journal file
+    :param workers: number of processes, all the cores by default
+    :param cost: function of the parameters of a point estimating the cost of a run,
+                 used to balance the chunks of work units
+    :param store: ResultStore (see evosim.simulation.store) receiving every run, written
+                  by the process that runs it
+    """
+
+    def __init__(self, grid, game=None, factory=None, runs=1, population_args=None, seed=None, journal=None,
+                 workers=None, cost=None, store=None):
+        if (game is None) == (factory is None):
+            raise ValueError("Give either a game or a factory")
+        self.points = expand_grid(grid)
+        self.game = game
+        self.factory = factory
+        self.runs = runs
+        self.population_args = population_args if population_args is not None else {}
+        self.seed = seed
+        self.journal = Journal(journal) if journal is not None else None
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        self.cost = cost
+        self.store = store
+        self.coop_level = np.zeros((len(self.points), runs))
+        self.insp_level = np.zeros((len(self.points), runs))
+        self.done = np.zeros((len(self.points), runs), dtype=bool)
+        self.factory_args = set(inspect.signature(factory).parameters) if factory is not None else set()
+        self._built = None
+        self._defaults = {}
+
+    def load_journal(self):
+        """
+        Restore the finished units from the journal, or start a new journal.
+        """
+        if self.journal is not None and self.journal.exists():
+            header, records = self.journal.load()
+            if header is None or header['points'] != json.loads(json.dumps(self.points)):
+                raise ValueError("The journal %s belongs to a different sweep" % self.journal.path)
+            if self.seed is not None and int(self.seed) != header['seed']:
+                raise ValueError("The journal %s was written with seed %d" % (self.journal.path, header['seed']))
+            self.seed = header['seed']
+            for record in records:
+                if record['run'] < self.runs:
+                    self.record(record)
+            logger.info("Resuming from %s: %d of %d units done", self.journal.path, self.done.sum(), self.done.size)
+            return
+        if self.seed is None:
+            self.seed = global_seed()
+        if self.journal is not None:
+            self.journal.start({'points': self.points, 'seed': int(self.seed)})
+
+    def record(self, record):
+        point, run = record['point'], record['run']
+        self.coop_level[point, run] = record['coop']
+        self.insp_level[point, run] = record['insp']
+        self.done[point, run] = True
+
+    def units(self):
+        """
+        :return: list of the (point, run) units not done yet
+        """
+        return [(point, run) for point in range(len(self.points)) for run in range(self.runs)
+                if not self.done[point, run]]
+
+    def get_game(self, point):
+        """
+        :return: game for the point and the population state its runs start from
+        """
+        if self.factory is None:
+            if self._built is None:
+                self._built = (None, self.game, self.game.get_population_state())
+            return self._built[1], self._built[2]
+        args = {name: value for name, value in self.points[point].items() if name in self.factory_args}
+        key = json.dumps(args, sort_keys=True)
+        if self._built is None or self._built[0] != key:
+            game = self.factory(**args)
+            self._built = (key, game, game.get_population_state())
+        return self._built[1], self._built[2]
+
+    def apply(self, game, point):
+        """
+        Set the game attributes of the point, restoring those that other points changed.
+
+        :return: arguments of init_population
+        :raises ValueError: if a parameter of the point is neither an argument of the
+                            factory or of init_population nor a non-structural
+                            parameter of the game
+        """
+        population_args = dict(self.population_args)
+        init_args = inspect.signature(game.init_population).parameters
+        attributes = [name for name in game.parameters if name not in STRUCTURAL_PARAMETERS]
+        defaults = self._defaults.setdefault(id(game), {})
+        params = {name: value for name, value in self.points[point].items() if name not in self.factory_args}
+        for name, value in defaults.items():
+            if name not in params:
+                setattr(game, name, value)
+        for name, value in params.items():
+            if name in init_args:
+                population_args[name] = value
+            elif name in attributes:
+                defaults.setdefault(name, getattr(game, name))
+                setattr(game, name, value)
+            else:
+                allowed = sorted(self.factory_args) + [name for name in init_args if name != 'self'] + attributes
+                hint = ' (a structural parameter, which must be an argument of the factory)' \
+                    if name in STRUCTURAL_PARAMETERS else ''
+                raise ValueError("Parameter '%s'%s cannot be swept, use one of %s" % (name, hint, ', '.join(allowed)))
+        return population_args
+
+    def run_unit(self, point, run):
+        """
+        :return: journal record of the unit
+        """
+        start_time = time()
+        game, initial_state = self.get_game(point)
+        population_args = self.apply(game, point)
+        game.seed(spawn_seed(self.seed, (point, run)))
+        game.set_population_state(initial_state)
+        game.init_game()
+        game.init_population(**population_args)
+        game.run()
+        insp = float(np.mean(game.inspLevel)) if hasattr(game, 'inspLevel') else 0.0
+        if self.store is not None:
+            params = dict(game.get_params(), **population_args)
+            params.update(self.points[point], point=point, run=run)
+            self.store.append(params, self.seed, np.mean(game.coopLevel), insp, time() - start_time,
+                              game.coopLevel, getattr(game, 'inspLevel', np.zeros_like(game.coopLevel)))
+        return {'point': point, 'run': run, 'params': self.points[point], 'coop': float(np.mean(game.coopLevel)),
+                'insp': insp, 'converged': game.converged, 'time': time() - start_time}
+
+    def run(self):
+        """
+        Run the units that are not done yet.
+
+        :return: mean cooperation and inspection levels of every run, arrays of shape
+                 (points, runs)
+        """
+        start_time = time()
+        self.load_journal()
+        units = self.units()
+        try:
+            if self.workers > 1 and len(units) > 1:
+                self.run_parallel(units)
+            else:
+                for point, run in units:
+                    self.finish([self.run_unit(point, run)])
+        finally:
+            if self.store is not None:
+                self.store.flush()
+        logger.info("Sweep finished: %d units in %s seconds", len(units), time() - start_time)
+        return self.coop_level, self.insp_level
+
+    def run_parallel(self, units):
+        costs = [self.cost(self.points[point]) if self.cost is not None else 1.0 for point, _ in units]
+        chunks = chunk_units(costs, self.workers)
+        logger.info("Running %d work units in %d chunks with %d workers", len(units), len(chunks), self.workers)
+        if 'fork' in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context('fork')
+        else:
+            context = multiprocessing.get_context()
+        # Units of the same point next to each other, so that a worker builds its game once
+        chunks = [sorted(units[i] for i in chunk) for chunk in chunks]
+        with ProcessPoolExecutor(max_workers=min(self.workers, len(chunks)), mp_context=context,
+                                 initializer=_init_worker, initargs=(self,)) as executor:
+            futures = [executor.submit(_run_units, chunk) for chunk in chunks]
+            for future in as_completed(futures):
+                self.finish(future.result())
+
+    def finish(self, records):
+        for record in records:
+            self.record(record)
+            logger.debug("Point %d %s, run %d: elapsed time: %s seconds", record['point'], record['params'],
+                         record['run'], record['time'])
+        if self.journal is not None:
+            # The stored runs must reach the disk before the journal marks them as done
+            if self.store is not None:
+                self.store.flush()
+            self.journal.append(records)
+
+    def table(self):
+        """
+        :return: list of dicts with the parameters of every point and the mean
+                 cooperation and inspection levels over its finished runs
+        """
+        rows = []
+        for point, params in enumerate(self.points):
+            done = self.done[point]
+            row = dict(params, runs=int(done.sum()))
+            row['coop'] = float(self.coop_level[point, done].mean()) if done.any() else None
+            row['insp'] = float(self.insp_level[point, done].mean()) if done.any() else None
+            rows.append(row)
+        return rows
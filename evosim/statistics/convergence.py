@@ -0,0 +1,101 @@
+# ==============================================================================
+# EvoSim
+# Copyright © 2016 Elias F. Domingos. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class ConvergenceMonitor:
+    """
+    Early termination of the runs of a game.
+
+    The monitor is called by the game loop after the data of each generation have been
+    recorded (``game.end_generation``) and stops the run when
+
+    - absorbing: the population is in an absorbing state of the dynamics
+      (``game.is_absorbing()``), e.g. all defectors without mutation. The remaining
+      generations of coopLevel/inspLevel are filled with the current levels, which is
+      exactly what the rest of the run would have recorded.
+    - stationary: the means of the last two windows of ``window`` recorded generations
+      differ by less than ``tolerance`` for every level. The remaining generations are
+      filled with the mean of the last window, so the average of the series is an
+      estimate of the stationary average.
+
+    After the run ``game.converged`` holds 'absorbing', 'stationary' or None and
+    ``game.converged_generation`` the generation at which the run stopped.
+
+    :param window: number of recorded generations of each window of the stationarity test
+    :param tolerance: maximum difference between the means of the two windows
+    :param stationary: if False, only absorbing states stop the run
+    :param check_every: the stationarity test runs every check_every generations
+                        (window // 10 by default)
+    """
+
+    def __init__(self, window=100, tolerance=0.01, stationary=True, check_every=None):
+        self.window = window
+        self.tolerance = tolerance
+        self.stationary = stationary
+        self.check_every = check_every if check_every is not None else max(1, window // 10)
+
+    @staticmethod
+    def levels(game):
+        """
+        :return: dict of the level series of the game and their current value
+        """
+        levels = {'coopLevel': game.nc / game.N}
+        if hasattr(game, 'inspLevel'):
+            levels['inspLevel'] = game.ni / game.N
+        return levels
+
+    def check(self, game):
+        """
+        :param game: game whose current generation has just been recorded
+        :return: True if the run can stop
+        """
+        # Index of the current generation in the series
+        idx = game.current_generation - game.threshold
+        if idx >= game.generations - 1:
+            return False
+
+        if game.is_absorbing():
+            for name, level in self.levels(game).items():
+                getattr(game, name)[max(idx + 1, 1):] = level
+            return self.stop(game, 'absorbing')
+
+        if self.stationary and idx > 2 * self.window and idx % self.check_every == 0:
+            means = {}
+            for name in self.levels(game):
+                series = getattr(game, name)
+                previous = np.mean(series[idx - 2 * self.window + 1:idx - self.window + 1])
+                means[name] = np.mean(series[idx - self.window + 1:idx + 1])
+                if abs(means[name] - previous) >= self.tolerance:
+                    return False
+            for name, mean in means.items():
+                getattr(game, name)[idx + 1:] = mean
+            return self.stop(game, 'stationary')
+        return False
+
+    @staticmethod
+    def stop(game, reason):
+        game.converged = reason
+        game.converged_generation = game.current_generation
+        logger.debug("[%d] %s state reached", game.current_generation, reason)
+        return True
@@ -0,0 +1,82 @@
+# ==============================================================================
+# EvoSim
+# Copyright © 2016 Elias F. Domingos. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+
+from collections import namedtuple
+
+# State of a run passed to the observers: generation, fractions of cooperators and of
+# inspectors (0 without inspectors), r of the game (None if it has none), key of the
+# work unit of the run (see AbstractGame.unit) and whether the run has finished
+Snapshot = namedtuple('Snapshot', ['generation', 'coop', 'insp', 'r', 'unit', 'final'])
+
+
+def snapshot(game, final=False):
+    return Snapshot(game.current_generation, game.nc / game.N, getattr(game, 'ni', 0) / game.N,
+                    getattr(game, 'r', None), game.unit, final)
+
+
+class Observer:
+    """
+    Receives snapshots of the runs of a game (``game.add_observer(observer)``).
+
+    The game loops call ``update`` every ``every`` generations of a run and ``finish``
+    when the run ends (last generation or convergence). A snapshot is a few numbers, so
+    observers are cheap for the game; observers that do slow work (plotting, writing)
+    should hand the snapshots to another thread or process, see
+    :class:`evosim.vizualization.live.LivePlotter`.
+
+    Only the game loops notify the observers: the batched engine
+    (``PGGGame.run_batch``) does not. In the worker processes of a parallel sweep the
+    observers are copies, so their state and the functions they call live in the
+    worker; observers meant to reach the parent process must send the snapshots
+    through a multiprocessing queue, as LivePlotter does.
+
+    :param every: generations between two updates, only the end of the runs if 0
+    """
+
+    def __init__(self, every=1):
+        self.every = every
+
+    def update(self, snapshot):
+        pass
+
+    def finish(self, snapshot):
+        pass
+
+
+class CallbackObserver(Observer):
+    """
+    Observer calling functions of a snapshot. In a parallel sweep the functions run in
+    the worker processes, so a function that collects the snapshots in the parent
+    process receives nothing (see Observer).
+
+    :param on_update: function called every ``every`` generations
+    :param on_finish: function called at the end of every run
+    """
+
+    def __init__(self, on_update=None, on_finish=None, every=1):
+        super().__init__(every)
+        self.on_update = on_update
+        self.on_finish = on_finish
+
+    def update(self, snapshot):
+        if self.on_update is not None:
+            self.on_update(snapshot)
+
+    def finish(self, snapshot):
+        if self.on_finish is not None:
+            self.on_finish(snapshot)
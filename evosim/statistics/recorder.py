@@ -0,0 +1,221 @@
+# ==============================================================================
+# EvoSim
+# Copyright © 2016 Elias F. Domingos. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+
+import logging
+import os
+import shutil
+import tempfile
+import weakref
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def cooperation(game):
+    return game.nc / game.N
+
+
+def inspection(game):
+    return game.ni / game.N
+
+
+def actions(game):
+    """
+    :return: action of every player
+    """
+    engine = game.get_engine()
+    if engine is not None and hasattr(engine, 'population'):
+        return engine.population.action
+    return np.array([player.action for player in game.population.values()], dtype=np.int8)
+
+
+def _remove_directory(directory, pid):
+    # Forked workers share the temporary directory of the parent, only the process
+    # that created it removes it
+    if os.getpid() == pid:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+class Recorder:
+    """
+    Records observables of a game every ``stride`` generations.
+
+    The game loops call ``record`` at the end of each generation (see
+    ``AbstractGame.end_generation``). The buffers are allocated when a run starts, one
+    row per sample, so recording does not allocate. With ``capacity`` the buffers are
+    rings that keep the last ``capacity`` samples only. When the buffers of a run would
+    take more than ``memory_budget`` bytes, the largest ones are memory-mapped ``.npy``
+    files in ``directory`` instead, which can be loaded again with ``np.load``. Each run
+    writes its own files, named after the observable, the process, the work unit of the
+    game (see ``AbstractGame.unit``) and the number of the run, so the runs of the
+    worker processes of a sweep do not overwrite each other (see ``path``). A temporary
+    directory is removed by ``close``, or when the recorder is garbage collected.
+
+    :param observables: dict of name -> function of the game returning a number or an
+                        array of fixed shape; by default the fractions of cooperators
+                        ('coop') and, if the game has inspectors, of inspectors ('insp')
+    :param stride: generations between two samples
+    :param capacity: maximum number of samples kept, all of them if None
+    :param memory_budget: maximum size in bytes of the buffers kept in memory
+    :param directory: directory of the memory-mapped buffers, a temporary directory by
+                      default
+    """
+
+    def __init__(self, observables=None, stride=1, capacity=None, memory_budget=2 ** 28, directory=None):
+        self.observables = observables
+        self.stride = stride
+        self.capacity = capacity
+        self.memory_budget = memory_budget
+        self.directory = directory
+        self.buffers = {}
+        self.generation = None
+        self.count = 0
+        self.runs = 0
+        self.prefix = None
+        self._cleanup = None
+
+    def start(self, game):
+        """
+        Allocate the buffers for a run of the game.
+        """
+        unit = '' if game.unit is None else '-' + '-'.join(str(part) for part in game.unit)
+        self.prefix = '%d%s-%d' % (os.getpid(), unit, self.runs)
+        self.runs += 1
+        self.allocate(game)
+
+    def allocate(self, game):
+        """
+        Allocate the buffers of the current run, memory-mapped in the files of ``prefix``
+        beyond the memory budget.
+        """
+        if self.observables is None:
+            self.observables = {'coop': cooperation}
+            if hasattr(game, 'inspLevel'):
+                self.observables['insp'] = inspection
+        size = -(-(game.generations + game.threshold) // self.stride)
+        if self.capacity is not None:
+            size = min(size, self.capacity)
+
+        specs = {}
+        for name, observable in self.observables.items():
+            value = np.asarray(observable(game))
+            specs[name] = ((size,) + value.shape, value.dtype)
+        nbytes = {name: int(np.prod(shape)) * dtype.itemsize for name, (shape, dtype) in specs.items()}
+
+        in_memory = sum(nbytes.values())
+        self.buffers = {}
+        for name in sorted(specs, key=nbytes.get, reverse=True):
+            shape, dtype = specs[name]
+            if in_memory > self.memory_budget:
+                self.buffers[name] = np.lib.format.open_memmap(self.path(name), mode='w+', dtype=dtype, shape=shape)
+                in_memory -= nbytes[name]
+                logger.debug("%s recorded in %s", name, self.path(name))
+            else:
+                self.buffers[name] = np.empty(shape, dtype=dtype)
+        self.generation = np.empty(size, dtype=np.int64)
+        self.count = 0
+
+    def get_state(self):
+        """
+        State of the current run, saved with the game by a checkpoint (see
+        ``AbstractGame.get_state``): the samples so far, copied from the memory-mapped
+        buffers too, their number and the file prefix of the run.
+
+        :return: dict of numbers, strings and numpy arrays
+        """
+        return {'prefix': self.prefix, 'runs': self.runs, 'count': self.count, 'generation': np.copy(self.generation),
+                'buffers': {name: np.array(buffer) for name, buffer in self.buffers.items()}}
+
+    def set_state(self, game, state):
+        """
+        Continue the run saved by get_state: the buffers are allocated again, in the files
+        of the saved run if they are memory-mapped, and filled with the saved samples.
+
+        :param game: game whose state has been restored
+        """
+        self.prefix = state['prefix']
+        self.runs = int(state['runs'])
+        self.allocate(game)
+        self.generation[:] = state['generation']
+        for name, buffer in self.buffers.items():
+            buffer[:] = state['buffers'][name]
+        self.count = int(state['count'])
+
+    def path(self, name):
+        """
+        :param name: observable
+        :return: file of the observable in the current run, <name>-<pid>[-<unit>]-<run>.npy
+        """
+        if self.directory is None:
+            self.directory = tempfile.mkdtemp(prefix='evosim-')
+            self._cleanup = weakref.finalize(self, _remove_directory, self.directory, os.getpid())
+        return os.path.join(self.directory, '%s-%s.npy' % (name, self.prefix))
+
+    def record(self, game):
+        if game.current_generation % self.stride:
+            return
+        i = self.count % len(self.generation)
+        self.generation[i] = game.current_generation
+        for name, observable in self.observables.items():
+            self.buffers[name][i] = observable(game)
+        self.count += 1
+
+    def finish(self):
+        """
+        Flush the memory-mapped buffers at the end of a run.
+        """
+        for buffer in self.buffers.values():
+            if isinstance(buffer, np.memmap):
+                buffer.flush()
+
+    def close(self):
+        """
+        Release the memory-mapped buffers and remove the temporary directory, if the
+        recorder created one. A directory given by the user is kept.
+        """
+        self.buffers = {name: buffer for name, buffer in self.buffers.items() if not isinstance(buffer, np.memmap)}
+        if self._cleanup is not None:
+            self._cleanup()
+            self._cleanup = None
+            self.directory = None
+
+    def spilled(self):
+        """
+        :return: names of the observables recorded on disk
+        """
+        return [name for name, buffer in self.buffers.items() if isinstance(buffer, np.memmap)]
+
+    def ordered(self, buffer):
+        if self.count <= len(buffer):
+            return buffer[:self.count]
+        start = self.count % len(buffer)
+        return np.concatenate((buffer[start:], buffer[:start]))
+
+    def get(self, name):
+        """
+        :param name: observable
+        :return: recorded samples in chronological order
+        """
+        return self.ordered(self.buffers[name])
+
+    def generations(self):
+        """
+        :return: generation of each sample
+        """
+        return self.ordered(self.generation)
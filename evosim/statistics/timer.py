@@ -0,0 +1,121 @@
+# ==============================================================================
+# EvoSim
+# Copyright © 2016 Elias F. Domingos. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+
+from contextlib import contextmanager, nullcontext
+from time import perf_counter
+
+
+class PhaseTimer:
+    """
+    Wall time and number of calls of the phases of the game loops.
+
+    A loop calls ``start`` once and ``lap(phase)`` at the end of every phase: the time
+    since the previous lap is added to that phase, so timing a generation costs one
+    clock read per phase. Phases outside the loops, e.g. building a network, are timed
+    with ``measure``. The games use ``NULL_TIMER``, whose methods do nothing, unless a
+    PhaseTimer is given to them (``game.timer = PhaseTimer()``).
+
+    Phases of the game loops: payoff (group games or payoffs, with the inspections of
+    the well-mixed PGGiGame and of the PGGiNetwork player objects), inspection,
+    selection, mutation and bookkeeping (counters, recorded levels, convergence and
+    logging).
+    """
+    enabled = True
+
+    def __init__(self):
+        self.times = {}
+        self.calls = {}
+        self._last = perf_counter()
+
+    def start(self):
+        self._last = perf_counter()
+
+    def lap(self, phase):
+        now = perf_counter()
+        self.times[phase] = self.times.get(phase, 0.0) + now - self._last
+        self.calls[phase] = self.calls.get(phase, 0) + 1
+        self._last = now
+
+    def add(self, phase, seconds, calls=1):
+        self.times[phase] = self.times.get(phase, 0.0) + seconds
+        self.calls[phase] = self.calls.get(phase, 0) + calls
+
+    @contextmanager
+    def measure(self, phase):
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.add(phase, perf_counter() - start)
+
+    def merge(self, other):
+        """
+        Add the phases of another timer, e.g. of a worker process.
+        """
+        for phase, seconds in other.times.items():
+            self.add(phase, seconds, other.calls[phase])
+
+    def reset(self):
+        self.times.clear()
+        self.calls.clear()
+        self.start()
+
+    def total(self):
+        return sum(self.times.values())
+
+    def stats(self):
+        """
+        :return: dict of phase -> dict with the total time, number of calls, mean time per
+                 call and fraction of the total time, by decreasing time
+        """
+        total = self.total()
+        return {phase: {'time': seconds, 'calls': self.calls[phase], 'mean': seconds / self.calls[phase],
+                        'fraction': seconds / total if total else 0.0}
+                for phase, seconds in sorted(self.times.items(), key=lambda item: -item[1])}
+
+    def summary(self):
+        lines = ['%-16s %10s %10s %12s %7s' % ('phase', 'time (s)', 'calls', 'mean (us)', '%')]
+        for phase, stat in self.stats().items():
+            lines.append('%-16s %10.4f %10d %12.2f %6.1f%%' % (phase, stat['time'], stat['calls'],
+                                                               stat['mean'] * 1e6, 100 * stat['fraction']))
+        return '\n'.join(lines)
+
+    def __str__(self):
+        return self.summary()
+
+
+class NullTimer(PhaseTimer):
+    """
+    Timer that records nothing, used when the instrumentation is off.
+    """
+    enabled = False
+
+    def start(self):
+        pass
+
+    def lap(self, phase):
+        pass
+
+    def add(self, phase, seconds, calls=1):
+        pass
+
+    def measure(self, phase):
+        return nullcontext()
+
+
+NULL_TIMER = NullTimer()
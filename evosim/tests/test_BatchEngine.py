@@ -0,0 +1,64 @@
+# ==============================================================================
+# EvoSim
+# Copyright © 2016 Elias F. Domingos. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+
+from unittest import TestCase
+
+import numpy as np
+from evosim.games.engines import BatchEngine
+from evosim.games.games import PGGiGame
+from evosim.players.players import generate_players
+from evosim.simulation.simulation import Simulation
+
+
+class TestBatchEngine(TestCase):
+    def test_sequential_update(self):
+        np.random.seed(0)
+        for _ in range(50):
+            action = np.random.randint(0, 3, size=(3, 20)).astype(np.int8)
+            model = np.random.randint(0, 20, size=(3, 20))
+            switch = np.random.uniform(0, 1, size=(3, 20)) < 0.7
+            expected = action.copy()
+            for b in range(3):
+                for i in range(20):
+                    if switch[b, i]:
+                        expected[b, i] = expected[b, model[b, i]]
+            np.testing.assert_array_equal(BatchEngine.sequential_update(action, model, switch), expected)
+
+    def test_run_batch(self):
+        np.random.seed(0)
+        game = PGGiGame(generate_players([['PureStrategyPlayer', 1.0]], nplayers=50), generations=30)
+        coop_level, insp_level = game.run_batch(replicas=4, r_values=[2.0, 4.0, 6.0], ncoop=0.4, ninsp=0.2)
+        self.assertEqual(coop_level.shape, (12, 30))
+        self.assertEqual(insp_level.shape, (12, 30))
+        self.assertTrue(np.all(coop_level + insp_level <= 1))
+        self.assertEqual(game.r, 1.0)
+
+    def test_simulation(self):
+        def simulation(**kwargs):
+            game = PGGiGame(generate_players([['PureStrategyPlayer', 1.0]], nplayers=30), generations=20)
+            return Simulation('batch', 'local', game=game, runs=2, realizations=2, batch=True, **kwargs)
+
+        # Seeded batched sweeps are reproducible and take the population arguments
+        coop, insp = simulation(seed=5, population_args={'ncoop': 0.0, 'ninsp': 0.0}).run_batch([2.0, 4.0])
+        np.testing.assert_array_equal(coop, 0.0)
+        args = {'ncoop': 0.4, 'ninsp': 0.2}
+        np.testing.assert_array_equal(simulation(seed=5, population_args=args).run_batch([2.0, 4.0])[0],
+                                      simulation(seed=5, population_args=args).run_batch([2.0, 4.0])[0])
+        for kwargs in ({'checkpoint': 'sweep.npz'}, {'memoize': True}):
+            with self.assertRaises(ValueError):
+                simulation(seed=5, **kwargs).run_batch([2.0])
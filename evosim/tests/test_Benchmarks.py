@@ -0,0 +1,48 @@
+# ==============================================================================
+# EvoSim
+# Copyright © 2016 Elias F. Domingos. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+
+from unittest import TestCase
+
+from evosim.benchmarks.suite import cases, compare, run_suite
+
+
+class TestBenchmarks(TestCase):
+    def test_cases(self):
+        selected = cases(games=['PGGiNetwork'], engines=['object', 'array'], players=['BMPlayer'])
+        self.assertNotIn(('object', 'random'), [(case['engine'], case['network']) for case in selected])
+        self.assertEqual(max(case['N'] for case in selected if case['engine'] == 'object'), 10 ** 4)
+        self.assertEqual(max(case['N'] for case in selected if case['engine'] == 'array'), 10 ** 6)
+        self.assertEqual(len(cases(games=['PGGGame'], sizes=[100])), 3)
+
+    def test_run_compare(self):
+        selected = cases(games=['PGGiGame', 'PGGiNetwork'], engines=['counts', 'array'], networks=['grid'],
+                         players=['Population', 'PGGiPlayer'], sizes=[100])
+        baseline = run_suite(selected, generations=5, min_time=0.0)
+        self.assertEqual([result['name'] for result in baseline['results']],
+                         ['PGGiGame/counts/Population/N=100', 'PGGiNetwork/array/PGGiPlayer/grid/N=100'])
+        network = baseline['results'][1]
+        self.assertGreater(network['graph_build_time'], 0)
+        self.assertGreater(network['peak_memory'], 0)
+
+        _, regressions = compare(baseline, baseline)
+        self.assertEqual(regressions, [])
+        slower = {'results': [dict(result, generations_per_s=result['generations_per_s'] / 2)
+                              for result in baseline['results']]}
+        _, regressions = compare(baseline, slower)
+        self.assertEqual({(name, metric) for name, metric, _, _, _ in regressions},
+                         {(result['name'], 'generations_per_s') for result in baseline['results']})
@@ -0,0 +1,81 @@
+# ==============================================================================
+# EvoSim
+# Copyright © 2016 Elias F. Domingos. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+
+import os
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+from evosim.games.games import PGGiNetwork
+from evosim.players.players import generate_players
+from evosim.simulation.checkpoint import Checkpoint
+from evosim.simulation.simulation import Simulation
+
+from evosim.network.network import barabasi_albert_graph
+
+
+class Interrupted(Exception):
+    pass
+
+
+class InterruptedCheckpoint(Checkpoint):
+    """
+    Checkpoint that stops the simulation after a number of snapshots.
+    """
+    def __init__(self, path, snapshots):
+        super().__init__(path, interval=0.0)
+        self.snapshots = snapshots
+
+    def save(self, game=None):
+        super().save(game)
+        self.snapshots -= 1
+        if not self.snapshots:
+            raise Interrupted()
+
+
+class TestCheckpoint(TestCase):
+    def simulation(self, engine, checkpoint):
+        players = generate_players([['PGGiPlayer', 1.0]], nplayers=60)
+        barabasi_albert_graph(players, z=4, seed=5)
+        game = PGGiNetwork(players, generations=40, nu=0.5, engine=engine)
+        return Simulation('test', 'local', game=game, r_min=3.0, r_max=5.0, r_step=1.0, runs=2, realizations=1,
+                          ncoop=0.5, ninsp=0.2, workers=1, show_micro_simulations=False, THRESHOLD=0,
+                          GENERATIONS=40, checkpoint=checkpoint, checkpoint_interval=0.0)
+
+    def check_resume(self, engine):
+        path = os.path.join(tempfile.mkdtemp(), 'sim.npz')
+        r_params = np.arange(3.0, 5.0, 1.0)
+        sim = self.simulation(engine, None)
+        np.random.seed(0)
+        expected = sim.run_serial(r_params)
+
+        sim = self.simulation(engine, InterruptedCheckpoint(path, snapshots=70))
+        np.random.seed(0)
+        with self.assertRaises(Interrupted):
+            sim.run_serial(r_params)
+        self.assertIn('game', Checkpoint(path).load())
+
+        sim = self.simulation(engine, path)
+        sim.resuming = True
+        np.testing.assert_array_equal(sim.run_serial(r_params), expected)
+
+    def test_resume_object(self):
+        self.check_resume('object')
+
+    def test_resume_array(self):
+        self.check_resume('array')
@@ -0,0 +1,50 @@
+# ==============================================================================
+# EvoSim
+# Copyright © 2016 Elias F. Domingos. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+
+from unittest import TestCase
+
+import numpy as np
+from evosim.games.games import PGGGame, PGGSocialControl
+from evosim.players.players import generate_players
+from evosim.statistics.convergence import ConvergenceMonitor
+
+
+class TestConvergenceMonitor(TestCase):
+    def test_absorbing(self):
+        np.random.seed(0)
+        game = PGGGame(generate_players([['PureStrategyPlayer', 1.0]], nplayers=50), generations=500, r=1.5,
+                       convergence=ConvergenceMonitor(stationary=False))
+        game.init_game()
+        game.init_population(ncoop=0.5)
+        game.run()
+        self.assertEqual(game.converged, 'absorbing')
+        self.assertLess(game.converged_generation, 499)
+        self.assertEqual(game.nc, 0)
+        np.testing.assert_array_equal(game.coopLevel[game.converged_generation:], 0)
+
+    def test_stationary(self):
+        np.random.seed(0)
+        game = PGGSocialControl(generate_players([['PGGscPlayer', 1.0]], nplayers=1000), generations=5000,
+                                r=3.0, mutation=0.05, engine='counts',
+                                convergence=ConvergenceMonitor(window=50, tolerance=0.02))
+        game.init_game()
+        game.init_population(dni=0.25, cni=0.25, di=0.25, ci=0.25)
+        game.run()
+        self.assertEqual(game.converged, 'stationary')
+        stop = game.converged_generation
+        np.testing.assert_allclose(game.coopLevel[stop + 1:], np.mean(game.coopLevel[stop - 49:stop + 1]))
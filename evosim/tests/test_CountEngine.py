@@ -0,0 +1,118 @@
+# ==============================================================================
+# EvoSim
+# Copyright © 2016 Elias F. Domingos. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+
+from unittest import TestCase
+
+import numpy as np
+from evosim.games.engines import hit_classes
+from evosim.games.games import PGGGame, PGGiGame, PGGSocialControl
+from evosim.games.markov import MarkovChain
+from evosim.players.population import Population
+
+
+class TestCountEngine(TestCase):
+    def test_hit_classes(self):
+        np.random.seed(0)
+        for targets, hits in [(0, 5), (7, 0), (1, 5), (10, 3), (100, 10 ** 5)]:
+            k, counts = hit_classes(targets, hits, np.random.default_rng(0))
+            self.assertEqual(counts.sum(), targets)
+            self.assertTrue(np.all(k <= hits))
+
+    def test_social_control(self):
+        np.random.seed(0)
+        game = PGGSocialControl(Population(1000), generations=50, r=3.0, engine='counts')
+        game.init_game()
+        game.init_population(dni=0.25, cni=0.25, di=0.25, ci=0.25)
+        game.run()
+        self.assertEqual(game.get_engine().counts.sum(), 1000)
+        self.assertEqual(game.nc + game.nd, 1000)
+        self.assertTrue(np.all((game.coopLevel >= 0) & (game.coopLevel <= 1)))
+
+    def test_distribution(self):
+        # The number of cooperators after 10 generations is distributed as in the
+        # Markov chain of the per-round payoffs
+        runs, generations = 600, 10
+        finals = []
+        for seed in range(runs):
+            game = PGGSocialControl(Population(5), generations=generations, r=4.0, alpha=0.5, gamma=1.0, delta=0.1,
+                                    engine='counts')
+            game.seed(seed)
+            game.init_game()
+            game.init_population(dni=0.4, cni=0.4, di=0.0, ci=0.2)
+            game.run()
+            finals.append(game.nc)
+        chain = MarkovChain(game)
+        step = chain.transition_matrix().T.tocsr()
+        distribution = np.zeros(len(chain.states))
+        distribution[chain.index([2, 2, 0, 1])] = 1
+        for _ in range(5 * generations):
+            distribution = step @ distribution
+        expected = np.bincount(chain.states[:, 1] + chain.states[:, 3], weights=distribution, minlength=6)
+        observed = np.bincount(finals, minlength=6) / runs
+        np.testing.assert_array_less(np.abs(observed - expected), 4 * np.sqrt(expected * (1 - expected) / runs) + 0.01)
+
+    def test_monomorphic(self):
+        np.random.seed(0)
+        game = PGGiGame(Population(100), generations=20, r=3.0, engine='counts')
+        game.init_game()
+        game.init_population(ncoop=1.0, ninsp=0.0)
+        game.run()
+        self.assertEqual(game.nc, 100)
+        np.testing.assert_array_equal(game.coopLevel[1:], 1.0)
+
+    def test_events_state(self):
+        def game():
+            game = PGGSocialControl(Population(50), generations=40, r=4.0, alpha=0.5, gamma=1.0, delta=0.1,
+                                    mutation=0.01, engine='events')
+            game.seed(3)
+            game.init_game()
+            game.init_population(cni=0.5, ci=0.2, dni=0.3)
+            return game
+
+        expected = game()
+        expected.run()
+        # Stop after generation 20 and continue the run in a fresh game
+        interrupted = game()
+        interrupted.generations = 21
+        interrupted.run()
+        state = interrupted.get_state()
+        resumed = game()
+        resumed.set_state(state)
+        resumed.run()
+        np.testing.assert_array_equal(resumed.coopLevel[21:], expected.coopLevel[21:])
+        np.testing.assert_array_equal(resumed.get_engine().counts, expected.get_engine().counts)
+
+    def test_events(self):
+        levels = []
+        for _ in range(2):
+            game = PGGGame(Population(200), generations=300, r=3.0, engine='events')
+            game.seed(4)
+            game.init_game()
+            game.init_population(ncoop=0.5)
+            game.run()
+            levels.append(game.coopLevel)
+            self.assertEqual(game.get_engine().counts.sum(), 200)
+        np.testing.assert_array_equal(levels[0], levels[1])
+        # Defection dominates in the well-mixed game
+        self.assertEqual(levels[0][-1], 0.0)
+
+        game = PGGiGame(Population(100), generations=20, r=3.0, engine='events')
+        game.init_game()
+        game.init_population(ncoop=1.0, ninsp=0.0)
+        game.run()
+        np.testing.assert_array_equal(game.coopLevel[1:], 1.0)
@@ -0,0 +1,78 @@
+# ==============================================================================
+# EvoSim
+# Copyright © 2016 Elias F. Domingos. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+
+from unittest import TestCase
+
+import numpy as np
+from evosim.games.games import PGGSocialControl
+from evosim.games.markov import MarkovChain
+from evosim.players.population import Population
+
+
+class TestMarkovChain(TestCase):
+    def setUp(self):
+        self.game = PGGSocialControl(Population(5), generations=100, r=3.0, alpha=0.5, gamma=1.0, delta=0.1,
+                                     mutation=0.0, engine='counts')
+        self.chain = MarkovChain(self.game)
+
+    def test_states(self):
+        self.assertEqual(len(self.chain.states), 56)
+        self.assertEqual(self.chain.index(self.chain.states[17]), 17)
+
+    def test_transition_matrix(self):
+        transition = self.chain.transition_matrix()
+        np.testing.assert_allclose(transition.sum(axis=1), 1)
+        self.assertGreaterEqual(transition.min(), 0)
+
+    def test_absorbing(self):
+        result = self.chain.solve([2.0, 4.0], start=[0, 5, 0, 0])
+        np.testing.assert_allclose(result['coop'], 1)
+        np.testing.assert_allclose(result['insp'], 0)
+        with self.assertRaises(ValueError):
+            self.chain.stationary_distribution()
+
+    def test_stationary_distribution(self):
+        self.game.mutation = 0.01
+        distribution = self.chain.stationary_distribution()
+        self.assertAlmostEqual(distribution.sum(), 1)
+        np.testing.assert_allclose(distribution @ self.chain.transition_matrix(), distribution, atol=1e-12)
+
+    def test_game_untouched(self):
+        self.game.init_population(ci=0.2, cni=0.4, di=0.2, dni=0.2)
+        counts = self.game.nc, self.game.ni, self.game.nd
+        self.chain.transition_matrix()
+        self.assertEqual((self.game.nc, self.game.ni, self.game.nd), counts)
+        self.assertEqual(self.game.M, 0)
+        self.game.init_game()
+        self.assertAlmostEqual(self.chain.normalisation(), self.game.M)
+
+    def test_counts_engine(self):
+        # The levels averaged over the runs of the counts engine are those of the chain
+        game = PGGSocialControl(Population(5), generations=20, r=4.0, alpha=0.5, gamma=1.0, delta=0.1,
+                                mutation=0.0, engine='counts')
+        expected = MarkovChain(game).solve([4.0], start=[2, 2, 0, 1])
+        coop, insp = [], []
+        for seed in range(600):
+            game.seed(seed)
+            game.init_game()
+            game.init_population(dni=0.4, cni=0.4, di=0.0, ci=0.2)
+            game.run()
+            coop.append(np.mean(game.coopLevel[1:]))
+            insp.append(np.mean(game.inspLevel[1:]))
+        for levels, level in ((coop, expected['coop'][0]), (insp, expected['insp'][0])):
+            self.assertLess(abs(np.mean(levels) - level), 4 * np.std(levels) / np.sqrt(len(levels)))
@@ -0,0 +1,88 @@
+# ==============================================================================
+# EvoSim
+# Copyright © 2016 Elias F. Domingos. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+from unittest import TestCase
+
+import numpy as np
+from evosim.games.games import PGGiGame, PGGiNetwork, PGGSocialControl
+from evosim.players.players import generate_players, BMPlayer, PGGscPlayer
+from evosim.players.population import Population
+from evosim.rng import RandomStream, skip_sample
+
+from evosim.network.network import regular_network
+
+
+class TestMutation(TestCase):
+    def test_skip_sample(self):
+        rng = np.random.default_rng(0)
+        sizes = [skip_sample(1000, 0.1, rng).size for _ in range(500)]
+        self.assertAlmostEqual(np.mean(sizes), 100, delta=2)
+        sample = skip_sample(10 ** 6, 1e-3, rng)
+        self.assertTrue(np.all(np.diff(sample) > 0) and sample[-1] < 10 ** 6)
+        self.assertEqual(skip_sample(10, 0.0, rng).size, 0)
+        np.testing.assert_array_equal(skip_sample(10, 1.0, rng), np.arange(10))
+
+    def test_social_control_player(self):
+        player = PGGscPlayer(0)
+        player.rng = RandomStream(np.random.default_rng(1))
+        strategies = []
+        for _ in range(3000):
+            before = 2 * player.inspector + player.action
+            player.mutate()
+            strategies.append(2 * player.inspector + player.action)
+            self.assertNotEqual(strategies[-1], before)
+        self.assertAlmostEqual(np.bincount(strategies).min() / 3000, 0.25, delta=0.03)
+
+    def test_games(self):
+        # With mutation a monomorphic population does not stay monomorphic
+        for engine in ('object', 'counts', 'events'):
+            population = generate_players([['PureStrategyPlayer', 1.0]], nplayers=200) if engine == 'object' \
+                else Population(200)
+            game = PGGiGame(population, generations=50, r=3.0, mutation=0.01, engine=engine)
+            game.seed(2)
+            game.init_game()
+            game.init_population(ncoop=1.0, ninsp=0.0)
+            game.run()
+            self.assertFalse(game.is_absorbing())
+            self.assertLess(game.coopLevel[1:].min(), 1.0)
+            if engine != 'object':
+                self.assertEqual(game.get_engine().counts.sum(), 200)
+
+        players = generate_players([['PGGscPlayer', 1.0]], nplayers=200)
+        game = PGGSocialControl(players, generations=50, r=3.0, mutation=0.05)
+        game.seed(3)
+        game.init_game()
+        game.init_population(dni=1.0, cni=0.0, di=0.0)
+        game.run()
+        self.assertEqual(game.nc, sum(player.action for player in players.values()))
+        self.assertEqual(game.ni, sum(player.inspector for player in players.values()))
+        self.assertEqual(game.nd, 200 - game.nc)
+        self.assertEqual(len(game.inspectors), game.ni)
+
+    def test_bm_players(self):
+        # Bush-Mosteller learners never mutate into inspectors
+        for engine in ('object', 'array'):
+            players = generate_players([['BMPlayer', 0.5], ['PGGiPlayer', 0.5]], nplayers=100)
+            regular_network(players, 4)
+            game = PGGiNetwork(players, generations=5, r=3.0, mutation=1.0, engine=engine)
+            game.seed(4)
+            game.init_game()
+            game.init_population(ncoop=0.5, ninsp=0.0)
+            game.run()
+            actions = [player.action for player in players.values() if isinstance(player, BMPlayer)]
+            self.assertTrue(set(actions) <= {0, 1})
+            self.assertIn(2, [player.action for player in players.values() if not isinstance(player, BMPlayer)])
@@ -0,0 +1,77 @@
+# ==============================================================================
+# EvoSim
+# Copyright © 2016 Elias F. Domingos. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+import os
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+from evosim.network.cache import NetworkCache
+from evosim.network.graph import Graph
+from evosim.network.network import barabasi_albert_graph, ConfigurationNetwork, RandomNetwork, \
+    ScaleFreeNetwork
+
+
+class TestNetworkCache(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = NetworkCache(self.directory)
+
+    def test_get(self):
+        graph = self.cache.get(ScaleFreeNetwork(2), 1000, seed=1)
+        self.assertEqual(graph, ScaleFreeNetwork(2).build(1000, 1))
+        self.assertEqual(len(self.cache.entries()), 1)
+        cached = self.cache.get(ScaleFreeNetwork(2), 1000, seed=1)
+        self.assertIsInstance(cached.indices, np.memmap)
+        self.assertEqual(cached, graph)
+        self.cache.get(ScaleFreeNetwork(3), 1000, seed=1)
+        self.cache.get(ScaleFreeNetwork(2), 1000, seed=2)
+        self.cache.get(ScaleFreeNetwork(2), 1000)
+        self.assertEqual(len(self.cache.entries()), 3)
+
+        ba = self.cache.get(barabasi_albert_graph, 200, z=4, seed=5)
+        self.assertEqual(ba, Graph.from_generator(barabasi_albert_graph, 200, z=4, seed=5))
+        self.assertEqual(self.cache.get(barabasi_albert_graph, 200, z=4, seed=5), ba)
+
+        with self.assertRaisesRegex(TypeError, 'ConfigurationNetwork is not cacheable'):
+            self.cache.get(ConfigurationNetwork(lambda n, rng: np.full(n, 4)), 100, seed=1)
+        regular = ConfigurationNetwork(np.full(100, 4))
+        self.assertEqual(self.cache.get(regular, 100, seed=1), regular.build(100, 1))
+
+    def test_integrity(self):
+        graph = self.cache.get(RandomNetwork(z=4), 500, seed=3)
+        (_, _, key), = self.cache.entries()
+        with open(self.cache.path(key, 'indices.npy'), 'r+b') as f:
+            f.seek(-4, os.SEEK_END)
+            f.write(b'\xff\xff\xff\x7f')
+        self.assertIsNone(self.cache.load(key))
+        self.assertEqual(self.cache.entries(), [])
+        self.assertEqual(self.cache.get(RandomNetwork(z=4), 500, seed=3), graph)
+
+    def test_evict_lru(self):
+        for seed in range(3):
+            self.cache.get(RandomNetwork(z=4), 1000, seed=seed)
+        first = self.cache.key(self.cache.describe(RandomNetwork(z=4), 1000, 0))
+        old = self.cache.path(self.cache.key(self.cache.describe(RandomNetwork(z=4), 1000, 1)), 'meta.json')
+        os.utime(old, (0, 0))
+        size = self.cache.size()
+        self.cache.evict_lru(max_bytes=size - 1)
+        self.assertEqual(len(self.cache.entries()), 2)
+        self.assertFalse(os.path.exists(old))
+        self.assertIsNotNone(self.cache.load(first))
+        self.cache.clear()
+        self.assertEqual(self.cache.size(), 0)
@@ -0,0 +1,86 @@
+# ==============================================================================
+# EvoSim
+# Copyright © 2016 Elias F. Domingos. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+
+import queue
+from unittest import TestCase
+
+import numpy as np
+from evosim.games.games import PGGiGame
+from evosim.players.population import Population
+from evosim.simulation.simulation import Simulation
+from evosim.statistics.convergence import ConvergenceMonitor
+from evosim.statistics.observer import CallbackObserver, Snapshot
+from evosim.vizualization.live import LivePlotter, plot_loop
+
+
+class TestObserver(TestCase):
+    def setUp(self):
+        self.updates = []
+        self.finished = []
+        self.observer = CallbackObserver(self.updates.append, self.finished.append, every=5)
+
+    def test_callbacks(self):
+        game = PGGiGame(Population(50), generations=20, r=3.0, engine='counts')
+        game.add_observer(self.observer)
+        for run in range(2):
+            game.unit = run
+            game.init_game()
+            game.init_population(ncoop=0.5, ninsp=0.1)
+            game.run()
+        self.assertEqual([snapshot.generation for snapshot in self.updates], [0, 5, 10, 15] * 2)
+        self.assertEqual([snapshot.unit for snapshot in self.finished], [0, 1])
+        self.assertTrue(self.finished[-1].final)
+        self.assertAlmostEqual(self.finished[-1].coop, game.coopLevel[-1])
+        self.assertEqual(self.finished[-1].r, 3.0)
+
+        # The end of a run that converges early
+        game.convergence = ConvergenceMonitor()
+        game.init_game()
+        game.init_population(ncoop=1.0, ninsp=0.0)
+        game.run()
+        self.assertLess(self.finished[-1].generation, 19)
+
+    def test_plot_loop(self):
+        snapshots = queue.Queue()
+        for unit in range(3):
+            for generation in range(10):
+                snapshots.put(Snapshot(generation, 0.5, 0.1, 2.0 + unit, unit, generation == 9))
+        snapshots.put(None)
+        self.assertGreaterEqual(plot_loop(snapshots, 10, (1.0, 5.0), fps=1000, backend='Agg'), 1)
+
+    def test_simulation(self):
+        game = PGGiGame(Population(20), generations=10, engine='counts')
+        sim = Simulation('live', 'local', game=game, r_min=1.0, r_max=3.0, r_step=1.0, runs=2, realizations=1,
+                         ncoop=0.5, ninsp=0.1, seed=3, observers=[self.observer])
+        coop, _ = sim.run_parallel(np.arange(1.0, 3.0), workers=2)
+        # The workers call their copy of the observer, the parent keeps none
+        self.assertEqual(game.observers, [])
+        np.testing.assert_array_equal(sim.run_serial(np.arange(1.0, 3.0))[0], coop)
+        self.assertEqual(sorted(snapshot.unit for snapshot in self.finished), [(0, 0, 0), (0, 0, 1), (1, 0, 0),
+                                                                               (1, 0, 1)])
+
+    def test_live_plotter(self):
+        plotter = LivePlotter(20, (1.0, 3.0), every=2, backend='Agg')
+        game = PGGiGame(Population(20), generations=20, engine='counts')
+        game.add_observer(plotter)
+        game.init_game()
+        game.init_population()
+        game.run()
+        plotter.close(timeout=30)
+        self.assertEqual(plotter.process.exitcode, 0)
+        self.assertEqual(plotter.dropped, 0)
@@ -0,0 +1,134 @@
+# ==============================================================================
+# EvoSim
+# Copyright © 2016 Elias F. Domingos. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+
+from unittest import TestCase
+
+import numpy as np
+from evosim.games.games import PGGiNetwork
+from evosim.players.players import generate_players
+
+from evosim.network.network import barabasi_albert_graph, regular_network
+
+
+class TestPGGiNetwork(TestCase):
+    def setUp(self):
+        self.players = generate_players([['PGGiPlayer', 1.0]], nplayers=100)
+        barabasi_albert_graph(self.players, z=4, seed=5)
+        self.game = PGGiNetwork(self.players, generations=10, r=3.0, nu=0.5, engine='array')
+        np.random.seed(1)
+        self.game.init_game()
+        self.game.init_population(ncoop=0.5, ninsp=0.0)
+        self.population = self.game._engine.population
+        self.engine = self.game._engine
+        for i, player in enumerate(self.players.values()):
+            player.init_action(int(self.population.action[i]))
+            player.init_params()
+            player.set_p_limit(self.game.local_max_p, self.game.local_min_p)
+
+    def test_payoff_limits(self):
+        np.testing.assert_allclose(self.population.maxP, [player.maxP for player in self.players.values()])
+        np.testing.assert_allclose(self.population.minP, [player.minP for player in self.players.values()])
+
+    def test_cached_payoff_limits(self):
+        game = PGGiNetwork(self.players, generations=10, r=3.0, nu=0.5)
+        game.init_population()
+        np.testing.assert_allclose([player.maxP for player in self.players.values()], self.population.maxP)
+        limits = game.p_limits(game.get_graph())
+        self.assertIs(game.p_limits(game.get_graph())[0], limits[0])
+        game.r = 4.0
+        self.assertIsNot(game.p_limits(game.get_graph())[0], limits[0])
+        # A new topology is read again from the neighbors lists
+        graph = game.get_graph()
+        self.assertIs(game.get_graph(), graph)
+        barabasi_albert_graph(self.players, z=4, seed=6)
+        self.assertNotEqual(game.get_graph(), graph)
+        # Lists edited by hand are read again after invalidate_limits
+        graph = game.get_graph()
+        self.players[0].neighbors = self.players[0].neighbors[:-1]
+        self.assertIs(game.get_graph(), graph)
+        game.invalidate_limits()
+        self.assertEqual(game.get_graph().degree[0], graph.degree[0] - 1)
+
+    def test_group_games(self):
+        self.engine.play_group_games()
+        for player in self.players.values():
+            player.play_group_game(self.game.calculate_payoff_game, self.game.nu)
+        np.testing.assert_allclose(self.population.total_payoff,
+                                   [player.total_payoff for player in self.players.values()])
+
+    def test_inspection_round(self):
+        # The closed form of the sequential inspections of the array engine gives the
+        # payoffs of the object engine on average, also when several inspectors find the
+        # same defector (dense ring)
+        self.check_inspections(self.players, [0.4, 0.35, 0.25])
+        players = generate_players([['PGGiPlayer', 1.0]], nplayers=40)
+        regular_network(players, 12)
+        self.check_inspections(players, [0.2, 0.4, 0.4])
+
+    def check_inspections(self, players, frequencies, repeats=400):
+        game = PGGiNetwork(players, generations=10, r=3.0, nu=0.5, engine='array')
+        game.init_game()
+        game.init_population()
+        engine = game.get_engine()
+        n = len(players)
+        action = np.random.default_rng(0).choice(3, size=n, p=frequencies)
+        array_payoff = np.empty((repeats, n))
+        object_payoff = np.empty((repeats, n))
+        np.random.seed(2)
+        for repeat in range(repeats):
+            game.seed(repeat)
+            engine.population.action[:] = action
+            engine.population.init_params()
+            engine.play_group_games()
+            array_payoff[repeat] = engine.population.total_payoff
+            for player, player_action in zip(players.values(), action.tolist()):
+                player.init_action(player_action)
+                player.init_params()
+            for player in players.values():
+                player.play_group_game(game.calculate_payoff_game, game.nu)
+            object_payoff[repeat] = [player.total_payoff for player in players.values()]
+        self.assertGreater(array_payoff.std(axis=0).max(), 0)
+        error = np.sqrt((array_payoff.var(axis=0) + object_payoff.var(axis=0)) / repeats)
+        self.assertTrue(np.all(np.abs(array_payoff.mean(axis=0) - object_payoff.mean(axis=0)) <= 5 * error + 1e-9))
+
+    def test_run(self):
+        self.game.run()
+        self.assertEqual(self.game.nc, sum(player.action == 0 for player in self.players.values()))
+        self.assertTrue(np.all((self.game.coopLevel >= 0) & (self.game.coopLevel <= 1)))
+
+    def test_incremental_engine(self):
+        levels = []
+        for engine in ('array', 'incremental'):
+            game = PGGiNetwork(self.players, generations=200, r=4.5, nu=0.5, engine=engine)
+            game.seed(7)
+            game.init_game()
+            game.init_population(ncoop=0.5, ninsp=0.1)
+            game.run()
+            levels.append((game.coopLevel, game.inspLevel, game.get_engine().population.action.copy()))
+        for array, incremental in zip(*levels):
+            np.testing.assert_array_equal(array, incremental)
+
+    def test_unknown_engine(self):
+        with self.assertRaises(ValueError):
+            PGGiNetwork(self.players, engine='gpu')
+
+    def test_no_batch(self):
+        players = generate_players([['PGGiPlayer', 1.0]], nplayers=10)
+        regular_network(players, 2)
+        with self.assertRaises(ValueError):
+            PGGiNetwork(players, generations=10, r=3.0).run_batch(replicas=2)
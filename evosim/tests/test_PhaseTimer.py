@@ -0,0 +1,88 @@
+# ==============================================================================
+# EvoSim
+# Copyright © 2016 Elias F. Domingos. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+
+from unittest import TestCase
+
+import numpy as np
+from evosim.games.games import PGGiGame, PGGiNetwork, PGGSocialControl
+from evosim.network.network import ScaleFreeNetwork
+from evosim.players.players import generate_players
+from evosim.players.population import Population
+from evosim.simulation.simulation import Simulation
+from evosim.statistics.timer import NULL_TIMER, PhaseTimer
+
+
+class TestPhaseTimer(TestCase):
+    def run_game(self, game, timer, **population_args):
+        game.timer = timer
+        game.seed(4)
+        game.init_game()
+        game.init_population(**population_args)
+        game.run()
+        return np.copy(game.coopLevel)
+
+    def test_network(self):
+        timer = PhaseTimer()
+        population = Population(500)
+        ScaleFreeNetwork(z=4).assign(population, seed=1, timer=timer)
+        self.assertEqual(set(timer.times), {'network.edges', 'network.csr', 'network.assign'})
+
+        game = PGGiNetwork(population, generations=20, r=4.0, mutation=0.01, engine='array')
+        coop = self.run_game(game, timer, ncoop=0.5, ninsp=0.2)
+        for phase in ('payoff', 'inspection', 'selection', 'mutation', 'bookkeeping'):
+            self.assertEqual(timer.calls[phase], 20)
+        self.assertAlmostEqual(sum(stat['fraction'] for stat in timer.stats().values()), 1.0)
+        # The timer does not change the dynamics
+        np.testing.assert_array_equal(self.run_game(game, NULL_TIMER, ncoop=0.5, ninsp=0.2), coop)
+        self.assertEqual(NULL_TIMER.times, {})
+
+    def test_object_games(self):
+        timer = PhaseTimer()
+        self.run_game(PGGiGame(generate_players([['PureStrategyPlayer', 1.0]], nplayers=50), generations=10),
+                      timer, ncoop=0.5, ninsp=0.2)
+        self.assertEqual(timer.calls['payoff'], 10)
+        timer.reset()
+        self.run_game(PGGSocialControl(generate_players([['PGGscPlayer', 1.0]], nplayers=50), generations=10),
+                      timer, dni=0.5, ci=0.5)
+        self.assertEqual(timer.calls['inspection'], 10)
+
+    def test_simulation(self):
+        game = PGGiGame(Population(20), generations=10, engine='counts')
+        sim = Simulation('profile', 'local', game=game, r_min=1.0, r_max=3.0, r_step=1.0, runs=2, realizations=2,
+                         ncoop=0.5, ninsp=0.1, seed=3, profile=True)
+        sim.run_parallel(np.arange(1.0, 3.0), workers=2)
+        self.assertEqual(sim.timer.calls['payoff'], 8 * 10)
+        self.assertEqual(sim.timer.calls['init'], 8)
+        self.assertIn('payoff', str(sim))
+
+    def test_simulation_timer(self):
+        # A timer attached to the game is used and kept by serial sweeps
+        game = PGGiGame(Population(20), generations=10, engine='counts')
+        game.timer = timer = PhaseTimer()
+        sim = Simulation('profile', 'local', game=game, r_min=1.0, r_max=3.0, r_step=1.0, runs=2, realizations=1,
+                         ncoop=0.5, ninsp=0.1, seed=3, show_micro_simulations=False)
+        sim.run_serial(np.arange(1.0, 3.0))
+        self.assertIs(game.timer, timer)
+        self.assertEqual(timer.calls['payoff'], 4 * 10)
+        # Batched runs are timed as well
+        game = PGGiGame(generate_players([['PureStrategyPlayer', 1.0]], nplayers=20), generations=10)
+        sim = Simulation('profile', 'local', game=game, r_min=1.0, r_max=3.0, r_step=1.0, runs=2, realizations=1,
+                         ncoop=0.5, ninsp=0.1, profile=True)
+        sim.run_batch(np.arange(1.0, 3.0))
+        self.assertEqual(sim.timer.calls['selection'], 10)
+        self.assertIs(game.timer, NULL_TIMER)
@@ -0,0 +1,73 @@
+# ==============================================================================
+# EvoSim
+# Copyright © 2016 Elias F. Domingos. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+
+from unittest import TestCase
+
+import numpy as np
+from evosim.games.games import PGGiNetwork
+from evosim.players.players import generate_players
+from evosim.players.population import Population, generate_population
+
+from evosim.network.network import regular_network
+
+
+class TestPopulation(TestCase):
+    def setUp(self):
+        self.players = generate_players([['PGGiPlayer', 0.5], ['BMPlayer', 0.5]], nplayers=10)
+        regular_network(self.players, 4)
+        self.players[3].action = 2
+        self.players[7].p = 0.9
+        self.population = Population.from_players(self.players)
+
+    def test_from_players(self):
+        self.assertEqual(len(self.population), 10)
+        self.assertEqual(self.population.types, ('PGGiPlayer', 'BMPlayer'))
+        self.assertEqual(self.population[3].action, 2)
+        self.assertEqual(self.population[7].p, 0.9)
+        self.assertEqual(self.population[7].type, 'BMPlayer')
+        self.assertEqual([neighbor.id for neighbor in self.population[0].neighbors],
+                         [neighbor.id for neighbor in self.players[0].neighbors])
+
+    def test_view(self):
+        self.population[5].total_payoff = 2.5
+        self.population[5].action = 1
+        self.assertEqual(self.population.total_payoff[5], 2.5)
+        self.assertEqual(self.population.action[5], 1)
+        with self.assertRaises(KeyError):
+            self.population[10]
+
+    def test_update_players(self):
+        self.population.action[:] = 1
+        self.population.p[:] = 0.1
+        self.population.update_players(self.players)
+        self.assertTrue(all(player.action == 1 for player in self.players.values()))
+        self.assertEqual(self.players[7].p, 0.1)
+
+    def test_generate_population(self):
+        population = generate_population([['PGGiPlayer', 0.3], ['BMPlayer', 0.7]], nplayers=10)
+        self.assertEqual(population.is_type('BMPlayer').sum(), 7)
+        self.assertEqual(population[9].A, 0.5)
+
+    def test_game(self):
+        game = PGGiNetwork(self.population, generations=10, r=3.0, engine='array')
+        game.init_game()
+        game.init_population(ncoop=0.5)
+        game.run()
+        self.assertEqual(game.nc, np.count_nonzero(self.population.action == 0))
+        with self.assertRaises(ValueError):
+            PGGiNetwork(self.population)
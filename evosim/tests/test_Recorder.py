@@ -0,0 +1,114 @@
+# ==============================================================================
+# EvoSim
+# Copyright © 2016 Elias F. Domingos. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+
+import os
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+from evosim.games.games import PGGiNetwork
+from evosim.players.players import generate_players
+from evosim.simulation.checkpoint import Checkpoint
+from evosim.statistics.recorder import Recorder, actions
+
+from evosim.network.network import barabasi_albert_graph
+
+
+class Interrupted(Exception):
+    pass
+
+
+class GenerationCheckpoint(Checkpoint):
+    """
+    Checkpoint saved at a given generation, which then stops the run.
+    """
+    def __init__(self, path, generation):
+        super().__init__(path, interval=0.0)
+        self.generation = generation
+
+    def save(self, game=None):
+        if game.current_generation == self.generation:
+            super().save(game)
+            raise Interrupted()
+
+
+class TestRecorder(TestCase):
+    def setUp(self):
+        players = generate_players([['PGGiPlayer', 1.0]], nplayers=50)
+        barabasi_albert_graph(players, z=4, seed=5)
+        self.game = PGGiNetwork(players, generations=100, r=4.0, engine='array')
+
+    def run_game(self, recorder):
+        np.random.seed(2)
+        self.game.recorder = recorder
+        self.game.init_game()
+        self.game.init_population(ncoop=0.5, ninsp=0.1)
+        self.game.run()
+
+    def test_stride(self):
+        recorder = Recorder(stride=10)
+        self.run_game(recorder)
+        np.testing.assert_array_equal(recorder.generations(), np.arange(0, 100, 10))
+        np.testing.assert_allclose(recorder.get('coop')[1:], self.game.coopLevel[10::10])
+        np.testing.assert_allclose(recorder.get('insp')[1:], self.game.inspLevel[10::10])
+
+    def test_ring(self):
+        recorder = Recorder(stride=3, capacity=5)
+        self.run_game(recorder)
+        np.testing.assert_array_equal(recorder.generations(), np.arange(87, 100, 3))
+        np.testing.assert_allclose(recorder.get('coop'), self.game.coopLevel[87::3])
+
+    def test_spill(self):
+        directory = tempfile.mkdtemp()
+        recorder = Recorder({'actions': actions}, memory_budget=1000, directory=directory)
+        self.run_game(recorder)
+        self.assertEqual(recorder.spilled(), ['actions'])
+        stored = np.load(recorder.path('actions'))
+        self.assertEqual(stored.shape, (100, 50))
+        np.testing.assert_allclose((stored == 0).mean(axis=1)[1:], self.game.coopLevel[1:])
+
+    def test_spill_files(self):
+        recorder = Recorder({'actions': actions}, memory_budget=1000)
+        self.run_game(recorder)
+        first = recorder.path('actions')
+        self.run_game(recorder)
+        self.assertNotEqual(recorder.path('actions'), first)
+        self.assertTrue(os.path.exists(first))
+        directory = recorder.directory
+        recorder.close()
+        self.assertFalse(os.path.exists(directory))
+        self.assertEqual(recorder.spilled(), [])
+
+    def test_resume(self):
+        expected = Recorder({'coop': lambda game: game.nc / game.N, 'actions': actions}, memory_budget=1000)
+        self.game.seed(1)
+        self.run_game(expected)
+
+        path = os.path.join(tempfile.mkdtemp(), 'run.npz')
+        recorder = Recorder({'coop': lambda game: game.nc / game.N, 'actions': actions}, memory_budget=1000)
+        self.game.checkpoint = GenerationCheckpoint(path, 40)
+        self.game.seed(1)
+        with self.assertRaises(Interrupted):
+            self.run_game(recorder)
+        self.game.checkpoint = None
+        self.game.set_state(Checkpoint(path).load()['game'])
+        self.game.run()
+        self.assertEqual(recorder.spilled(), ['actions'])
+        np.testing.assert_array_equal(recorder.generations(), np.arange(100))
+        for name in ('coop', 'actions'):
+            np.testing.assert_array_equal(recorder.get(name), expected.get(name))
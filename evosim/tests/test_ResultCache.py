@@ -0,0 +1,78 @@
+# ==============================================================================
+# EvoSim
+# Copyright © 2016 Elias F. Domingos. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+import numpy as np
+from evosim.games.games import PGGiGame
+from evosim.players.population import Population
+from evosim.simulation.memo import ResultCache
+from evosim.simulation.simulation import Simulation
+from evosim.statistics.convergence import ConvergenceMonitor
+from evosim.statistics.recorder import Recorder
+
+
+class TestResultCache(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = ResultCache(self.directory.name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def simulation(self, r_max=3.0, **kwargs):
+        game = PGGiGame(Population(20), generations=10, engine='counts', **kwargs)
+        return Simulation('memo', 'local', game=game, r_min=1.0, r_max=r_max, r_step=1.0, runs=2, realizations=2,
+                          ncoop=0.5, ninsp=0.1, seed=3, show_micro_simulations=False, THRESHOLD=0, GENERATIONS=10,
+                          memoize=self.cache)
+
+    def test_memoize(self):
+        coop, insp = self.simulation().run_serial(np.arange(1.0, 3.0))
+        self.assertEqual(len(self.cache.entries()), 2)
+        # Unchanged points are not simulated again
+        sim = self.simulation(r_max=4.0)
+        with patch.object(sim.game, 'run', wraps=sim.game.run) as run:
+            coop_more, insp_more = sim.run_serial(np.arange(1.0, 4.0))
+        self.assertEqual(run.call_count, 4)
+        np.testing.assert_array_equal(coop_more[:2], coop)
+        np.testing.assert_array_equal(coop_more, self.simulation(r_max=4.0).run_parallel(np.arange(1.0, 4.0), 2)[0])
+        # The points keep their results when the range of r is shifted
+        sim = self.simulation(r_max=4.0)
+        with patch.object(sim.game, 'run', wraps=sim.game.run) as run:
+            coop_shifted, _ = sim.run_serial(np.arange(2.0, 4.0))
+        self.assertEqual(run.call_count, 0)
+        np.testing.assert_array_equal(coop_shifted, coop_more[1:])
+        # A change of the game is a new point
+        self.simulation(nu=0.5).run_serial(np.arange(1.0, 3.0))
+        self.assertEqual(len(self.cache.entries()), 5)
+
+    def test_describe_game(self):
+        description = ResultCache.describe_game(self.simulation().game)
+        monitor = ConvergenceMonitor(window=5, tolerance=0.5)
+        self.assertNotEqual(ResultCache.describe_game(self.simulation(convergence=monitor).game), description)
+        self.assertNotEqual(ResultCache.describe_game(self.simulation(recorder=Recorder(stride=2)).game), description)
+
+    def test_evict_lru(self):
+        self.simulation().run_serial(np.arange(1.0, 3.0))
+        (_, size, _), _ = sorted(self.cache.entries())
+        self.cache.evict_lru(max_bytes=size)
+        self.assertEqual(len(self.cache.entries()), 1)
+        self.cache.clear()
+        self.assertEqual(self.cache.size(), 0)
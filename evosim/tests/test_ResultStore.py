@@ -0,0 +1,64 @@
+# ==============================================================================
+# EvoSim
+# Copyright © 2016 Elias F. Domingos. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+from evosim.games.games import PGGiGame
+from evosim.players.population import Population
+from evosim.simulation.simulation import Simulation
+from evosim.simulation.store import ResultStore
+
+
+class TestResultStore(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = ResultStore(self.directory.name, trajectories=True, segment_rows=4)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_select(self):
+        for i in range(10):
+            self.store.append({'nu': i % 2 * 1.0, 'N': 1000 if i < 6 else 500, 'engine': 'counts'}, 7, i / 10, 0.0,
+                              0.5, np.full(i, i), np.zeros(i))
+        self.assertEqual(len(self.store.segments()), 2)
+        self.store.flush()
+        self.assertEqual(len(self.store), 10)
+
+        result = self.store.select(nu=1.0, N=1000)
+        np.testing.assert_allclose(result['coop'], [0.1, 0.3, 0.5])
+        np.testing.assert_array_equal(result['seed'], 7)
+        coop, insp = self.store.trajectory(result['segment'][2], result['row'][2])
+        np.testing.assert_array_equal(coop, np.full(5, 5))
+        self.assertEqual(len(insp), 5)
+
+        self.assertEqual(sorted(self.store.select(columns=['coop'], N=[500, 2000])), ['coop', 'row', 'segment'])
+        self.assertEqual(self.store.select(engine='events'), {})
+
+    def test_simulation(self):
+        game = PGGiGame(Population(20), generations=10, engine='counts')
+        sim = Simulation('sweep', 'local', game=game, r_min=1.0, r_max=3.0, r_step=1.0, runs=2, realizations=2,
+                         ncoop=0.5, ninsp=0.1, seed=3, store_data=True, store_data_dir=self.directory.name)
+        sim.run_parallel(np.arange(1.0, 3.0, 1.0), workers=2)
+        store = ResultStore(sim.get_store().directory)
+        result = store.select(r=2.0, nu=1.0)
+        self.assertEqual(len(result['coop']), 4)
+        np.testing.assert_array_equal(np.sort(result['realization'] * 2 + result['run']), np.arange(4))
+        self.assertGreaterEqual(len(store.segments()), 2)
@@ -0,0 +1,61 @@
+# ==============================================================================
+# EvoSim
+# Copyright © 2016 Elias F. Domingos. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+
+from unittest import TestCase
+
+import numpy as np
+from evosim.games.games import PGGiGame, PGGiNetwork
+from evosim.players.players import generate_players
+from evosim.simulation.simulation import Simulation, chunk_units
+
+from evosim.network.network import barabasi_albert_graph
+
+
+class TestSimulation(TestCase):
+    def setUp(self):
+        game = PGGiGame(generate_players([['PureStrategyPlayer', 1.0]], nplayers=20), generations=20,
+                        engine='counts')
+        self.sim = Simulation('test', 'local', game=game, r_min=1.0, r_max=4.0, r_step=1.0, runs=2,
+                              realizations=2, ncoop=0.5, ninsp=0.1, seed=3)
+        self.r_params = np.arange(1.0, 4.0, 1.0)
+
+    def test_chunk_units(self):
+        costs = np.random.uniform(1, 5, size=100)
+        chunks = chunk_units(costs, workers=4)
+        np.testing.assert_array_equal(np.sort(np.concatenate(chunks)), np.arange(100))
+        self.assertGreaterEqual(costs[chunks[0]].sum(), costs[chunks[-1]].sum())
+
+    def test_run_parallel(self):
+        coop_avg, insp_avg = self.sim.run_parallel(self.r_params, workers=3)
+        self.assertEqual(coop_avg.shape, (3,))
+        # The results do not depend on the number of workers
+        coop_serial, insp_serial = self.sim.run_parallel(self.r_params, workers=1)
+        np.testing.assert_array_equal(coop_avg, coop_serial)
+        np.testing.assert_array_equal(insp_avg, insp_serial)
+
+    def test_serial_parallel(self):
+        players = generate_players([['BMPlayer', 0.5], ['PGGiPlayer', 0.5]], nplayers=40)
+        barabasi_albert_graph(players, z=4, seed=5)
+        game = PGGiNetwork(players, generations=20, nu=0.5)
+        sim = Simulation('test', 'local', game=game, r_min=2.0, r_max=5.0, r_step=1.0, runs=2, realizations=2,
+                         ncoop=0.5, ninsp=0.1, seed=7, show_micro_simulations=False, THRESHOLD=0, GENERATIONS=20)
+        r_params = np.arange(2.0, 5.0, 1.0)
+        coop_parallel, insp_parallel = sim.run_parallel(r_params, workers=2)
+        coop_serial, insp_serial = sim.run_serial(r_params)
+        np.testing.assert_array_equal(coop_parallel, coop_serial)
+        np.testing.assert_array_equal(insp_parallel, insp_serial)
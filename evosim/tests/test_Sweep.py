@@ -0,0 +1,97 @@
+# ==============================================================================
+# EvoSim
+# Copyright © 2016 Elias F. Domingos. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+
+import os
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+from evosim.games.games import PGGGame, PGGiNetwork
+from evosim.network.network import RandomNetwork
+from evosim.players.population import Population
+from evosim.simulation.store import ResultStore
+from evosim.simulation.sweep import Sweep, expand_grid
+
+
+class TestSweep(TestCase):
+    def setUp(self):
+        self.grid = {'r': [1.0, 3.0, 5.0], 'ncoop': [0.2, 0.8]}
+        self.directory = tempfile.TemporaryDirectory()
+        self.journal = os.path.join(self.directory.name, 'sweep.jsonl')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def sweep(self, **kwargs):
+        game = PGGGame(Population(50), generations=20, engine='counts')
+        return Sweep(self.grid, game=game, runs=3, **kwargs)
+
+    def test_expand_grid(self):
+        points = expand_grid([{'r': np.arange(1, 3), 'N': 10}, {'r': 5}])
+        self.assertEqual(points, [{'r': 1, 'N': 10}, {'r': 2, 'N': 10}, {'r': 5}])
+        self.assertIsInstance(points[0]['r'], int)
+
+    def test_serial_parallel(self):
+        coop_serial, insp_serial = self.sweep(seed=1, workers=1).run()
+        self.assertEqual(coop_serial.shape, (6, 3))
+        coop_parallel, insp_parallel = self.sweep(seed=1, workers=3).run()
+        np.testing.assert_array_equal(coop_serial, coop_parallel)
+
+    def test_resume(self):
+        sweep = self.sweep(seed=2, workers=1, journal=self.journal)
+        coop, _ = sweep.run()
+        # A finished sweep runs nothing again
+        resumed = self.sweep(workers=1, journal=self.journal)
+        resumed.load_journal()
+        self.assertEqual(resumed.units(), [])
+        # After an interruption only the missing units run, with the same results
+        with open(self.journal) as f:
+            lines = f.readlines()
+        with open(self.journal, 'w') as f:
+            f.writelines(lines[:8])
+            f.write(lines[8][:10])
+        resumed = self.sweep(workers=2, journal=self.journal)
+        resumed.load_journal()
+        self.assertEqual(len(resumed.units()), 11)
+        np.testing.assert_array_equal(resumed.run()[0], coop)
+        with self.assertRaises(ValueError):
+            Sweep({'r': [2.0]}, game=PGGGame(Population(50), engine='counts'), journal=self.journal).run()
+
+    def test_store_before_journal(self):
+        # Every run marked as done in the journal is already in the store on disk
+        directory = os.path.join(self.directory.name, 'store')
+        sweep = self.sweep(seed=2, workers=1, journal=self.journal, store=ResultStore(directory))
+        stored = []
+        append = sweep.journal.append
+        sweep.journal.append = lambda records: (stored.append(len(ResultStore(directory))), append(records))
+        sweep.run()
+        self.assertEqual(stored, list(range(1, 19)))
+
+    def test_factory(self):
+        def factory(N, z):
+            population = Population(N)
+            population.set_network(RandomNetwork(z=z).build(N, seed=0))
+            return PGGiNetwork(population, generations=10, engine='array')
+
+        sweep = Sweep({'N': [40, 60], 'z': 4, 'nu': [0.0, 0.5]}, factory=factory, runs=2, seed=3, workers=1)
+        coop, insp = sweep.run()
+        self.assertTrue(sweep.done.all())
+        self.assertEqual([row['runs'] for row in sweep.table()], [2] * 4)
+        for name in ('unknown', 'N'):
+            with self.assertRaisesRegex(ValueError, 'ncoop, ninsp, mutation, r, c'):
+                Sweep({name: [10]}, game=PGGGame(Population(10), engine='counts'), workers=1).run()
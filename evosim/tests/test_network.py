@@ -0,0 +1,135 @@
+# ==============================================================================
+# EvoSim
+# Copyright © 2016 Elias F. Domingos. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+
+from unittest import TestCase
+
+import numpy as np
+from evosim.network.graph import Graph
+from evosim.players.players import generate_players
+
+from evosim.network.network import barabasi_albert_edges, calculate_avg_connectivity, edges_to_csr, \
+    regular_network, ConfigurationNetwork, GridNetwork, RandomNetwork, RegularNetwork, ScaleFreeNetwork, \
+    SmallWorldNetwork
+
+
+class TestBarabasiAlbert(TestCase):
+    def test_edges(self):
+        n, m = 2000, 3
+        edges = barabasi_albert_edges(n, m, seed=1)
+        self.assertEqual(edges.shape, (m * (n - m), 2))
+        # Every new node attaches to m distinct earlier nodes
+        self.assertTrue(np.all(edges[:, 1] < edges[:, 0]))
+        self.assertEqual(len(np.unique(edges[:, 0] * n + edges[:, 1])), len(edges))
+        degree = np.bincount(edges.ravel(), minlength=n)
+        self.assertTrue(np.all(degree[m:] >= m))
+        self.assertGreater(degree.max(), 10 * m)
+        np.testing.assert_array_equal(barabasi_albert_edges(n, m, seed=1), edges)
+
+    def test_csr(self):
+        edges = np.array([[1, 0], [2, 0], [3, 2]])
+        indptr, indices = edges_to_csr(4, edges)
+        np.testing.assert_array_equal(indptr, [0, 2, 3, 5, 6])
+        np.testing.assert_array_equal(indices, [1, 2, 0, 0, 3, 2])
+
+
+class TestGraph(TestCase):
+    def setUp(self):
+        self.graph = Graph.barabasi_albert(500, m=2, seed=3)
+
+    def test_neighbors(self):
+        self.assertEqual(len(self.graph), 500)
+        self.assertEqual(self.graph.number_of_edges(), 2 * 498)
+        self.assertEqual(self.graph.indices.dtype, np.int32)
+        for i in (0, 10, 499):
+            for j in self.graph.neighbors(i):
+                self.assertIn(i, self.graph.neighbors(j))
+        with self.assertRaises(ValueError):
+            self.graph.indices[0] = 1
+        self.assertEqual(Graph.from_edges(500, self.graph.edges()), self.graph)
+
+    def test_degree_statistics(self):
+        stats = self.graph.degree_statistics()
+        self.assertAlmostEqual(stats['mean'], 4 * 498 / 500)
+        self.assertEqual(stats['min'], 2)
+        self.assertAlmostEqual(self.graph.degree_distribution().sum(), 1.0)
+
+    def test_groups(self):
+        values = np.random.default_rng(0).random(500)
+        expected = [values[i] + values[self.graph.neighbors(i)].sum() for i in range(500)]
+        np.testing.assert_allclose(self.graph.group_sum(values), expected)
+        np.testing.assert_allclose(self.graph.group_matrix() @ values, expected)
+        self.assertIs(self.graph.group_matrix(), self.graph.group_matrix())
+
+    def test_players(self):
+        players = generate_players([['PGGiPlayer', 1.0]], nplayers=500)
+        self.graph.assign_neighbors(players)
+        self.assertEqual(Graph.from_players(players), self.graph)
+        self.assertAlmostEqual(calculate_avg_connectivity(players), self.graph.average_degree())
+
+        ring = Graph.from_generator(regular_network, 20, 4)
+        np.testing.assert_array_equal(ring.degree, 4)
+        np.testing.assert_array_equal(ring.neighbors(0), [18, 19, 1, 2])
+        np.testing.assert_array_equal(ring.neighbors(5), [3, 4, 6, 7])
+
+
+class TestNetworks(TestCase):
+    def assertSimple(self, graph):
+        edges = graph.edges().astype(np.int64)
+        self.assertTrue(np.all(edges[:, 0] < edges[:, 1]))
+        self.assertEqual(len(np.unique(edges[:, 0] * len(graph) + edges[:, 1])), len(edges))
+
+    def test_lattices(self):
+        grid = GridNetwork().build(100)
+        np.testing.assert_array_equal(grid.degree, 4)
+        np.testing.assert_array_equal(grid.neighbors(0), [1, 9, 10, 90])
+        moore = GridNetwork('moore').build(100)
+        np.testing.assert_array_equal(moore.neighbors(0), [1, 9, 10, 11, 19, 90, 91, 99])
+        bounded = GridNetwork(periodic=False, shape=(5, 4)).build(20)
+        self.assertEqual(bounded.number_of_edges(), 5 * 3 + 4 * 4)
+        with self.assertRaises(ValueError):
+            GridNetwork().build(99)
+
+        ring = RegularNetwork(6).build(50)
+        np.testing.assert_array_equal(ring.degree, 6)
+        np.testing.assert_array_equal(ring.neighbors(0), [1, 2, 3, 47, 48, 49])
+
+    def test_random(self):
+        n = 4000
+        for network in (RandomNetwork(z=6), SmallWorldNetwork(6, 0.3), ScaleFreeNetwork(z=6),
+                        ConfigurationNetwork(lambda n, rng: 2 * rng.integers(1, 6, size=n))):
+            graph = network.build(n, seed=5)
+            self.assertSimple(graph)
+            self.assertEqual(network.build(n, seed=5), graph)
+            self.assertNotEqual(network.build(n, seed=6), graph)
+            self.assertAlmostEqual(graph.average_degree(), 6, delta=0.3)
+        # Small world keeps the number of edges, and with beta=0 it is the ring lattice
+        self.assertEqual(SmallWorldNetwork(4, 1.0).build(n, seed=1).number_of_edges(), 2 * n)
+        self.assertEqual(SmallWorldNetwork(4, 0.0).build(n, seed=1), RegularNetwork(4).build(n))
+
+    def test_erdos_renyi_pairs(self):
+        # With p=1 every pair is drawn exactly once
+        complete = RandomNetwork(p=1.0).build(30)
+        np.testing.assert_array_equal(complete.degree, 29)
+        self.assertSimple(complete)
+
+    def test_assign(self):
+        players = generate_players([['PGGiPlayer', 1.0]], nplayers=64)
+        graph = GridNetwork('moore').assign(players, seed=0)
+        self.assertEqual(Graph.from_players(players), graph)
+        with self.assertRaises(ValueError):
+            ConfigurationNetwork([1, 2]).build(2)
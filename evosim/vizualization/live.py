@@ -0,0 +1,198 @@
+# ==============================================================================
+# EvoSim
+# Copyright © 2016 Elias F. Domingos. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+
+import logging
+import multiprocessing
+import queue
+from time import perf_counter
+
+import numpy as np
+
+from evosim.statistics.observer import Observer
+
+logger = logging.getLogger(__name__)
+
+
+class LivePlotter(Observer):
+    """
+    Live plot of the runs of a simulation, drawn by a separate process.
+
+    The game hands the snapshots to a bounded queue without waiting: when the plotting
+    process falls behind, the snapshots that do not fit are dropped (the end of a run
+    is always kept unless the queue is full), so plotting never blocks or slows down the
+    simulation. The plotting process redraws at most ``fps`` times per second, with
+    blitting: the axes, ticks and labels are drawn once and only the lines are drawn
+    again on each frame (see plot_loop).
+
+    The upper axes show the fractions of cooperators and inspectors of the current run,
+    the lower axes the mean fractions of the finished runs against r.
+
+    :param generations: number of generations of a run (x range of the upper axes)
+    :param r_range: (r min, r max) of the lower axes
+    :param every: generations between two snapshots
+    :param fps: maximum number of frames per second
+    :param maxsize: capacity of the queue of snapshots
+    :param backend: matplotlib backend of the plotting process, the default one if None
+    :param keep_open: if True, the window stays open after close() until the user closes it
+    """
+
+    def __init__(self, generations, r_range=(0.0, 1.0), every=1, fps=20, maxsize=10000, backend=None,
+                 keep_open=False):
+        super().__init__(every)
+        self.generations = generations
+        self.r_range = r_range
+        self.fps = fps
+        self.backend = backend
+        self.keep_open = keep_open
+        self.dropped = 0
+        # A new interpreter: GUI toolkits do not survive a fork
+        context = multiprocessing.get_context('spawn')
+        self.queue = context.Queue(maxsize)
+        self.process = context.Process(target=plot_loop, daemon=True,
+                                       args=(self.queue, generations, r_range, fps, backend, keep_open))
+        self.process.start()
+
+    def update(self, snapshot):
+        self.put(snapshot)
+
+    def finish(self, snapshot):
+        self.put(snapshot)
+
+    def put(self, snapshot):
+        try:
+            self.queue.put_nowait(snapshot)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self, timeout=5.0):
+        """
+        Tell the plotting process that the simulation has finished and wait for it
+        (unless it keeps its window open).
+        """
+        try:
+            self.queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        if not self.keep_open:
+            self.process.join(timeout)
+        if self.dropped:
+            logger.info("%d snapshots were not plotted", self.dropped)
+
+    def __getstate__(self):
+        # Worker processes of a parallel sweep only need the queue
+        state = dict(self.__dict__)
+        state['process'] = None
+        return state
+
+
+def plot_loop(snapshots, generations, r_range=(0.0, 1.0), fps=20, backend=None, keep_open=False):
+    """
+    Plot the snapshots of a queue until it yields None.
+
+    :return: number of frames drawn
+    """
+    import matplotlib
+    if backend is not None:
+        matplotlib.use(backend)
+    import matplotlib.pyplot as plt
+
+    fig, (run_axes, sweep_axes) = plt.subplots(2, 1, figsize=(8, 8))
+    run_axes.set_xlim(0, generations)
+    run_axes.set_ylim(-0.05, 1.05)
+    run_axes.set_xlabel("generations")
+    run_axes.set_ylabel("Fraction of players")
+    coop_line, = run_axes.plot([], [], color='g', lw=2, label='Fraction of cooperators', animated=True)
+    insp_line, = run_axes.plot([], [], color='b', lw=2, label='Fraction of inspectors', animated=True)
+    run_text = run_axes.text(0.02, 0.92, '', transform=run_axes.transAxes, animated=True)
+    run_axes.legend(loc='upper right')
+    sweep_axes.set_xlim(*r_range)
+    sweep_axes.set_ylim(-0.05, 1.05)
+    sweep_axes.set_xlabel("r")
+    sweep_axes.set_ylabel("Mean fraction of players")
+    coop_points, = sweep_axes.plot([], [], 'o', color='g', alpha=0.5, animated=True)
+    insp_points, = sweep_axes.plot([], [], 'o', color='b', alpha=0.5, animated=True)
+    artists = (coop_line, insp_line, run_text, coop_points, insp_points)
+
+    background = [None]
+
+    def save_background(event=None):
+        # Everything but the animated artists, drawn again when the window changes
+        background[0] = fig.canvas.copy_from_bbox(fig.bbox)
+
+    fig.canvas.mpl_connect('draw_event', save_background)
+    plt.show(block=False)
+    fig.canvas.draw()
+
+    # Trajectories of the runs in progress (several in a parallel sweep), by work unit
+    runs = {}
+    generation, coop, insp = [], [], []
+    r = None
+    means = {'r': [], 'coop': [], 'insp': []}
+    frames = 0
+    last_frame = 0.0
+    finished = False
+    while not finished:
+        try:
+            pending = [snapshots.get(timeout=1.0 / fps)]
+        except queue.Empty:
+            pending = []
+        # Take everything that is waiting, a frame shows the last state
+        while pending and pending[-1] is not None:
+            try:
+                pending.append(snapshots.get_nowait())
+            except queue.Empty:
+                break
+        finished = bool(pending) and pending[-1] is None
+        for snapshot in pending:
+            if snapshot is None:
+                break
+            generation, coop, insp = runs.setdefault(snapshot.unit, ([], [], []))
+            if generation and snapshot.generation < generation[-1]:
+                # A new run of the same unit
+                del generation[:], coop[:], insp[:]
+            generation.append(snapshot.generation)
+            coop.append(snapshot.coop)
+            insp.append(snapshot.insp)
+            r = snapshot.r
+            if snapshot.final:
+                means['r'].append(np.nan if r is None else r)
+                means['coop'].append(np.mean(coop))
+                means['insp'].append(np.mean(insp))
+                del runs[snapshot.unit]
+
+        if not pending or (perf_counter() - last_frame < 1.0 / fps and not finished):
+            continue
+        last_frame = perf_counter()
+        coop_line.set_data(generation, coop)
+        insp_line.set_data(generation, insp)
+        run_text.set_text('' if r is None else 'r = %.3f' % r)
+        coop_points.set_data(means['r'], means['coop'])
+        insp_points.set_data(means['r'], means['insp'])
+        fig.canvas.restore_region(background[0])
+        for artist in artists:
+            artist.axes.draw_artist(artist)
+        fig.canvas.blit(fig.bbox)
+        fig.canvas.flush_events()
+        frames += 1
+
+    if keep_open:
+        for artist in artists:
+            artist.set_animated(False)
+        plt.show(block=True)
+    plt.close(fig)
+    return frames